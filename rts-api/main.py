@@ -1,21 +1,94 @@
+import asyncio
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 
 import uvicorn
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from rtsapi.app_state import AppState
-from rtsapi.database import engine, models
+from rtsapi.database import SessionLocal, engine, models
+from rtsapi.database.migrations import migrate
+from rtsapi.database.measurement_repository import MeasurementRepository
+from rtsapi.database.rts_job_repository import RTSJobRepository
+from rtsapi.database.rts_repository import RTSRepository
 from rtsapi.global_exception_handling import catch_exceptions_middleware
-from rtsapi.routers import device, measurement, root, rts, rts_job, session, target, external_sensor, synchronizer
+from rtsapi.metrics import record_request_metrics
+from rtsapi.mappers import MeasurementMapper
+from rtsapi.services.presence_service import (flush_presence,
+                                              flush_presence_periodically)
+from rtsapi.services.rts_job_service import reap_expired_leases
+from rtsapi.routers import device, measurement, metrics, root, purge, rts, rts_job, session, target, external_sensor, synchronizer
 
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(message)s")
+# level of the root logger, e.g. INFO to skip the debug output of the ingest
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+
+
+def configure_logging() -> None:
+    """
+    Logging only puts the records into a queue, a listener thread writes
+    them, so the event loop and the database writer never wait for the
+    console.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(LOG_LEVEL)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    # writes the records still queued on exit
+    atexit.register(listener.stop)
+
+
+configure_logging()
+
+migrate(engine, models.Base.metadata)
+
+
+def restore_app_state(app_state: AppState) -> None:
+    """Re-hydrate the in-memory measurement state after a restart"""
+    with SessionLocal() as db:
+        rts_job_repository = RTSJobRepository(db)
+        measurement_repository = MeasurementRepository(db, rts_job_repository)
+
+        running_jobs = rts_job_repository.get_running_rts_jobs()
+        app_state.measurement_hub.open_jobs(job.id for job in running_jobs)
+        for job in running_jobs:
+            app_state.datarates.open_job(
+                job.id, job.num_measurements or 0, job.first_timestamp, job.last_timestamp
+            )
+
+        latest_of_jobs = MeasurementMapper.to_measurement_dtos(
+            measurement_repository.get_latest_measurements()
+        )
+        latest_of_rts = MeasurementMapper.to_measurement_dtos(
+            measurement_repository.get_last_measurements_of_all_rts()
+        )
+        app_state.latest_measurements.hydrate(latest_of_jobs + latest_of_rts)
+        app_state.latest_measurements.set_rts_without_measurements(
+            rts.id for rts in RTSRepository(db).get_all_rts()
+        )
+        for measurement in latest_of_jobs:
+            app_state.measurement_hub.publish(measurement)
 
-models.Base.metadata.create_all(bind=engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.app_state = AppState()
+    app_state = AppState()
+    restore_app_state(app_state)
+    app.state.app_state = app_state
+    lease_reaper = asyncio.create_task(reap_expired_leases(app_state))
+    presence_flusher = asyncio.create_task(flush_presence_periodically(app_state))
     yield
+    lease_reaper.cancel()
+    presence_flusher.cancel()
+    flush_presence(app_state)
+    app.state.app_state.database_writer.shutdown()
+    app.state.app_state.purges.shutdown()
 
 app = FastAPI(
     title="Robotic Total Station API",
@@ -33,8 +106,12 @@ app.include_router(rts.router)
 app.include_router(session.router)
 app.include_router(external_sensor.router)
 app.include_router(synchronizer.router)
+app.include_router(purge.router)
+app.include_router(metrics.router)
 
 app.middleware("http")(catch_exceptions_middleware)
+# added last to be the outermost, so it sees the status of mapped exceptions
+app.middleware("http")(record_request_metrics)
 
 
 def main():
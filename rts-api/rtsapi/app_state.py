@@ -1,7 +1,18 @@
 from dataclasses import dataclass, field
 from uuid import UUID
 
-from trajectory_sync import Synchronizer
+from trajectory_sync import Position, Synchronizer
+
+from rtsapi.datarate_tracker import DataRateTracker
+from rtsapi.job_control import JobControl
+from rtsapi.job_dispatcher import JobDispatcher
+from rtsapi.measurement_cache import LatestMeasurementCache
+from rtsapi.measurement_hub import MeasurementHub
+from rtsapi.measurement_ingest import DatabaseWriter, IngestConnectionStats
+from rtsapi.observation_cache import (CorrectedObservationCache,
+                                     IntrinsicDelayCache)
+from rtsapi.presence_registry import PresenceRegistry
+from rtsapi.purge_queue import PurgeQueue
 
 
 @dataclass
@@ -9,3 +20,26 @@ class AppState:
     primary_sensor_id: UUID | None = None
     secondary_sensor_id: UUID | None = None
     synchronizer: Synchronizer = field(default_factory=Synchronizer)
+    previous_positions: dict[UUID, Position] = field(default_factory=dict)
+    database_writer: DatabaseWriter = field(default_factory=DatabaseWriter)
+    ingest_connections: dict[UUID, IngestConnectionStats] = field(default_factory=dict)
+    measurement_hub: MeasurementHub = field(default_factory=MeasurementHub)
+    datarates: DataRateTracker = field(default_factory=DataRateTracker)
+    latest_measurements: LatestMeasurementCache = field(
+        default_factory=LatestMeasurementCache
+    )
+    intrinsic_delay_rates: IntrinsicDelayCache = field(
+        default_factory=IntrinsicDelayCache
+    )
+    corrected_observations: CorrectedObservationCache = field(
+        default_factory=CorrectedObservationCache
+    )
+    purges: PurgeQueue = field(default_factory=PurgeQueue)
+    job_dispatcher: JobDispatcher = field(default_factory=JobDispatcher)
+    job_control: JobControl = field(default_factory=JobControl)
+    device_presence: PresenceRegistry = field(
+        default_factory=lambda: PresenceRegistry("device_presence")
+    )
+    external_sensor_presence: PresenceRegistry = field(
+        default_factory=lambda: PresenceRegistry("external_sensor_presence")
+    )
@@ -1,17 +1,46 @@
 import os
+import time
 
 from dotenv import load_dotenv
 from sqlalchemy import event
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from rtsapi.metrics import DATABASE_QUERY_DURATION, statement_type
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", DATABASE_URL)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# connection pool of the PostgreSQL mode, every websocket ingest and request
+# holds a connection only while it talks to the database
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "20"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+DATABASE_STATEMENT_TIMEOUT_MS = int(os.getenv("DATABASE_STATEMENT_TIMEOUT_MS", "0"))
+
+if SQLALCHEMY_DATABASE_URL.startswith(("postgresql://", "postgres://")):
+    # COPY of the ingest needs psycopg 3, not the default psycopg2 driver
+    SQLALCHEMY_DATABASE_URL = "postgresql+psycopg://" + SQLALCHEMY_DATABASE_URL.split("://", 1)[1]
+
+if SQLALCHEMY_DATABASE_URL.startswith("postgresql"):
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        pool_size=DATABASE_POOL_SIZE,
+        max_overflow=DATABASE_MAX_OVERFLOW,
+        pool_timeout=DATABASE_POOL_TIMEOUT,
+        pool_recycle=DATABASE_POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args={
+            "application_name": "rtsapi",
+            "options": f"-c statement_timeout={DATABASE_STATEMENT_TIMEOUT_MS}",
+        },
+    )
+else:
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
     @event.listens_for(engine, "connect")
@@ -20,8 +49,27 @@ if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
         cursor.execute("PRAGMA journal_mode=WAL")
         cursor.execute("PRAGMA synchronous=NORMAL")
         cursor.execute("PRAGMA temp_store=MEMORY")
+        # ON DELETE CASCADE of the models is only enforced with foreign keys on
+        cursor.execute("PRAGMA foreign_keys=ON")
         cursor.close()
 
+
+# duration of every statement for the /metrics endpoint
+@event.listens_for(engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_start_time = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def record_query_duration(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "query_start_time", None)
+    if start is not None:
+        DATABASE_QUERY_DURATION.observe(
+            time.perf_counter() - start, statement_type(statement)
+        )
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -1,7 +1,7 @@
-import time
 from uuid import UUID
 
 from fastapi import Depends
+from sqlalchemy import bindparam, update
 from sqlalchemy.orm import Session
 
 from rtsapi.database.models import Device
@@ -45,9 +45,18 @@ class DeviceRepository:
     def get_device_by_ip(self, ip: str) -> Device | None:
         return self.db.query(Device).filter(Device.ip == ip).first()
 
-    def update_last_seen(self, device_id: UUID) -> Device:
-        device = self.get_device(device_id)
-        device.last_seen = time.time()
-        self.db.commit()
-        self.db.refresh(device)
-        return device
+    def set_last_seen(self, last_seen: dict[UUID, float], commit: bool = True) -> None:
+        # Core executemany, rows deleted meanwhile are skipped
+        if last_seen:
+            self.db.execute(
+                update(Device.__table__)
+                .where(Device.id == bindparam("b_id"))
+                .values(last_seen=bindparam("b_last_seen")),
+                [
+                    {"b_id": device_id, "b_last_seen": timestamp}
+                    for device_id, timestamp in last_seen.items()
+                ],
+            )
+
+        if commit:
+            self.db.commit()
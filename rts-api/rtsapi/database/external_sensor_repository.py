@@ -1,7 +1,7 @@
-import time
 from uuid import UUID
 
 from fastapi import Depends
+from sqlalchemy import bindparam, update
 from sqlalchemy.orm import Session
 
 from rtsapi.database.models import ExternalSensor, ExternalSensorMeasurement
@@ -47,12 +47,21 @@ class ExternalSensorRepository:
     def get_external_sensor_by_ip(self, ip: str) -> ExternalSensor | None:
         return self.db.query(ExternalSensor).filter(ExternalSensor.ip == ip).first()
 
-    def update_last_seen(self, sensor_id: UUID) -> ExternalSensor:
-        external_sensor = self.get_external_sensor(sensor_id)
-        external_sensor.last_seen = time.time()
-        self.db.commit()
-        self.db.refresh(external_sensor)
-        return external_sensor
+    def set_last_seen(self, last_seen: dict[UUID, float], commit: bool = True) -> None:
+        # Core executemany, rows deleted meanwhile are skipped
+        if last_seen:
+            self.db.execute(
+                update(ExternalSensor.__table__)
+                .where(ExternalSensor.id == bindparam("b_id"))
+                .values(last_seen=bindparam("b_last_seen")),
+                [
+                    {"b_id": sensor_id, "b_last_seen": timestamp}
+                    for sensor_id, timestamp in last_seen.items()
+                ],
+            )
+
+        if commit:
+            self.db.commit()
 
     def add_external_sensor_measurement(
         self, measurement: ExternalSensorMeasurement
@@ -61,3 +70,9 @@ class ExternalSensorRepository:
         self.db.commit()
         self.db.refresh(measurement)
         return measurement
+
+    def add_external_sensor_measurements(
+        self, measurements: list[ExternalSensorMeasurement]
+    ) -> None:
+        self.db.add_all(measurements)
+        self.db.commit()
@@ -1,12 +1,32 @@
+import os
+from typing import Iterable, Iterator
 from uuid import UUID
 
+import numpy as np
 from fastapi import Depends
-from sqlalchemy import func
+from sqlalchemy import delete, exists, func, insert, or_, select
 from sqlalchemy.orm import Session
 
-from rtsapi.database.models import Measurement
+from rtsapi.database.models import RTS, Measurement, RTSJob
+from rtsapi.database.postgres import (copy_rows, fetch_server_side,
+                                      is_postgresql, measurement_partitions)
 from rtsapi.database.rts_job_repository import RTSJobRepository
 from rtsapi.dependencies import get_db
+from rtsapi.exceptions import RTSJobNotFoundException
+from rtsapi.rts_observations import MEASUREMENT_DTYPE
+
+# rows fetched at once when a whole job is read, from a server-side cursor on
+# PostgreSQL, so the rows are never all held as Python tuples
+MEASUREMENT_FETCH_SIZE = int(os.getenv("MEASUREMENT_FETCH_SIZE", "50000"))
+
+
+def job_key(job_id: UUID):
+    """Compact key of a job as scalar subquery, so filters can use the indexes"""
+    return select(RTSJob.key).where(RTSJob.id == job_id).scalar_subquery()
+
+
+def rts_key(rts_id: UUID):
+    return select(RTS.key).where(RTS.id == rts_id).scalar_subquery()
 
 
 class MeasurementRepository:
@@ -19,28 +39,87 @@ class MeasurementRepository:
         self.db = db
         self.rts_job_repository = rts_job_repository
 
-    def add_measurement(self, measurement: Measurement) -> Measurement:
-        self.db.add(measurement)
-        self.db.commit()
-        self.db.refresh(measurement)
-        return measurement
+    def add_measurement_rows(self, rows: list[dict]) -> None:
+        """
+        Insert plain measurement rows as a single executemany in one transaction,
+        with COPY on PostgreSQL. The rows reference job and RTS by their UUIDs,
+        the compact keys are looked up once per batch.
+        """
+        if not rows:
+            return
 
-    def add_measurements_bulk(self, measurements: list[Measurement]) -> None:
-        self.db.add_all(measurements)
+        job_ids = {row["rts_job_id"] for row in rows}
+        job_keys = dict(
+            self.db.execute(
+                select(RTSJob.id, RTSJob.key).where(RTSJob.id.in_(job_ids))
+            ).all()
+        )
+        rts_ids = {row["rts_id"] for row in rows if row["rts_id"] is not None}
+        rts_keys = dict(
+            self.db.execute(select(RTS.id, RTS.key).where(RTS.id.in_(rts_ids))).all()
+        )
+        missing_job_ids = job_ids - job_keys.keys()
+        if missing_job_ids:
+            raise RTSJobNotFoundException(missing_job_ids.pop())
+
+        if is_postgresql(self.db.get_bind()):
+            self.copy_measurement_rows(rows, rts_keys, job_keys)
+        else:
+            self.db.execute(
+                insert(Measurement),
+                [
+                    {
+                        **{name: row[name] for name in MEASUREMENT_DTYPE.names},
+                        "rts_key": rts_keys.get(row["rts_id"]),
+                        "rts_job_key": job_keys[row["rts_job_id"]],
+                    }
+                    for row in rows
+                ],
+            )
         self.db.commit()
 
+    def rollback(self) -> None:
+        self.db.rollback()
+
+    def ensure_partitions(self, timestamps: Iterable[float]) -> None:
+        """
+        Create the measurement partitions for the given controller timestamps.
+        Has to be called before the session's first statement of the
+        transaction that writes the measurements.
+        """
+        engine = self.db.get_bind()
+        if is_postgresql(engine):
+            measurement_partitions.ensure(engine, timestamps)
+
+    def copy_measurement_rows(
+        self, rows: list[dict], rts_keys: dict[UUID, int], job_keys: dict[UUID, int]
+    ) -> None:
+        copy_rows(
+            self.db.connection(),
+            Measurement.__tablename__,
+            [*MEASUREMENT_DTYPE.names, "rts_key", "rts_job_key"],
+            (
+                (
+                    *(row[name] for name in MEASUREMENT_DTYPE.names),
+                    rts_keys.get(row["rts_id"]),
+                    job_keys[row["rts_job_id"]],
+                )
+                for row in rows
+            ),
+        )
+
     def get_latest_measurements(self) -> list[Measurement]:
         """Get the latest measurements for all running jobs"""
         running_jobs = self.rts_job_repository.get_running_rts_jobs()
-        running_job_ids = [job.id for job in running_jobs]
+        running_job_keys = [job.key for job in running_jobs]
 
         subquery = (
             self.db.query(
-                Measurement.rts_job_id,
+                Measurement.rts_job_key,
                 func.max(Measurement.controller_timestamp).label("max_timestamp"),
             )
-            .filter(Measurement.rts_job_id.in_(running_job_ids))
-            .group_by(Measurement.rts_job_id)
+            .filter(Measurement.rts_job_key.in_(running_job_keys))
+            .group_by(Measurement.rts_job_key)
             .subquery()
         )
 
@@ -48,7 +127,7 @@ class MeasurementRepository:
             self.db.query(Measurement)
             .join(
                 subquery,
-                (Measurement.rts_job_id == subquery.c.rts_job_id)
+                (Measurement.rts_job_key == subquery.c.rts_job_key)
                 & (Measurement.controller_timestamp == subquery.c.max_timestamp),
             )
             .all()
@@ -61,17 +140,129 @@ class MeasurementRepository:
     ) -> list[Measurement]:
         query = self.db.query(Measurement)
         if job_id is not None:
-            query = query.filter(Measurement.rts_job_id == job_id)
+            query = query.filter(Measurement.rts_job_key == job_key(job_id))
         if since_timestamp is not None:
             query = query.filter(Measurement.controller_timestamp > since_timestamp)
 
         query = query.order_by(Measurement.controller_timestamp.asc())
         return query.all()
 
+    def get_measurement_columns(
+        self, job_id: UUID, chunk_size: int = MEASUREMENT_FETCH_SIZE
+    ) -> np.ndarray:
+        """
+        Load the measurements of a job straight from the cursor into a
+        structured array with MEASUREMENT_DTYPE, bypassing the ORM
+        """
+        query = (
+            select(*(getattr(Measurement, name) for name in MEASUREMENT_DTYPE.names))
+            .where(Measurement.rts_job_key == job_key(job_id))
+            .order_by(Measurement.controller_timestamp.asc())
+        )
+        # all selected columns are plain numbers, so the rows of the DBAPI
+        # cursor can be used as they are without building Row objects
+        connection = self.db.connection()
+        if is_postgresql(connection):
+            row_chunks = fetch_server_side(connection, query, chunk_size)
+        else:
+            cursor = connection.execute(query).cursor
+            row_chunks = iter(lambda: cursor.fetchmany(chunk_size), [])
+
+        return np.concatenate(
+            [np.empty(0, dtype=MEASUREMENT_DTYPE)]
+            + [np.array(rows, dtype=MEASUREMENT_DTYPE) for rows in row_chunks]
+        )
+
+    def get_measurement_page(
+        self,
+        job_id: UUID,
+        after_timestamp: float | None = None,
+        after_id: int | None = None,
+        limit: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Keyset page of the measurements of a job ordered by
+        (controller_timestamp, id), starting after the given key. Without
+        after_id all rows newer than after_timestamp are returned.
+        Returns the ids and the columns as in MEASUREMENT_DTYPE.
+        """
+        query = select(
+            Measurement.id,
+            *(getattr(Measurement, name) for name in MEASUREMENT_DTYPE.names),
+        ).where(Measurement.rts_job_key == job_key(job_id))
+
+        if after_timestamp is not None and after_id is not None:
+            # the range condition alone can use the composite index
+            query = query.where(
+                Measurement.controller_timestamp >= after_timestamp,
+                or_(
+                    Measurement.controller_timestamp > after_timestamp,
+                    Measurement.id > after_id,
+                ),
+            )
+        elif after_timestamp is not None:
+            query = query.where(Measurement.controller_timestamp > after_timestamp)
+
+        query = query.order_by(
+            Measurement.controller_timestamp.asc(), Measurement.id.asc()
+        ).limit(limit)
+
+        result = self.db.connection().execute(query)
+        page = np.array(
+            result.cursor.fetchall(),
+            dtype=[("id", np.int64)] + MEASUREMENT_DTYPE.descr,
+        )
+        return page["id"], page[list(MEASUREMENT_DTYPE.names)]
+
+    def iter_measurement_rows(
+        self, job_id: UUID, chunk_size: int = 5000
+    ) -> Iterator[list[tuple]]:
+        """
+        Stream the measurements of a job ordered by sensor time in chunks
+        from a server-side cursor, columns as in MEASUREMENT_DTYPE
+        """
+        query = (
+            select(*(getattr(Measurement, name) for name in MEASUREMENT_DTYPE.names))
+            .where(Measurement.rts_job_key == job_key(job_id))
+            .order_by(
+                Measurement.sensor_timestamp.asc(),
+                Measurement.controller_timestamp.asc(),
+            )
+        )
+        result = (
+            self.db.connection()
+            .execution_options(stream_results=True, max_row_buffer=chunk_size)
+            .execute(query)
+        )
+        for rows in result.partitions(chunk_size):
+            yield rows
+
+    def has_measurements(self, job_id: UUID) -> bool:
+        return self.db.query(
+            exists().where(Measurement.rts_job_key == job_key(job_id))
+        ).scalar()
+
     def delete_measurements(self, job_id: UUID) -> None:
-        self.db.query(Measurement).filter(Measurement.rts_job_id == job_id).delete()
+        self.db.query(Measurement).filter(
+            Measurement.rts_job_key == job_key(job_id)
+        ).delete()
         self.db.commit()
 
+    def delete_measurement_chunk(self, job_id: UUID, chunk_size: int) -> int:
+        """
+        Delete up to chunk_size measurements of a job in their own transaction,
+        returns the number of deleted rows
+        """
+        chunk = (
+            select(Measurement.id)
+            .where(Measurement.rts_job_key == job_key(job_id))
+            .limit(chunk_size)
+            .scalar_subquery()
+        )
+        result = self.db.execute(delete(Measurement).where(Measurement.id.in_(chunk)))
+        self.db.commit()
+        return result.rowcount
+
     def get_latest_measurement(self) -> Measurement:
         return (
             self.db.query(Measurement)
@@ -82,31 +273,28 @@ class MeasurementRepository:
     def get_last_measurement_of_rts(self, rts_id: UUID) -> Measurement:
         return (
             self.db.query(Measurement)
-            .filter(Measurement.rts_id == rts_id)
+            .filter(Measurement.rts_key == rts_key(rts_id))
             .order_by(Measurement.controller_timestamp.desc())
             .first()
         )
 
-    def get_number_of_measurements_for_job(self, job_id: UUID) -> int:
-        return (
-            self.db.query(Measurement).filter(Measurement.rts_job_id == job_id).count()
+    def get_last_measurements_of_all_rts(self) -> list[Measurement]:
+        """Get the latest measurement of every RTS that has measurements"""
+        subquery = (
+            self.db.query(
+                Measurement.rts_key,
+                func.max(Measurement.controller_timestamp).label("max_timestamp"),
+            )
+            .group_by(Measurement.rts_key)
+            .subquery()
         )
 
-    def get_datarate_for_job(self, job_id: UUID) -> float:
-        measurements = (
+        return (
             self.db.query(Measurement)
-            .filter(Measurement.rts_job_id == job_id)
-            .order_by(Measurement.controller_timestamp.asc())
-            .limit(100)
+            .join(
+                subquery,
+                (Measurement.rts_key == subquery.c.rts_key)
+                & (Measurement.controller_timestamp == subquery.c.max_timestamp),
+            )
             .all()
         )
-        if len(measurements) < 2:
-            return 0.0
-
-        time_span = (
-            measurements[-1].controller_timestamp - measurements[0].controller_timestamp
-        )
-        if time_span <= 0:
-            return 0.0
-
-        return len(measurements) / time_span
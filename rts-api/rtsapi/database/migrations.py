@@ -0,0 +1,306 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import Connection, Engine, MetaData, inspect, text
+
+from rtsapi.database.postgres import (MEASUREMENT_PARTITION_DAYS,
+                                      create_partitioned_measurements,
+                                      is_postgresql)
+
+logger = logging.getLogger("root")
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+    # rewrites large tables, the freed pages are returned with VACUUM
+    vacuum: bool = False
+
+
+def column_exists(connection: Connection, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(connection).get_columns(table)}
+
+
+def add_column(connection: Connection, table: str, column: str, definition: str) -> bool:
+    """Add a column unless it exists, returns whether it was added"""
+    if column_exists(connection, table, column):
+        return False
+
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+    return True
+
+
+def add_job_statistics(connection: Connection) -> None:
+    added = [
+        add_column(connection, "rts_jobs", "first_timestamp", "FLOAT"),
+        add_column(connection, "rts_jobs", "last_timestamp", "FLOAT"),
+        add_column(connection, "rts_jobs", "num_geocom_errors", "INTEGER DEFAULT 0 NOT NULL"),
+        add_column(connection, "rts_jobs", "num_rpc_errors", "INTEGER DEFAULT 0 NOT NULL"),
+    ]
+    # databases that already got the columns maintain the aggregates
+    if not any(added):
+        return
+
+    connection.execute(
+        text(
+            """
+            UPDATE rts_jobs SET
+                num_measurements = (
+                    SELECT COUNT(*) FROM measurements
+                    WHERE measurements.rts_job_id = rts_jobs.id
+                ),
+                first_timestamp = (
+                    SELECT MIN(controller_timestamp) FROM measurements
+                    WHERE measurements.rts_job_id = rts_jobs.id
+                ),
+                last_timestamp = (
+                    SELECT MAX(controller_timestamp) FROM measurements
+                    WHERE measurements.rts_job_id = rts_jobs.id
+                ),
+                num_geocom_errors = (
+                    SELECT COUNT(*) FROM measurements
+                    WHERE measurements.rts_job_id = rts_jobs.id
+                    AND geocom_return_code != 0
+                ),
+                num_rpc_errors = (
+                    SELECT COUNT(*) FROM measurements
+                    WHERE measurements.rts_job_id = rts_jobs.id
+                    AND rpc_return_code != 0
+                )
+            """
+        )
+    )
+
+
+def add_composite_indexes(connection: Connection) -> None:
+    # measurements are always read per job or RTS ordered by time, the
+    # single-column indexes are prefixes of the composite ones
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_measurements_rts_job_id_controller_timestamp "
+        "ON measurements (rts_job_id, controller_timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_measurements_rts_id_controller_timestamp "
+        "ON measurements (rts_id, controller_timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_rts_jobs_status_rts_id ON rts_jobs (status, rts_id)",
+        "DROP INDEX IF EXISTS ix_measurements_rts_job_id",
+        "DROP INDEX IF EXISTS ix_measurements_rts_id",
+    ]
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def add_compact_keys(connection: Connection) -> None:
+    if is_postgresql(connection):
+        add_compact_keys_postgresql(connection)
+    elif connection.dialect.name == "sqlite":
+        add_compact_keys_sqlite(connection)
+    else:
+        raise RuntimeError(
+            f"Migrating a {connection.dialect.name} database to compact keys is "
+            "not supported, only SQLite and PostgreSQL"
+        )
+
+
+def add_compact_keys_sqlite(connection: Connection) -> None:
+    # every RTS and job gets its rowid as compact key, the measurements table
+    # is rebuilt with the keys instead of the UUID strings
+    for table, index in (("rts", "ix_rts_key"), ("rts_jobs", "ix_rts_jobs_key")):
+        add_column(connection, table, "key", "INTEGER DEFAULT 0 NOT NULL")
+        connection.execute(text(f'UPDATE {table} SET "key" = rowid'))
+        connection.execute(text(f'CREATE UNIQUE INDEX {index} ON {table} ("key")'))
+
+    statements = [
+        "ALTER TABLE measurements RENAME TO measurements_uuid",
+        """
+        CREATE TABLE measurements (
+            id INTEGER NOT NULL,
+            controller_timestamp FLOAT NOT NULL,
+            sensor_timestamp FLOAT NOT NULL,
+            response_length INTEGER NOT NULL,
+            geocom_return_code INTEGER NOT NULL,
+            rpc_return_code INTEGER NOT NULL,
+            distance FLOAT NOT NULL,
+            horizontal_angle FLOAT NOT NULL,
+            vertical_angle FLOAT NOT NULL,
+            rts_key INTEGER,
+            rts_job_key INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(rts_key) REFERENCES rts ("key") ON DELETE CASCADE,
+            FOREIGN KEY(rts_job_key) REFERENCES rts_jobs ("key") ON DELETE CASCADE
+        )
+        """,
+        # measurements of jobs that no longer exist are dropped
+        """
+        INSERT INTO measurements
+        SELECT
+            m.id, m.controller_timestamp, m.sensor_timestamp, m.response_length,
+            m.geocom_return_code, m.rpc_return_code, m.distance,
+            m.horizontal_angle, m.vertical_angle, rts."key", rts_jobs."key"
+        FROM measurements_uuid AS m
+        JOIN rts_jobs ON rts_jobs.id = m.rts_job_id
+        LEFT JOIN rts ON rts.id = m.rts_id
+        ORDER BY m.id
+        """,
+        "DROP TABLE measurements_uuid",
+        "CREATE INDEX ix_measurements_rts_job_key_controller_timestamp "
+        "ON measurements (rts_job_key, controller_timestamp)",
+        "CREATE INDEX ix_measurements_rts_key_controller_timestamp "
+        "ON measurements (rts_key, controller_timestamp)",
+    ]
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def add_compact_keys_postgresql(connection: Connection) -> None:
+    # the keys are numbered in creation order, the measurements get the key
+    # columns next to the UUIDs, which are dropped once the keys are filled
+    for table, order, index in (
+        ("rts", "id", "ix_rts_key"),
+        ("rts_jobs", "created_at, id", "ix_rts_jobs_key"),
+    ):
+        add_column(connection, table, "key", "INTEGER")
+        connection.execute(
+            text(
+                f"""
+                UPDATE {table} SET "key" = numbered.new_key
+                FROM (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY {order}) AS new_key
+                    FROM {table}
+                ) AS numbered
+                WHERE {table}.id = numbered.id
+                """
+            )
+        )
+        connection.execute(text(f'ALTER TABLE {table} ALTER COLUMN "key" SET NOT NULL'))
+        connection.execute(text(f'CREATE UNIQUE INDEX {index} ON {table} ("key")'))
+
+    statements = [
+        'ALTER TABLE measurements ADD COLUMN rts_key INTEGER '
+        'REFERENCES rts ("key") ON DELETE CASCADE',
+        'ALTER TABLE measurements ADD COLUMN rts_job_key INTEGER '
+        'REFERENCES rts_jobs ("key") ON DELETE CASCADE',
+        """
+        UPDATE measurements SET rts_job_key = rts_jobs."key"
+        FROM rts_jobs WHERE rts_jobs.id = measurements.rts_job_id
+        """,
+        """
+        UPDATE measurements SET rts_key = rts."key"
+        FROM rts WHERE rts.id = measurements.rts_id
+        """,
+        # measurements of jobs that no longer exist are dropped
+        "DELETE FROM measurements WHERE rts_job_key IS NULL",
+        "ALTER TABLE measurements ALTER COLUMN rts_job_key SET NOT NULL",
+        # drops the indexes on the UUID columns as well
+        "ALTER TABLE measurements DROP COLUMN rts_job_id, DROP COLUMN rts_id",
+        "CREATE INDEX ix_measurements_rts_job_key_controller_timestamp "
+        "ON measurements (rts_job_key, controller_timestamp)",
+        "CREATE INDEX ix_measurements_rts_key_controller_timestamp "
+        "ON measurements (rts_key, controller_timestamp)",
+    ]
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def add_job_leases(connection: Connection) -> None:
+    # the type the Uuid column of the model maps to
+    uuid_type = "UUID" if is_postgresql(connection) else "CHAR(32)"
+    add_column(connection, "rts_jobs", "lease_id", uuid_type)
+    add_column(connection, "rts_jobs", "lease_expires_at", "FLOAT")
+
+
+def add_key_sequences(connection: Connection) -> None:
+    # the sequences continue after the keys issued so far, the tables and
+    # sequences themselves were created from the models
+    for table in ("rts", "rts_jobs"):
+        if is_postgresql(connection):
+            connection.execute(
+                text(
+                    f"SELECT setval('{table}_key_seq', "
+                    f'COALESCE(MAX("key"), 0) + 1, false) FROM {table}'
+                )
+            )
+        else:
+            connection.execute(
+                text(
+                    f"""
+                    INSERT INTO key_sequences (name, value)
+                    SELECT '{table}', COALESCE(MAX("key"), 0) FROM {table} WHERE true
+                    ON CONFLICT (name) DO UPDATE
+                    SET value = MAX(value, excluded.value)
+                    """
+                )
+            )
+
+
+MIGRATIONS = [
+    Migration(1, "Add running job statistics", add_job_statistics),
+    Migration(2, "Add composite indexes for the hot queries", add_composite_indexes),
+    Migration(
+        3, "Reference jobs and RTS by compact keys", add_compact_keys, vacuum=True
+    ),
+    Migration(4, "Add leases of claimed jobs", add_job_leases),
+    Migration(5, "Issue compact keys from sequences", add_key_sequences),
+]
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(connection: Connection) -> int:
+    connection.execute(
+        text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    )
+    version = connection.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def set_schema_version(connection: Connection, version: int) -> None:
+    connection.execute(text("DELETE FROM schema_version"))
+    connection.execute(
+        text("INSERT INTO schema_version (version) VALUES (:version)"),
+        {"version": version},
+    )
+
+
+def migrate(engine: Engine, metadata: MetaData) -> None:
+    """
+    Create missing tables and bring an existing database to SCHEMA_VERSION.
+
+    A new database is created from the models in their latest state, so it
+    is only stamped. On PostgreSQL its measurements table is partitioned by
+    time if MEASUREMENT_PARTITION_DAYS is set. Every migration runs in its
+    own transaction together with the version update.
+    """
+    is_new_database = not inspect(engine).has_table("rts_jobs")
+    if is_new_database and is_postgresql(engine) and MEASUREMENT_PARTITION_DAYS > 0:
+        metadata.create_all(
+            bind=engine,
+            tables=[table for table in metadata.sorted_tables if table.name != "measurements"],
+        )
+        with engine.begin() as connection:
+            create_partitioned_measurements(connection, metadata.tables["measurements"])
+    metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        version = get_schema_version(connection)
+        if is_new_database:
+            set_schema_version(connection, SCHEMA_VERSION)
+            return
+
+    vacuum = False
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+
+        with engine.begin() as connection:
+            logger.info(
+                f"Migrating database to version {migration.version}: {migration.description}"
+            )
+            migration.upgrade(connection)
+            set_schema_version(connection, migration.version)
+        vacuum |= migration.vacuum
+
+    if vacuum and engine.dialect.name == "sqlite":
+        logger.info("Reclaiming free space of the database")
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM"))
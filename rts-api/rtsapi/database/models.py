@@ -1,12 +1,44 @@
 import uuid
-from typing import List
+from typing import Callable, List
 
-from sqlalchemy import JSON, ForeignKey, Uuid
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (JSON, BigInteger, ForeignKey, Index, Integer, Sequence,
+                        Uuid, select, text)
+from sqlalchemy.engine import ExecutionContext
+from sqlalchemy.orm import Mapped, column_property, mapped_column, relationship
 
 from rtsapi.database import Base
 
 
+class KeySequence(Base):
+    """Last compact key of a table, SQLite has no sequences"""
+
+    __tablename__ = "key_sequences"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    value: Mapped[int]
+
+
+def next_key(table: str) -> Callable[[ExecutionContext], int]:
+    """
+    Default of the compact key of a table. Drawn from a sequence on
+    PostgreSQL and from the key_sequences row of the table on SQLite, where
+    the upsert holds the write lock. Keys are never issued twice, not even
+    the ones of deleted rows.
+    """
+    sequence = Sequence(f"{table}_key_seq", metadata=Base.metadata)
+    next_value = text(
+        "INSERT INTO key_sequences (name, value) VALUES (:name, 1) "
+        "ON CONFLICT (name) DO UPDATE SET value = value + 1 RETURNING value"
+    )
+
+    def default(context: ExecutionContext) -> int:
+        if context.dialect.supports_sequences:
+            return context.connection.execute(select(sequence.next_value())).scalar_one()
+        return context.connection.execute(next_value, {"name": table}).scalar_one()
+
+    return default
+
+
 class Session(Base):
     __tablename__ = "sessions"
 
@@ -18,13 +50,17 @@ class Session(Base):
     rts: Mapped[List["RTS"]] = relationship(
         back_populates="session",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )  # one-to-many parent
 
 
 class RTS(Base):
     __tablename__ = "rts"
+    __table_args__ = (Index("ix_rts_key", "key", unique=True),)
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid.uuid4)
+    # referenced by the measurements instead of the UUID to keep rows small
+    key: Mapped[int] = mapped_column(default=next_key("rts"))
     name: Mapped[str]
 
     baudrate: Mapped[int]
@@ -61,42 +97,78 @@ class RTS(Base):
     jobs: Mapped[List["RTSJob"]] = relationship(
         back_populates="rts",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )  # one to many parent
     settings: Mapped["TrackingSettings"] = relationship(
         back_populates="rts",
         cascade="all, delete-orphan",
         uselist=False,
         single_parent=True,
+        passive_deletes=True,
     )  # one-to-one parent
 
 
 class RTSJob(Base):
     __tablename__ = "rts_jobs"
+    __table_args__ = (
+        Index("ix_rts_jobs_status_rts_id", "status", "rts_id"),
+        Index("ix_rts_jobs_key", "key", unique=True),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid.uuid4)
+    # referenced by the measurements instead of the UUID to keep rows small
+    key: Mapped[int] = mapped_column(default=next_key("rts_jobs"))
     status: Mapped[str]
     job_type: Mapped[str]
     created_at: Mapped[float]
     finished_at: Mapped[float | None]
     duration: Mapped[float | None]
     datarate: Mapped[float | None]
-    num_measurements: Mapped[int | None]
+    num_measurements: Mapped[int | None] = mapped_column(default=0)
     payload: Mapped[dict] = mapped_column(JSON)
 
+    # running aggregates, maintained while measurements are ingested
+    first_timestamp: Mapped[float | None]
+    last_timestamp: Mapped[float | None]
+    num_geocom_errors: Mapped[int] = mapped_column(default=0)
+    num_rpc_errors: Mapped[int] = mapped_column(default=0)
+
+    # held by the worker that claimed the job, expired leases are re-queued
+    lease_id: Mapped[uuid.UUID | None] = mapped_column(Uuid)
+    lease_expires_at: Mapped[float | None]
+
     rts_id: Mapped[uuid.UUID] = mapped_column(
         Uuid, ForeignKey("rts.id", ondelete="CASCADE"), index=True
     )
     rts: Mapped["RTS"] = relationship(back_populates="jobs")  # one-to-many child
 
+    # children are removed by ON DELETE CASCADE instead of being loaded
     measurements: Mapped[List["Measurement"]] = relationship(
-        back_populates="rts_job", cascade="all, delete-orphan"
+        back_populates="rts_job", cascade="all, delete-orphan", passive_deletes=True
     )  # one-to-many parent
 
 
 class Measurement(Base):
     __tablename__ = "measurements"
+    __table_args__ = (
+        Index(
+            "ix_measurements_rts_job_key_controller_timestamp",
+            "rts_job_key",
+            "controller_timestamp",
+        ),
+        Index(
+            "ix_measurements_rts_key_controller_timestamp",
+            "rts_key",
+            "controller_timestamp",
+        ),
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True)
+    # 64 bit on PostgreSQL, SQLite needs INTEGER for the rowid alias
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
     controller_timestamp: Mapped[float]
     sensor_timestamp: Mapped[float]
     response_length: Mapped[int]
@@ -105,17 +177,28 @@ class Measurement(Base):
     distance: Mapped[float]
     horizontal_angle: Mapped[float]
     vertical_angle: Mapped[float]
-    rts_id: Mapped[uuid.UUID | None] = mapped_column(
-        Uuid, ForeignKey("rts.id", ondelete="CASCADE"), index=True
+    rts_key: Mapped[int | None] = mapped_column(
+        ForeignKey("rts.key", ondelete="CASCADE")
     )
 
-    rts_job_id: Mapped[uuid.UUID] = mapped_column(
-        Uuid, ForeignKey("rts_jobs.id", ondelete="CASCADE"), index=True
+    rts_job_key: Mapped[int] = mapped_column(
+        ForeignKey("rts_jobs.key", ondelete="CASCADE")
     )
     rts_job: Mapped["RTSJob"] = relationship(
         back_populates="measurements"
     )  # one-to-many child
 
+    # public ids behind the compact keys, read-only
+    rts_id: Mapped[uuid.UUID | None] = column_property(
+        select(RTS.id).where(RTS.key == rts_key).correlate_except(RTS).scalar_subquery()
+    )
+    rts_job_id: Mapped[uuid.UUID] = column_property(
+        select(RTSJob.id)
+        .where(RTSJob.key == rts_job_key)
+        .correlate_except(RTSJob)
+        .scalar_subquery()
+    )
+
 
 class TrackingSettings(Base):
     __tablename__ = "settings"
@@ -151,7 +234,7 @@ class Device(Base):
     last_seen: Mapped[float | None]
 
     rts: Mapped[List["RTS"]] = relationship(
-        back_populates="device", cascade="all, delete"
+        back_populates="device", cascade="all, delete", passive_deletes=True
     )  # one-to-many parent
 
 
@@ -165,7 +248,9 @@ class ExternalSensor(Base):
     last_seen: Mapped[float | None]
 
     measurements: Mapped[List["ExternalSensorMeasurement"]] = relationship(
-        back_populates="external_sensor", cascade="all, delete-orphan"
+        back_populates="external_sensor",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )  # one-to-many parent
 
 
@@ -0,0 +1,163 @@
+import logging
+import math
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Sequence
+
+from sqlalchemy import Connection, Engine, Select, Table, text
+
+logger = logging.getLogger("root")
+
+# length of the controller time ranges of the measurement partitions,
+# 0 keeps a plain table. Only applies when a new database is created.
+MEASUREMENT_PARTITION_DAYS = float(os.getenv("MEASUREMENT_PARTITION_DAYS", "0"))
+# longest wait for the locks of a new partition before the batch is retried
+MEASUREMENT_PARTITION_LOCK_TIMEOUT_MS = int(
+    os.getenv("MEASUREMENT_PARTITION_LOCK_TIMEOUT_MS", "5000")
+)
+
+
+def is_postgresql(bind: Engine | Connection) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+def copy_rows(
+    connection: Connection, table: str, columns: Sequence[str], rows: Iterable[tuple]
+) -> None:
+    """
+    Write rows with COPY FROM STDIN on the DBAPI connection of the given
+    SQLAlchemy connection, so they are part of its transaction
+    """
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    cursor = connection.connection.cursor()
+    try:
+        with cursor.copy(f"COPY {table} ({column_list}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+    finally:
+        cursor.close()
+
+
+def fetch_server_side(
+    connection: Connection, query: Select, chunk_size: int
+) -> Iterator[list[tuple]]:
+    """
+    Run a query on a named cursor, which keeps the result on the server, and
+    fetch it in chunks of plain tuples without building Row objects
+    """
+    compiled = query.compile(
+        dialect=connection.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    cursor = connection.connection.cursor(name=f"rtsapi_{uuid.uuid4().hex}")
+    try:
+        cursor.execute(str(compiled), compiled.params)
+        while rows := cursor.fetchmany(chunk_size):
+            yield rows
+    finally:
+        cursor.close()
+
+
+def create_partitioned_measurements(connection: Connection, table: Table) -> None:
+    """
+    Create the measurements table partitioned by controller time. The
+    partition key has to be part of the primary key, the columns are the
+    same as in the model.
+    """
+    connection.execute(
+        text(
+            """
+            CREATE TABLE measurements (
+                id BIGSERIAL NOT NULL,
+                controller_timestamp DOUBLE PRECISION NOT NULL,
+                sensor_timestamp DOUBLE PRECISION NOT NULL,
+                response_length INTEGER NOT NULL,
+                geocom_return_code INTEGER NOT NULL,
+                rpc_return_code INTEGER NOT NULL,
+                distance DOUBLE PRECISION NOT NULL,
+                horizontal_angle DOUBLE PRECISION NOT NULL,
+                vertical_angle DOUBLE PRECISION NOT NULL,
+                rts_key INTEGER REFERENCES rts ("key") ON DELETE CASCADE,
+                rts_job_key INTEGER NOT NULL REFERENCES rts_jobs ("key") ON DELETE CASCADE,
+                PRIMARY KEY (id, controller_timestamp)
+            ) PARTITION BY RANGE (controller_timestamp)
+            """
+        )
+    )
+    # indexes of the parent are created on every partition
+    for index in table.indexes:
+        index.create(connection)
+
+
+class MeasurementPartitions:
+    """
+    Creates the partitions of the measurements table on demand, before a
+    batch with controller timestamps outside the existing ones is written.
+
+    A new partition clones the foreign keys of the measurements, which locks
+    rts_jobs and rts against writes. The DDL runs on its own connection, so
+    it has to be created before the session that writes the batch touches
+    these tables, otherwise the writer waits on itself.
+    """
+
+    def __init__(self, partition_days: float = MEASUREMENT_PARTITION_DAYS) -> None:
+        self.interval = partition_days * 86400
+        self.lock = threading.Lock()
+        self.starts: set[float] = set()
+        self.is_partitioned: bool | None = None
+
+    def check_partitioned(self, engine: Engine) -> bool:
+        if self.is_partitioned is None:
+            with engine.connect() as connection:
+                self.is_partitioned = bool(
+                    connection.execute(
+                        text(
+                            "SELECT 1 FROM pg_partitioned_table "
+                            "WHERE partrelid = 'measurements'::regclass"
+                        )
+                    ).scalar()
+                )
+            if self.is_partitioned != (self.interval > 0):
+                logger.warning(
+                    "MEASUREMENT_PARTITION_DAYS does not match the existing "
+                    "measurements table, it is only applied to new databases"
+                )
+
+        return self.is_partitioned
+
+    def ensure(self, engine: Engine, timestamps: Iterable[float]) -> None:
+        if not self.check_partitioned(engine) or self.interval <= 0:
+            return
+
+        starts = {math.floor(t / self.interval) * self.interval for t in timestamps}
+        with self.lock:
+            missing = sorted(starts - self.starts)
+            if not missing:
+                return
+
+            # DDL in its own transaction, the partitions stay even if the
+            # batch that needed them is rolled back. The lock timeout turns a
+            # wait on a long read or on the caller's own transaction into an
+            # error instead of a stalled writer.
+            with engine.begin() as connection:
+                connection.execute(
+                    text(
+                        "SET LOCAL lock_timeout = "
+                        f"{MEASUREMENT_PARTITION_LOCK_TIMEOUT_MS}"
+                    )
+                )
+                for start in missing:
+                    name = datetime.fromtimestamp(start, timezone.utc).strftime(
+                        "measurements_%Y%m%d_%H%M"
+                    )
+                    connection.execute(
+                        text(
+                            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF measurements "
+                            f"FOR VALUES FROM ({start!r}) TO ({start + self.interval!r})"
+                        )
+                    )
+            self.starts.update(missing)
+
+
+measurement_partitions = MeasurementPartitions()
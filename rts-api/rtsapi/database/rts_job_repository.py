@@ -1,18 +1,26 @@
 import logging
+import os
 import time
+import uuid
 from uuid import UUID
 
 from fastapi import Depends
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Query, Session
 
 from rtsapi.database.models import RTS, Device, RTSJob
 from rtsapi.dependencies import get_db
 from rtsapi.dtos import RTSJobStatus, RTSJobType
-from rtsapi.exceptions import (RTSJobNotFoundException,
+from rtsapi.exceptions import (RTSJobLeaseLostException,
+                               RTSJobNotFoundException,
                                RTSJobStatusChangeException)
+from rtsapi.measurement_ingest import MeasurementSummary
 
 logger = logging.getLogger("root")
 
+# weight of the newest batch in the rolling data rate of a job
+JOB_DATARATE_SMOOTHING = float(os.getenv("JOB_DATARATE_SMOOTHING", "0.2"))
+
 
 class RTSJobRepository:
 
@@ -72,59 +80,211 @@ class RTSJobRepository:
 
         return query.first()
 
+    def claim_rts_job(
+        self, client_ip: str, job_types: list[RTSJobType], lease_duration: float
+    ) -> RTSJob | None:
+        """
+        Move the oldest pending job of the device to RUNNING under a new
+        lease. The update only applies while the job is still pending, so of
+        concurrent claims exactly one wins and the others try the next job.
+        """
+        while True:
+            candidate = self.fetch_rts_job(client_ip, job_types)
+            if candidate is None:
+                return None
+
+            job_id = candidate.id
+            # the claim starts its own transaction with the write, a stale
+            # read snapshot cannot be upgraded on SQLite
+            self.end_read()
+            lease_id = uuid.uuid4()
+            result = self.db.execute(
+                update(RTSJob)
+                .where(
+                    RTSJob.id == job_id,
+                    RTSJob.status == RTSJobStatus.PENDING.value,
+                )
+                .values(
+                    status=RTSJobStatus.RUNNING.value,
+                    lease_id=lease_id,
+                    lease_expires_at=time.time() + lease_duration,
+                )
+            )
+            self.db.commit()
+
+            if result.rowcount == 1:
+                return self.get_rts_job(job_id)
+
+            logger.debug(f"RTSJob {job_id} was claimed by another worker")
+
+    def renew_rts_job_lease(
+        self, job_id: UUID, lease_id: UUID, lease_duration: float
+    ) -> float:
+        """Extend the lease of a running job, returns the new expiry time"""
+        lease_expires_at = time.time() + lease_duration
+        result = self.db.execute(
+            update(RTSJob)
+            .where(
+                RTSJob.id == job_id,
+                RTSJob.lease_id == lease_id,
+                RTSJob.status == RTSJobStatus.RUNNING.value,
+            )
+            .values(lease_expires_at=lease_expires_at)
+        )
+        self.db.commit()
+
+        if result.rowcount == 0:
+            self.get_rts_job(job_id)
+            raise RTSJobLeaseLostException(job_id)
+
+        return lease_expires_at
+
+    def requeue_expired_rts_jobs(self, now: float) -> list[UUID]:
+        """Put running jobs with an expired lease back to PENDING"""
+        expired = self.db.execute(
+            select(RTSJob.id, RTSJob.lease_id).where(
+                RTSJob.status == RTSJobStatus.RUNNING.value,
+                RTSJob.lease_expires_at < now,
+            )
+        ).all()
+        self.end_read()
+
+        requeued = []
+        for job_id, lease_id in expired:
+            # a heartbeat in between keeps the job
+            result = self.db.execute(
+                update(RTSJob)
+                .where(
+                    RTSJob.id == job_id,
+                    RTSJob.lease_id == lease_id,
+                    RTSJob.lease_expires_at < now,
+                )
+                .values(
+                    status=RTSJobStatus.PENDING.value,
+                    lease_id=None,
+                    lease_expires_at=None,
+                )
+            )
+            self.db.commit()
+            if result.rowcount == 1:
+                requeued.append(job_id)
+
+        return requeued
+
+    def end_read(self) -> None:
+        """End the read transaction, so a waiting request holds no connection"""
+        self.db.rollback()
+
     def get_all_rts_jobs(self) -> list[RTSJob]:
         return self.db.query(RTSJob).order_by(RTSJob.created_at.desc()).all()
 
+    def add_measurement_summary(
+        self, job_id: UUID, summary: MeasurementSummary, commit: bool = True
+    ) -> None:
+        """Add a batch of measurements to the running aggregates of a job"""
+        job = (
+            self.db.query(RTSJob)
+            .filter(RTSJob.id == job_id)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
+        if job is None:
+            raise RTSJobNotFoundException(job_id)
+
+        if job.last_timestamp is not None:
+            num_intervals = summary.num_measurements
+            time_span = summary.last_timestamp - job.last_timestamp
+        else:
+            num_intervals = summary.num_measurements - 1
+            time_span = summary.last_timestamp - summary.first_timestamp
+
+        running = job.status == RTSJobStatus.RUNNING.value
+        if running and num_intervals > 0 and time_span > 0:
+            datarate = num_intervals / time_span
+            job.datarate = (
+                datarate
+                if job.datarate is None
+                else JOB_DATARATE_SMOOTHING * datarate
+                + (1 - JOB_DATARATE_SMOOTHING) * job.datarate
+            )
+
+        job.num_measurements = (job.num_measurements or 0) + summary.num_measurements
+        if job.first_timestamp is None or summary.first_timestamp < job.first_timestamp:
+            job.first_timestamp = summary.first_timestamp
+        if job.last_timestamp is None or summary.last_timestamp > job.last_timestamp:
+            job.last_timestamp = summary.last_timestamp
+        job.num_geocom_errors += summary.num_geocom_errors
+        job.num_rpc_errors += summary.num_rpc_errors
+        if not running:
+            # a batch written after the job ended, e.g. flushed after the
+            # status change, extends the final statistics
+            self.update_job_duration(job)
+
+        if commit:
+            self.db.commit()
+
     def refresh_rts_job_meta(self, job_id: UUID) -> RTSJob:
         job = self.get_rts_job(job_id)
-        measurements = job.measurements
+        self.finalize_job_meta(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def finalize_job_meta(self, job: RTSJob) -> None:
         job.finished_at = time.time()
+        self.update_job_duration(job)
+
+    def update_job_duration(self, job: RTSJob) -> None:
+        """Derive duration and average data rate from the running aggregates"""
         job.duration = (
-            measurements[-1].controller_timestamp - measurements[0].controller_timestamp
-            if measurements
+            job.last_timestamp - job.first_timestamp
+            if job.first_timestamp is not None
             else 0.0
         )
-        num_measurements = len(measurements)
-        job.num_measurements = num_measurements
-        job.datarate = num_measurements / job.duration if job.duration > 0 else 0.0
-        self.db.commit()
-        self.db.refresh(job)
-        return job
+        job.num_measurements = job.num_measurements or 0
+        job.datarate = job.num_measurements / job.duration if job.duration > 0 else 0.0
 
-    def update_rts_job_status(self, job_id: UUID, status: RTSJobStatus) -> RTSJob:
+    def update_rts_job_status(
+        self, job_id: UUID, status: RTSJobStatus, lease_id: UUID | None = None
+    ) -> RTSJob:
         job = self.db.query(RTSJob).filter(RTSJob.id == job_id).first()
 
         if job is None:
             raise RTSJobNotFoundException(job_id)
 
+        if lease_id is not None and job.lease_id != lease_id:
+            raise RTSJobLeaseLostException(job_id)
+
         if not self.verify_status_change(RTSJobStatus(job.status), status):
             raise RTSJobStatusChangeException(job_id, RTSJobStatus(job.status), status)
 
         if status == RTSJobStatus.FINISHED:
-            measurements = job.measurements
-            job.finished_at = time.time()
-            job.duration = (
-                measurements[-1].controller_timestamp
-                - measurements[0].controller_timestamp
-                if measurements
-                else 0.0
-            )
-            num_measurements = len(measurements)
-            job.num_measurements = num_measurements
-            job.datarate = num_measurements / job.duration if job.duration > 0 else 0.0
+            self.finalize_job_meta(job)
+
+        if status != RTSJobStatus.RUNNING:
+            job.lease_id = None
+            job.lease_expires_at = None
 
         job.status = status.value
         self.db.commit()
         self.db.refresh(job)
         return job
 
+    def get_rts_jobs_for_session(self, session_id: UUID) -> list[RTSJob]:
+        return (
+            self.db.query(RTSJob)
+            .join(RTS, RTSJob.rts_id == RTS.id)
+            .filter(RTS.session_id == session_id)
+            .all()
+        )
+
     def delete_rts_job(self, job_id: UUID) -> None:
-        job = self.db.query(RTSJob).filter(RTSJob.id == job_id).first()
+        """Delete the job row, remaining measurements go with ON DELETE CASCADE"""
+        result = self.db.execute(delete(RTSJob).where(RTSJob.id == job_id))
+        self.db.commit()
 
-        if job:
-            self.db.delete(job)
-            self.db.commit()
-        else:
+        if result.rowcount == 0:
             logger.warning(f"No RTSJob found with id {job_id}")
 
     def get_running_rts_job(self, rts_id: UUID) -> RTSJob:
@@ -135,12 +295,14 @@ class RTSJobRepository:
             .first()
         )
 
-    def get_running_rts_jobs(self) -> list[RTSJob]:
-        return (
-            self.db.query(RTSJob)
-            .filter(RTSJob.status == RTSJobStatus.RUNNING.value)
-            .all()
+    def get_running_rts_jobs(self, rts_ids: list[UUID] | None = None) -> list[RTSJob]:
+        query = self.db.query(RTSJob).filter(
+            RTSJob.status == RTSJobStatus.RUNNING.value
         )
+        if rts_ids is not None:
+            query = query.filter(RTSJob.rts_id.in_(rts_ids))
+
+        return query.all()
 
     def verify_status_change(
         self, old_status: RTSJobStatus, new_status: RTSJobStatus
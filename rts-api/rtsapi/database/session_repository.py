@@ -1,6 +1,7 @@
 from uuid import UUID
 
 from fastapi import Depends
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
 
 from rtsapi.database import models
@@ -34,7 +35,7 @@ class SessionRepository:
         return self.db.query(models.Session).all()
 
     def delete_session(self, session_id: UUID) -> None:
-        session = self.get_session(session_id)
-        if session:
-            self.db.delete(session)
-            self.db.commit()
+        """Delete the session row, its RTS, jobs, settings and measurements go
+        with ON DELETE CASCADE"""
+        self.db.execute(delete(models.Session).where(models.Session.id == session_id))
+        self.db.commit()
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable
+from uuid import UUID
+
+DATARATE_WINDOW = float(os.getenv("DATARATE_WINDOW", "10"))
+# gaps longer than this multiple of the current interval count as dropouts
+DATARATE_DROPOUT_FACTOR = float(os.getenv("DATARATE_DROPOUT_FACTOR", "3"))
+
+
+@dataclass
+class DataRate:
+    num_measurements: int = 0
+    instantaneous: float = 0.0
+    window: float = 0.0
+    average: float = 0.0
+    num_dropouts: int = 0
+
+
+class JobDataRate:
+    """
+    Sliding window over the controller timestamps of one job.
+
+    Only the timestamps of the last window are kept, the job average and
+    the dropout count are derived from running aggregates.
+    """
+
+    def __init__(
+        self,
+        num_measurements: int = 0,
+        first_timestamp: float | None = None,
+        last_timestamp: float | None = None,
+        window: float = DATARATE_WINDOW,
+    ) -> None:
+        self.window = window
+        self.timestamps: deque[float] = deque()
+        self.num_measurements = num_measurements
+        self.first_timestamp = first_timestamp
+        self.last_timestamp = last_timestamp
+        self.last_interval: float | None = None
+        self.num_dropouts = 0
+        self.last_received = time.monotonic()
+
+    def window_interval(self) -> float | None:
+        if len(self.timestamps) < 2:
+            return None
+
+        span = self.timestamps[-1] - self.timestamps[0]
+        return span / (len(self.timestamps) - 1) if span > 0 else None
+
+    def add(self, timestamp: float) -> None:
+        if self.last_timestamp is not None:
+            interval = timestamp - self.last_timestamp
+            if interval > 0:
+                expected_interval = self.window_interval()
+                if (
+                    expected_interval is not None
+                    and interval > DATARATE_DROPOUT_FACTOR * expected_interval
+                ):
+                    self.num_dropouts += 1
+                self.last_interval = interval
+
+        self.num_measurements += 1
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+        self.timestamps.append(timestamp)
+        while self.timestamps and self.timestamps[0] < self.last_timestamp - self.window:
+            self.timestamps.popleft()
+
+    def rates(self, now: float) -> DataRate:
+        # a job that stopped sending has no current rate
+        idle = now - self.last_received > self.window
+        window_interval = None if idle else self.window_interval()
+
+        average = 0.0
+        if self.num_measurements > 1 and self.last_timestamp > self.first_timestamp:
+            average = (self.num_measurements - 1) / (
+                self.last_timestamp - self.first_timestamp
+            )
+
+        return DataRate(
+            num_measurements=self.num_measurements,
+            instantaneous=(
+                1 / self.last_interval if self.last_interval and not idle else 0.0
+            ),
+            window=1 / window_interval if window_interval else 0.0,
+            average=average,
+            num_dropouts=self.num_dropouts,
+        )
+
+
+class DataRateTracker:
+    """
+    Data rates of all running jobs, fed by the ingest path, so the RTS
+    status is served without touching the measurements table.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.jobs: dict[UUID, JobDataRate] = {}
+
+    def open_job(
+        self,
+        job_id: UUID,
+        num_measurements: int = 0,
+        first_timestamp: float | None = None,
+        last_timestamp: float | None = None,
+    ) -> None:
+        """Start tracking a job, optionally resuming from its persisted aggregates"""
+        with self.lock:
+            if job_id not in self.jobs:
+                self.jobs[job_id] = JobDataRate(
+                    num_measurements, first_timestamp, last_timestamp
+                )
+
+    def close_job(self, job_id: UUID) -> None:
+        with self.lock:
+            self.jobs.pop(job_id, None)
+
+    def record(self, job_id: UUID, timestamps: Iterable[float]) -> None:
+        with self.lock:
+            job_datarate = self.jobs.get(job_id)
+            if job_datarate is None:
+                return
+
+            for timestamp in timestamps:
+                job_datarate.add(timestamp)
+            job_datarate.last_received = time.monotonic()
+
+    def get(self, job_id: UUID) -> DataRate:
+        with self.lock:
+            job_datarate = self.jobs.get(job_id)
+            if job_datarate is None:
+                return DataRate()
+
+            return job_datarate.rates(time.monotonic())
+
+    def get_all(self) -> dict[UUID, DataRate]:
+        with self.lock:
+            now = time.monotonic()
+            return {
+                job_id: job_datarate.rates(now)
+                for job_id, job_datarate in self.jobs.items()
+            }
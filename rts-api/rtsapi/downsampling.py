@@ -0,0 +1,127 @@
+import numpy as np
+
+from rtsapi.dtos import DownsamplingMethod
+from rtsapi.rts_observations import RTSObservations
+
+
+def normalize(values: np.ndarray) -> np.ndarray:
+    """Scale every column to [0, 1], so all channels weigh the same"""
+    minimum = values.min(axis=0)
+    value_range = values.max(axis=0) - minimum
+    value_range[value_range == 0] = 1.0
+    return (values - minimum) / value_range
+
+
+def stride_indices(num_points: int, target_points: int) -> np.ndarray:
+    return np.unique(np.linspace(0, num_points - 1, target_points).round().astype(int))
+
+
+def minmax_indices(signals: np.ndarray, target_points: int) -> np.ndarray:
+    """
+    Keeps the first and last point and the minimum and maximum of every
+    channel per bucket, so spikes survive the decimation. Every bucket
+    holds up to two points per channel, so the number of buckets is chosen
+    to return at most target_points.
+    """
+    num_points, num_channels = signals.shape
+    inner = signals[1 : num_points - 1]
+    num_buckets = (target_points - 2) // (2 * num_channels)
+    if num_buckets == 0:
+        # no room for both extremes of every channel, the extremes of the
+        # earlier channels are kept first, the one further off the mean first
+        extremes = np.column_stack([inner.argmin(axis=0), inner.argmax(axis=0)])
+        mean = inner.mean(axis=0)
+        below = mean - inner.min(axis=0)
+        above = inner.max(axis=0) - mean
+        extremes[above > below] = extremes[above > below, ::-1]
+        extremes = extremes.ravel() + 1
+        _, first = np.unique(extremes, return_index=True)
+        kept = extremes[np.sort(first)][: target_points - 2]
+        return np.unique(np.r_[0, kept, num_points - 1])
+
+    edges = np.unique(np.linspace(1, num_points - 1, num_buckets + 1).astype(int))
+    starts = edges[:-1]
+    buckets = np.repeat(np.arange(len(starts)), np.diff(edges))
+
+    indices = [np.array([0, num_points - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extremes = reduce.reduceat(inner, starts - 1, axis=0)
+        for channel in range(num_channels):
+            hits = np.flatnonzero(inner[:, channel] == extremes[buckets, channel])
+            # first hit of every bucket
+            _, first = np.unique(buckets[hits], return_index=True)
+            indices.append(hits[first] + 1)
+
+    return np.unique(np.concatenate(indices))
+
+
+def lttb_indices(
+    timestamps: np.ndarray, signals: np.ndarray, target_points: int
+) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets on several channels. The triangle areas
+    of all channels are summed after normalizing them to the same range.
+    Only the choice of the point per bucket is sequential, bucket bounds,
+    bucket averages and areas are computed on whole arrays.
+    """
+    num_points = len(timestamps)
+    points = normalize(np.column_stack([timestamps, signals]))
+    t = points[:, 0]
+    s = points[:, 1:]
+
+    edges = np.linspace(1, num_points - 1, target_points - 1).astype(int)
+    sizes = np.diff(edges)
+    # average of the following bucket, the last bucket looks at the last point
+    t_next = np.r_[np.add.reduceat(t[1:-1], edges[:-1] - 1)[1:] / sizes[1:], t[-1]]
+    s_next = np.r_[
+        np.add.reduceat(s[1:-1], edges[:-1] - 1, axis=0)[1:] / sizes[1:, None],
+        s[-1:],
+    ]
+
+    indices = np.empty(target_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = num_points - 1
+    selected = 0
+    for bucket, (start, stop) in enumerate(zip(edges[:-1], edges[1:])):
+        t_a, s_a = t[selected], s[selected]
+        areas = np.abs(
+            (t_a - t_next[bucket]) * (s[start:stop] - s_a)
+            - (t_a - t[start:stop, None]) * (s_next[bucket] - s_a)
+        ).sum(axis=1)
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+
+    return indices
+
+
+def downsample_indices(
+    rts_observations: RTSObservations,
+    method: DownsamplingMethod,
+    target_points: int,
+    start: int = 0,
+    stop: int | None = None,
+) -> np.ndarray:
+    """
+    Positions of at most target_points observations between start and stop,
+    chosen by distance, horizontal and vertical angle over controller time
+    """
+    stop = len(rts_observations) if stop is None else stop
+    num_points = stop - start
+    if num_points <= target_points or target_points < 3:
+        return np.arange(start, stop)
+
+    if method == DownsamplingMethod.STRIDE:
+        return start + stride_indices(num_points, target_points)
+
+    signals = np.column_stack(
+        [
+            rts_observations.distances[start:stop],
+            np.unwrap(rts_observations.h_angles[start:stop]),
+            rts_observations.v_angles[start:stop],
+        ]
+    )
+    if method == DownsamplingMethod.MINMAX:
+        return start + minmax_indices(signals, target_points)
+
+    timestamps = rts_observations.controller_timestamps[start:stop]
+    return start + lttb_indices(timestamps, signals, target_points)
@@ -32,6 +32,30 @@ class RTSJobStatus(Enum):
     FAILED = "failed"
 
 
+class ExportFormat(Enum):
+    PARQUET = "parquet"
+    ARROW = "arrow"
+    NPZ = "npz"
+
+
+class DownsamplingMethod(Enum):
+    LTTB = "lttb"
+    MINMAX = "minmax"
+    STRIDE = "stride"
+
+
+class PurgeTarget(Enum):
+    JOB = "job"
+    SESSION = "session"
+
+
+class PurgeStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+
 class CreateRTSJobRequest(BaseModel):
     rts_id: UUID
     job_type: RTSJobType
@@ -48,13 +72,41 @@ class RTSJobResponse(BaseModel):
     duration: float | None
     num_measurements: int | None
     datarate: float | None
+    num_geocom_errors: int = 0
+    num_rpc_errors: int = 0
+    lease_expires_at: float | None = None
     payload: dict = {}
 
 
+class RTSJobClaimResponse(RTSJobResponse):
+    lease_id: UUID
+    lease_duration: float
+
+
+class RTSJobLeaseResponse(BaseModel):
+    job_id: UUID
+    lease_id: UUID
+    lease_expires_at: float
+    lease_duration: float
+
+
 class RTSJobStatusResponse(BaseModel):
     job_status: RTSJobStatus
 
 
+class PurgeResponse(BaseModel):
+    purge_id: UUID
+    target: PurgeTarget
+    target_id: UUID
+    status: PurgeStatus
+    num_measurements: int
+    num_deleted: int
+    progress: float
+    created_at: float
+    finished_at: float | None
+    error: str | None = None
+
+
 class AddMeasurementRequest(BaseModel):
     controller_timestamp: float
     sensor_timestamp: float
@@ -143,6 +195,23 @@ class TrackingSettingsResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class JobControlType(Enum):
+    STOP = "stop"
+    PAUSE = "pause"
+    RESUME = "resume"
+    SETTINGS = "settings"
+
+
+class JobControlMessage(BaseModel):
+    type: JobControlType
+    settings: TrackingSettingsResponse | None = None
+
+
+class RTSJobPauseResponse(BaseModel):
+    job_id: UUID
+    paused: bool
+
+
 class UpdateTrackingSettingsRequest(BaseModel):
     tmc_measurement_mode: int = 1
     tmc_inclination_mode: int = 1
@@ -213,7 +282,28 @@ class RTSStatus(BaseModel):
     busy: bool = False
     last_measurement: MeasurementResponse | None = None
     num_measurements: int = 0
+    # rate over the last DATARATE_WINDOW seconds
     datarate: float = 0.0
+    instantaneous_datarate: float = 0.0
+    average_datarate: float = 0.0
+    num_dropouts: int = 0
+
+
+class IngestConnectionResponse(BaseModel):
+    id: UUID
+    name: str
+    connected_at: float
+    frames_received: int
+    frames_processed: int
+    queue_depth: int
+    max_queue_depth: int
+    queue_full_count: int
+    rows_written: int
+    batches_written: int
+    last_write_duration: float
+    max_write_duration: float
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TargetPosition(BaseModel):
@@ -0,0 +1,143 @@
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger("root")
+
+# tuning constant for 95% efficiency at normally distributed residuals
+HUBER_K = 1.345
+MAD_TO_SIGMA = 1.4826
+
+
+@dataclass
+class LineFit:
+    """
+    Estimated line y = slope * x + intercept.
+
+    covariance holds the a posteriori covariance of (slope, intercept),
+    residuals are fitted minus observed values and weights are the weights
+    of the final iteration, including robust down-weighting.
+    """
+
+    slope: float
+    intercept: float
+    covariance: np.ndarray
+    sigma0: float
+    residuals: np.ndarray
+    weights: np.ndarray
+    iterations: int = 1
+
+    @property
+    def parameters(self) -> np.ndarray:
+        return np.array([self.slope, self.intercept])
+
+    @property
+    def std_devs(self) -> np.ndarray:
+        return np.sqrt(np.diag(self.covariance))
+
+    @property
+    def num_outliers(self) -> int:
+        """Number of observations that were down-weighted by the robust fit"""
+        return int(np.count_nonzero(self.weights < 1.0))
+
+
+def fit_line(
+    x: np.ndarray, y: np.ndarray, weights: np.ndarray | None = None
+) -> LineFit:
+    """
+    Weighted least-squares line fit in closed form.
+
+    The normal equations of a line only need a handful of weighted sums, so
+    no design or weight matrix is built. The sums are taken about the
+    weighted means, which keeps the solution accurate for large abscissae
+    such as epoch timestamps.
+
+    Raises a ValueError if the slope is not determined, i.e. for fewer than
+    two samples or if all abscissae are equal.
+    """
+    if len(x) < 2:
+        raise ValueError(f"A line fit needs at least two samples, got {len(x)}")
+
+    if weights is None:
+        weights = np.ones(len(x))
+
+    sum_w = weights.sum()
+    mean_x = np.dot(weights, x) / sum_w
+    mean_y = np.dot(weights, y) / sum_w
+    dx = x - mean_x
+    dy = y - mean_y
+    weighted_dx = weights * dx
+    s_xx = np.dot(weighted_dx, dx)
+    s_xy = np.dot(weighted_dx, dy)
+    if not s_xx > 0:
+        raise ValueError("A line fit needs samples at different abscissae")
+
+    slope = s_xy / s_xx
+    intercept = mean_y - slope * mean_x
+    residuals = slope * dx - dy
+
+    redundancy = max(len(x) - 2, 1)
+    sigma0_squared = np.dot(weights * residuals, residuals) / redundancy
+    var_slope = sigma0_squared / s_xx
+    covariance = np.array(
+        [
+            [var_slope, -mean_x * var_slope],
+            [-mean_x * var_slope, sigma0_squared / sum_w + mean_x**2 * var_slope],
+        ]
+    )
+
+    return LineFit(
+        slope=float(slope),
+        intercept=float(intercept),
+        covariance=covariance,
+        sigma0=float(np.sqrt(sigma0_squared)),
+        residuals=residuals,
+        weights=weights,
+    )
+
+
+def fit_line_robust(
+    x: np.ndarray,
+    y: np.ndarray,
+    weights: np.ndarray | None = None,
+    k: float = HUBER_K,
+    max_iterations: int = 50,
+    tolerance: float = 1e-12,
+) -> LineFit:
+    """
+    Huber M-estimation of a line by iteratively reweighted least squares.
+
+    Residuals beyond k times the robust scale (from the median absolute
+    deviation) are down-weighted by k * scale / |v|, so single clock
+    outliers do not tilt the drift estimate.
+    """
+    if weights is None:
+        weights = np.ones(len(x))
+
+    fit = fit_line(x, y, weights)
+    robust_weights = np.ones(len(x))
+    abs_residuals = np.empty(len(x))
+
+    for iteration in range(1, max_iterations + 1):
+        np.abs(fit.residuals - np.median(fit.residuals), out=abs_residuals)
+        scale = MAD_TO_SIGMA * np.median(abs_residuals)
+        if scale == 0.0:
+            break
+
+        threshold = k * scale
+        np.abs(fit.residuals, out=abs_residuals)
+        robust_weights.fill(1.0)
+        outliers = abs_residuals > threshold
+        robust_weights[outliers] = threshold / abs_residuals[outliers]
+
+        previous = fit.parameters
+        fit = fit_line(x, y, weights * robust_weights)
+        fit.iterations = iteration
+        change = np.abs(fit.parameters - previous)
+        if np.all(change <= tolerance * np.maximum(np.abs(previous), 1.0)):
+            break
+    else:
+        logger.warning("Robust line fit did not converge!")
+
+    return fit
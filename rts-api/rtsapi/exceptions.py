@@ -13,6 +13,7 @@ class RTSNotFoundException(Exception):
 
 class RTSJobNotFoundException(Exception):
     def __init__(self, job_id: UUID):
+        self.job_id = job_id
         super().__init__(f"Not Found: RTS Job with id {job_id} does not exist")
 
 
@@ -30,6 +31,18 @@ class RTSJobStatusChangeException(Exception):
         )
 
 
+class RTSJobNotRunningException(Exception):
+    def __init__(self, job_id: UUID):
+        super().__init__(f"Conflict: RTS Job with id {job_id} is not running")
+
+
+class RTSJobLeaseLostException(Exception):
+    def __init__(self, job_id: UUID):
+        super().__init__(
+            f"Conflict: Lease of RTS Job with id {job_id} expired or is held by another worker"
+        )
+
+
 class ExternalSensorNotFoundException(Exception):
     def __init__(self, sensor_id: UUID):
         super().__init__(
@@ -55,3 +68,20 @@ class NoMeasurementsAvailableException(Exception):
 class SessionNotFoundException(Exception):
     def __init__(self, message: str):
         super().__init__(message)
+
+
+class PurgeNotFoundException(Exception):
+    def __init__(self, purge_id: UUID):
+        super().__init__(f"Not Found: Purge with id {purge_id} does not exist")
+
+
+class InvalidCursorException(Exception):
+    def __init__(self, cursor: str):
+        super().__init__(f"Bad Request: Invalid cursor {cursor}")
+
+
+class ExportFormatNotAvailableException(Exception):
+    def __init__(self, export_format: str):
+        super().__init__(
+            f"Not Implemented: Export format {export_format} requires pyarrow to be installed"
+        )
@@ -5,9 +5,14 @@ from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 
 from rtsapi.exceptions import (DeviceNotFoundException,
+                               ExportFormatNotAvailableException,
                                ExternalSensorNotFoundException,
+                               InvalidCursorException,
                                NoMeasurementsAvailableException,
-                               NoOverlapException, RTSJobNotFoundException,
+                               NoOverlapException, PurgeNotFoundException,
+                               RTSJobLeaseLostException,
+                               RTSJobNotFoundException,
+                               RTSJobNotRunningException,
                                RTSJobStatusChangeException,
                                RTSNotFoundException,
                                RTSPortAlreadyExistsException,
@@ -23,12 +28,17 @@ EXCEPTION_MAPPING = {
     RTSPortAlreadyExistsException: 409,
     TrackingSettingsNotFoundException: 404,
     RTSJobStatusChangeException: 409,
+    RTSJobLeaseLostException: 409,
+    RTSJobNotRunningException: 409,
     DeviceNotFoundException: 404,
     PermissionError: 500,
     NoOverlapException: 400,
     ValidationError: 400,
     SessionNotFoundException: 404,
     ExternalSensorNotFoundException: 404,
+    ExportFormatNotAvailableException: 501,
+    InvalidCursorException: 400,
+    PurgeNotFoundException: 404,
 }
 
 
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+from uuid import UUID
+
+from rtsapi.dtos import JobControlMessage, JobControlType, TrackingSettingsResponse
+
+
+class JobControlChannel:
+    """Control messages for one measurement websocket of a job"""
+
+    def __init__(self, job_id: UUID) -> None:
+        self.job_id = job_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[JobControlMessage] = asyncio.Queue()
+
+    def send(self, message: JobControlMessage) -> None:
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    async def get(self) -> JobControlMessage:
+        return await self.queue.get()
+
+
+class JobControl:
+    """
+    Pushes stop, pause and settings changes to the workers of running jobs
+    over the websocket they stream their measurements on, so they do not
+    have to poll the job status.
+
+    Messages are sent from request handlers and background threads such as
+    the purge. State changes and their messages happen under one lock, so a
+    worker that connects meanwhile gets them in order.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.channels: dict[UUID, set[JobControlChannel]] = {}
+        self.paused_job_ids: set[UUID] = set()
+        # settings changed while the job was running, sent again on connect
+        self.settings: dict[UUID, TrackingSettingsResponse] = {}
+
+    @contextmanager
+    def connect(self, job_id: UUID, running: bool) -> Iterator[JobControlChannel]:
+        """
+        Open a channel for a job, starting with the current state of the
+        job, since the worker may have missed changes while disconnected
+        """
+        channel = JobControlChannel(job_id)
+        with self.lock:
+            self.channels.setdefault(job_id, set()).add(channel)
+            for message in self.current_state(job_id, running):
+                channel.send(message)
+        try:
+            yield channel
+        finally:
+            with self.lock:
+                channels = self.channels.get(job_id, set())
+                channels.discard(channel)
+                if not channels:
+                    self.channels.pop(job_id, None)
+
+    def current_state(self, job_id: UUID, running: bool) -> list[JobControlMessage]:
+        if not running:
+            return [JobControlMessage(type=JobControlType.STOP)]
+
+        paused = job_id in self.paused_job_ids
+        messages = [
+            JobControlMessage(
+                type=JobControlType.PAUSE if paused else JobControlType.RESUME
+            )
+        ]
+        if job_id in self.settings:
+            messages.append(
+                JobControlMessage(
+                    type=JobControlType.SETTINGS, settings=self.settings[job_id]
+                )
+            )
+        return messages
+
+    def send(self, job_id: UUID, message: JobControlMessage) -> None:
+        """Send to the channels of a job, the lock has to be held"""
+        for channel in self.channels.get(job_id, ()):
+            channel.send(message)
+
+    def stop(self, job_id: UUID) -> None:
+        with self.lock:
+            self.paused_job_ids.discard(job_id)
+            self.settings.pop(job_id, None)
+            self.send(job_id, JobControlMessage(type=JobControlType.STOP))
+
+    def set_paused(self, job_id: UUID, paused: bool) -> None:
+        with self.lock:
+            if paused:
+                self.paused_job_ids.add(job_id)
+            else:
+                self.paused_job_ids.discard(job_id)
+
+            message_type = JobControlType.PAUSE if paused else JobControlType.RESUME
+            self.send(job_id, JobControlMessage(type=message_type))
+
+    def is_paused(self, job_id: UUID) -> bool:
+        with self.lock:
+            return job_id in self.paused_job_ids
+
+    def change_settings(self, job_id: UUID, settings: TrackingSettingsResponse) -> None:
+        with self.lock:
+            self.settings[job_id] = settings
+            self.send(
+                job_id,
+                JobControlMessage(type=JobControlType.SETTINGS, settings=settings),
+            )
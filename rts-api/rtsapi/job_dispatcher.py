@@ -0,0 +1,70 @@
+import asyncio
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+# longest time a worker may wait in /jobs/fetch for a job of its device
+JOB_FETCH_MAX_WAIT = float(os.getenv("JOB_FETCH_MAX_WAIT", "30"))
+
+
+class JobWaiter:
+    """
+    A worker waiting in a long poll for jobs of its device.
+
+    Notifications set the event until the waiter looks for jobs again, so a
+    job queued between the lookup and the wait is not missed.
+    """
+
+    def __init__(self, device_ip: str) -> None:
+        self.device_ip = device_ip
+        self.loop = asyncio.get_running_loop()
+        self.notified = asyncio.Event()
+
+    def notify(self) -> None:
+        self.loop.call_soon_threadsafe(self.notified.set)
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.notified.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+        self.notified.clear()
+        return True
+
+
+class JobDispatcher:
+    """
+    Wakes the workers waiting for jobs when a job for their device may
+    have been queued, instead of letting them poll the database.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.waiters: dict[str, set[JobWaiter]] = {}
+
+    @contextmanager
+    def waiter(self, device_ip: str) -> Iterator[JobWaiter]:
+        waiter = JobWaiter(device_ip)
+        with self.lock:
+            self.waiters.setdefault(device_ip, set()).add(waiter)
+        try:
+            yield waiter
+        finally:
+            with self.lock:
+                waiters = self.waiters.get(device_ip, set())
+                waiters.discard(waiter)
+                if not waiters:
+                    self.waiters.pop(device_ip, None)
+
+    def notify(self, device_ip: str | None = None) -> None:
+        """Wake the waiters of a device, or all of them if it is unknown"""
+        with self.lock:
+            if device_ip is None:
+                waiters = [w for ws in self.waiters.values() for w in ws]
+            else:
+                waiters = list(self.waiters.get(device_ip, ()))
+
+        for waiter in waiters:
+            waiter.notify()
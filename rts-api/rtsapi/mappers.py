@@ -5,6 +5,7 @@ from rtsapi import dtos
 from rtsapi.database import models
 from rtsapi.database.models import (RTS, Device, Measurement, RTSJob,
                                     TrackingSettings)
+from rtsapi.purge_queue import PurgeTask
 
 
 class SessionMapper:
@@ -30,19 +31,25 @@ class SessionMapper:
 
 class MeasurementMapper:
     @staticmethod
-    def to_db(rts_id: UUID, measurement: dtos.AddMeasurementRequest) -> Measurement:
-        return Measurement(
-            rts_id=rts_id,
-            rts_job_id=measurement.rts_job_id,
-            controller_timestamp=measurement.controller_timestamp,
-            sensor_timestamp=measurement.sensor_timestamp,
-            response_length=measurement.response_length,
-            geocom_return_code=measurement.geocom_return_code,
-            rpc_return_code=measurement.rpc_return_code,
-            distance=measurement.distance,
-            horizontal_angle=measurement.horizontal_angle,
-            vertical_angle=measurement.vertical_angle,
-        )
+    def to_row(rts_id: UUID, measurement: dtos.AddMeasurementRequest) -> dict:
+        return {
+            "rts_id": rts_id,
+            "rts_job_id": measurement.rts_job_id,
+            "controller_timestamp": measurement.controller_timestamp,
+            "sensor_timestamp": measurement.sensor_timestamp,
+            "response_length": measurement.response_length,
+            "geocom_return_code": measurement.geocom_return_code,
+            "rpc_return_code": measurement.rpc_return_code,
+            "distance": measurement.distance,
+            "horizontal_angle": measurement.horizontal_angle,
+            "vertical_angle": measurement.vertical_angle,
+        }
+
+    @staticmethod
+    def request_to_dto(
+        rts_id: UUID, measurement: dtos.AddMeasurementRequest
+    ) -> dtos.MeasurementResponse:
+        return dtos.MeasurementResponse(rts_id=rts_id, **measurement.model_dump())
 
     @staticmethod
     def to_dto(measurement: Measurement) -> dtos.MeasurementResponse:
@@ -129,6 +136,17 @@ class RTSJobMapper:
             duration=rts_job.duration,
             datarate=rts_job.datarate,
             num_measurements=rts_job.num_measurements,
+            num_geocom_errors=rts_job.num_geocom_errors or 0,
+            num_rpc_errors=rts_job.num_rpc_errors or 0,
+            lease_expires_at=rts_job.lease_expires_at,
+        )
+
+    @staticmethod
+    def to_claim_dto(rts_job: RTSJob, lease_duration: float) -> dtos.RTSJobClaimResponse:
+        return dtos.RTSJobClaimResponse(
+            **RTSJobMapper.to_dto(rts_job).model_dump(),
+            lease_id=rts_job.lease_id,
+            lease_duration=lease_duration,
         )
 
     @staticmethod
@@ -142,6 +160,23 @@ class RTSJobMapper:
         )
 
 
+class PurgeMapper:
+    @staticmethod
+    def to_dto(task: PurgeTask) -> dtos.PurgeResponse:
+        return dtos.PurgeResponse(
+            purge_id=task.id,
+            target=task.target,
+            target_id=task.target_id,
+            status=task.status,
+            num_measurements=task.num_measurements,
+            num_deleted=task.num_deleted,
+            progress=task.progress,
+            created_at=task.created_at,
+            finished_at=task.finished_at,
+            error=task.error,
+        )
+
+
 class TrackingSettingsMapper:
     @staticmethod
     def to_dto(tracking_settings: TrackingSettings) -> dtos.TrackingSettingsResponse:
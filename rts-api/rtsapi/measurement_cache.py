@@ -0,0 +1,103 @@
+import threading
+from typing import Any, Callable, Iterable
+from uuid import UUID
+
+from rtsapi.dtos import MeasurementResponse
+from rtsapi.metrics import record_cache_lookup
+
+
+class LatestMeasurementCache:
+    """
+    Write-through cache of the latest measurement per RTS and per job.
+
+    The ingest path updates the cache for every measurement it accepts, so
+    lookups of the latest sample are plain dictionary reads. RTS without a
+    cached entry are loaded once through the given repository function and
+    remembered, including the fact that an RTS has no measurements at all.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.by_job: dict[UUID, MeasurementResponse] = {}
+        self.by_rts: dict[UUID, MeasurementResponse | None] = {}
+        self.stale_rts_ids: set[UUID] = set()
+
+    @staticmethod
+    def is_newer(
+        measurement: MeasurementResponse, current: MeasurementResponse | None
+    ) -> bool:
+        return (
+            current is None
+            or measurement.controller_timestamp >= current.controller_timestamp
+        )
+
+    def update(self, measurement: MeasurementResponse) -> None:
+        with self.lock:
+            if self.is_newer(measurement, self.by_job.get(measurement.rts_job_id)):
+                self.by_job[measurement.rts_job_id] = measurement
+
+            if measurement.rts_id is not None and self.is_newer(
+                measurement, self.by_rts.get(measurement.rts_id)
+            ):
+                self.by_rts[measurement.rts_id] = measurement
+
+    def hydrate(self, measurements: Iterable[MeasurementResponse]) -> None:
+        for measurement in measurements:
+            self.update(measurement)
+
+    def set_rts_without_measurements(self, rts_ids: Iterable[UUID]) -> None:
+        with self.lock:
+            for rts_id in rts_ids:
+                self.by_rts.setdefault(rts_id, None)
+
+    def get_by_job(self, job_id: UUID) -> MeasurementResponse | None:
+        return self.by_job.get(job_id)
+
+    def get_by_rts(
+        self,
+        rts_id: UUID,
+        load: Callable[[UUID], Any],
+    ) -> MeasurementResponse | None:
+        if rts_id in self.by_rts:
+            record_cache_lookup("latest_measurements", True)
+            return self.by_rts[rts_id]
+
+        record_cache_lookup("latest_measurements", False)
+        db_measurement = load(rts_id)
+        measurement = (
+            MeasurementResponse.model_validate(db_measurement)
+            if db_measurement is not None
+            else None
+        )
+        with self.lock:
+            self.stale_rts_ids.discard(rts_id)
+            # the ingest path may have been faster than the database lookup
+            if rts_id not in self.by_rts:
+                self.by_rts[rts_id] = measurement
+            return self.by_rts[rts_id]
+
+    def get_latest(self, load: Callable[[UUID], Any]) -> MeasurementResponse | None:
+        for rts_id in list(self.stale_rts_ids):
+            self.get_by_rts(rts_id, load)
+
+        with self.lock:
+            measurements = [m for m in self.by_rts.values() if m is not None]
+
+        if not measurements:
+            return None
+
+        return max(measurements, key=lambda m: m.controller_timestamp)
+
+    def invalidate_job(self, job_id: UUID) -> None:
+        """Forget a deleted job. RTS whose latest sample belonged to the job
+        are reloaded from the database on their next lookup."""
+        with self.lock:
+            self.by_job.pop(job_id, None)
+            stale_rts_ids = [
+                rts_id
+                for rts_id, measurement in self.by_rts.items()
+                if measurement is not None and measurement.rts_job_id == job_id
+            ]
+            for rts_id in stale_rts_ids:
+                del self.by_rts[rts_id]
+                self.stale_rts_ids.add(rts_id)
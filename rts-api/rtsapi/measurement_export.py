@@ -0,0 +1,120 @@
+import io
+from uuid import UUID
+
+import numpy as np
+
+from rtsapi.dtos import ExportFormat
+from rtsapi.exceptions import ExportFormatNotAvailableException
+from rtsapi.rts_observations import RTSObservations
+
+MEDIA_TYPES = {
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+    ExportFormat.NPZ: "application/octet-stream",
+}
+
+FILE_EXTENSIONS = {
+    ExportFormat.PARQUET: "parquet",
+    ExportFormat.ARROW: "arrows",
+    ExportFormat.NPZ: "npz",
+}
+
+
+def import_pyarrow(export_format: ExportFormat):
+    """pyarrow is only needed for the Parquet and Arrow exports"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportFormatNotAvailableException(export_format.value) from e
+
+    return pyarrow
+
+
+def observations_to_columns(rts_observations: RTSObservations) -> dict[str, np.ndarray]:
+    xyz = rts_observations.xyz
+    return {
+        "controller_timestamp": rts_observations.controller_timestamps,
+        "sensor_timestamp": rts_observations.sensor_timestamps,
+        "distance": rts_observations.distances,
+        "horizontal_angle": rts_observations.h_angles,
+        "vertical_angle": rts_observations.v_angles,
+        "response_length": rts_observations.response_lengths,
+        "geocom_return_code": rts_observations.geo_com_return_codes,
+        "rpc_return_code": rts_observations.rpc_return_codes,
+        "x": xyz[:, 0],
+        "y": xyz[:, 1],
+        "z": xyz[:, 2],
+    }
+
+
+def to_npz(columns: dict[str, np.ndarray]) -> bytes:
+    # uncompressed, so the arrays can be memory-mapped after extracting
+    buffer = io.BytesIO()
+    np.savez(buffer, **columns)
+    return buffer.getvalue()
+
+
+def to_record_batch(
+    pyarrow, columns: dict[str, np.ndarray], rts_id: UUID | None, job_id: UUID
+):
+    num_rows = len(columns["controller_timestamp"])
+    ids = {
+        "rts_id": pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(np.zeros(num_rows, dtype=np.int32)),
+            pyarrow.array(
+                [str(rts_id) if rts_id is not None else None], type=pyarrow.string()
+            ),
+        ),
+        "rts_job_id": pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(np.zeros(num_rows, dtype=np.int32)),
+            pyarrow.array([str(job_id)], type=pyarrow.string()),
+        ),
+    }
+    return pyarrow.record_batch({**ids, **columns})
+
+
+def export_observations(
+    export_format: ExportFormat,
+    rts_observations: RTSObservations,
+    rts_id: UUID | None,
+    job_id: UUID,
+) -> bytes:
+    """Serializes the observations of a single job in the given format"""
+    columns = observations_to_columns(rts_observations)
+    if export_format == ExportFormat.NPZ:
+        return to_npz(columns)
+
+    pyarrow = import_pyarrow(export_format)
+    record_batch = to_record_batch(pyarrow, columns, rts_id, job_id)
+    buffer = pyarrow.BufferOutputStream()
+
+    if export_format == ExportFormat.PARQUET:
+        pyarrow.parquet.write_table(pyarrow.Table.from_batches([record_batch]), buffer)
+    else:
+        with pyarrow.ipc.new_stream(buffer, record_batch.schema) as writer:
+            writer.write_batch(record_batch)
+
+    return buffer.getvalue().to_pybytes()
+
+
+def export_observations_bundle(
+    observations: list[tuple[UUID | None, UUID, RTSObservations]],
+) -> bytes:
+    """
+    Serializes the observations of several jobs as one Arrow IPC stream
+    with one record batch per job, identified by the rts_id and rts_job_id columns
+    """
+    pyarrow = import_pyarrow(ExportFormat.ARROW)
+    record_batches = [
+        to_record_batch(pyarrow, observations_to_columns(rts_observations), rts_id, job_id)
+        for rts_id, job_id, rts_observations in observations
+    ]
+    # all batches share one schema, the id dictionaries are replaced per batch
+    schema = record_batches[0].schema
+    buffer = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(buffer, schema) as writer:
+        for record_batch in record_batches:
+            writer.write_batch(record_batch)
+
+    return buffer.getvalue().to_pybytes()
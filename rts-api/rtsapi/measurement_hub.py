@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+from typing import Iterable
+from uuid import UUID
+
+from rtsapi.dtos import MeasurementResponse
+
+MEASUREMENT_STREAM_RATE = float(os.getenv("MEASUREMENT_STREAM_RATE", "10"))
+
+
+class MeasurementSubscription:
+    """
+    Stream subscriber of the measurement hub.
+
+    Publishing only flags the subscription as dirty, the subscriber decides
+    when to collect the changes. Everything published in between is
+    coalesced into the latest measurement per job.
+    """
+
+    def __init__(self, hub: "MeasurementHub") -> None:
+        self.hub = hub
+        self.loop = asyncio.get_running_loop()
+        self.changed = asyncio.Event()
+        self.version = 0
+
+    def notify(self) -> None:
+        self.loop.call_soon_threadsafe(self.changed.set)
+
+    async def wait(self) -> None:
+        await self.changed.wait()
+        self.changed.clear()
+
+    def collect(self) -> list[MeasurementResponse]:
+        measurements, self.version = self.hub.changes_since(self.version)
+        return measurements
+
+
+class MeasurementHub:
+    """
+    Keeps the latest measurement of every running job in memory and pushes
+    changes to the subscribers of the measurement stream.
+
+    Measurements are published from the ingest path, which may run on the
+    database writer thread, so all state is guarded by a lock.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.running_job_ids: set[UUID] = set()
+        self.latest: dict[UUID, MeasurementResponse] = {}
+        self.versions: dict[UUID, int] = {}
+        self.version = 0
+        self.subscriptions: set[MeasurementSubscription] = set()
+
+    def open_job(self, job_id: UUID) -> None:
+        with self.lock:
+            self.running_job_ids.add(job_id)
+
+    def open_jobs(self, job_ids: Iterable[UUID]) -> None:
+        with self.lock:
+            self.running_job_ids.update(job_ids)
+
+    def close_job(self, job_id: UUID) -> None:
+        with self.lock:
+            self.running_job_ids.discard(job_id)
+            self.latest.pop(job_id, None)
+            self.versions.pop(job_id, None)
+
+    def is_running(self, job_id: UUID) -> bool:
+        with self.lock:
+            return job_id in self.running_job_ids
+
+    def publish(self, measurement: MeasurementResponse) -> None:
+        with self.lock:
+            if measurement.rts_job_id not in self.running_job_ids:
+                return
+
+            self.version += 1
+            self.latest[measurement.rts_job_id] = measurement
+            self.versions[measurement.rts_job_id] = self.version
+            subscriptions = list(self.subscriptions)
+
+        for subscription in subscriptions:
+            subscription.notify()
+
+    def snapshot(self) -> list[MeasurementResponse]:
+        with self.lock:
+            return list(self.latest.values())
+
+    def changes_since(self, version: int) -> tuple[list[MeasurementResponse], int]:
+        with self.lock:
+            changed = [
+                self.latest[job_id]
+                for job_id, job_version in self.versions.items()
+                if job_version > version
+            ]
+            return changed, self.version
+
+    def subscribe(self) -> MeasurementSubscription:
+        subscription = MeasurementSubscription(self)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: MeasurementSubscription) -> None:
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def num_subscriptions(self) -> int:
+        with self.lock:
+            return len(self.subscriptions)
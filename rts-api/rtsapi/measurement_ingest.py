@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import math
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from uuid import UUID
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from rtsapi.metrics import INGEST_BATCH_SIZE, INGEST_FRAMES, INGEST_WRITE_DURATION
+
+MEASUREMENT_FLUSH_INTERVAL = float(os.getenv("MEASUREMENT_FLUSH_INTERVAL", "0.5"))
+MEASUREMENT_MAX_BATCH_SIZE = int(os.getenv("MEASUREMENT_MAX_BATCH_SIZE", "500"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "10000"))
+
+CONNECTION_CLOSED = object()
+
+logger = logging.getLogger("root")
+
+
+class MeasurementBuffer:
+    """
+    Collects the measurement rows received on one websocket connection.
+
+    Rows are written as a single batch once the flush interval has elapsed
+    since the last flush or the maximum batch size is reached. They stay in
+    the buffer until the batch was committed, so a failed flush is retried.
+    The rts_id of every job is resolved once and then kept for the lifetime
+    of the buffer.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = MEASUREMENT_FLUSH_INTERVAL,
+        max_batch_size: int = MEASUREMENT_MAX_BATCH_SIZE,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.rts_ids: dict[UUID, UUID] = {}
+        self.rows: list[dict] = []
+        self.last_flush = time.monotonic()
+        self.flush_failed = False
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def append(self, row: dict) -> None:
+        self.rows.append(row)
+
+    def seconds_until_due(self) -> float | None:
+        """Time left until the buffered rows must be flushed, None if empty"""
+        if not self.rows:
+            return None
+
+        elapsed = time.monotonic() - self.last_flush
+        return max(self.flush_interval - elapsed, 0.0)
+
+    @property
+    def is_due(self) -> bool:
+        # after a failed flush only the interval counts, not every new frame
+        if len(self.rows) >= self.max_batch_size and not self.flush_failed:
+            return True
+
+        return self.seconds_until_due() == 0.0
+
+    def mark_flushed(self, num_rows: int) -> None:
+        """Remove the first rows after they were committed"""
+        del self.rows[:num_rows]
+        self.last_flush = time.monotonic()
+        self.flush_failed = False
+
+    def retry_later(self) -> None:
+        """Keep the rows of a failed flush until the next flush interval"""
+        self.last_flush = time.monotonic()
+        self.flush_failed = True
+
+    def discard_job(self, job_id: UUID) -> int:
+        """Drop the rows of a job, returns how many were dropped"""
+        num_rows = len(self.rows)
+        self.rows = [row for row in self.rows if row["rts_job_id"] != job_id]
+        return num_rows - len(self.rows)
+
+
+@dataclass
+class MeasurementSummary:
+    """Aggregates of a batch of measurements of one job"""
+
+    num_measurements: int = 0
+    first_timestamp: float = math.inf
+    last_timestamp: float = -math.inf
+    num_geocom_errors: int = 0
+    num_rpc_errors: int = 0
+
+    def add(
+        self, controller_timestamp: float, geocom_return_code: int, rpc_return_code: int
+    ) -> None:
+        self.num_measurements += 1
+        self.first_timestamp = min(self.first_timestamp, controller_timestamp)
+        self.last_timestamp = max(self.last_timestamp, controller_timestamp)
+        self.num_geocom_errors += geocom_return_code != 0
+        self.num_rpc_errors += rpc_return_code != 0
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> dict[UUID, "MeasurementSummary"]:
+        summaries: dict[UUID, MeasurementSummary] = {}
+        for row in rows:
+            summary = summaries.get(row["rts_job_id"])
+            if summary is None:
+                summary = summaries[row["rts_job_id"]] = cls()
+
+            summary.add(
+                row["controller_timestamp"],
+                row["geocom_return_code"],
+                row["rpc_return_code"],
+            )
+
+        return summaries
+
+
+class DatabaseWriter:
+    """
+    Dedicated thread that performs all database work of the ingest path.
+
+    Websocket handlers hand their work over and await the result, so the
+    event loop keeps receiving frames while SQLite is busy writing.
+    """
+
+    def __init__(self) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+@dataclass
+class IngestConnectionStats:
+    name: str
+    id: UUID = field(default_factory=uuid.uuid4)
+    connected_at: float = field(default_factory=time.time)
+    frames_received: int = 0
+    frames_processed: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    queue_full_count: int = 0
+    rows_written: int = 0
+    batches_written: int = 0
+    last_write_duration: float = 0.0
+    max_write_duration: float = 0.0
+
+
+class IngestConnection:
+    """
+    Decouples receiving websocket frames from processing them.
+
+    The receiving side only enqueues frames, the processing side drains
+    everything that has queued up in one go and hands it to the writer.
+    """
+
+    def __init__(self, name: str, max_queue_size: int = INGEST_QUEUE_SIZE) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.stats = IngestConnectionStats(name=name)
+        # kind of the connection without the job or sensor, e.g. "rts_job"
+        self.source = name.split(":", 1)[0]
+        self.receiving = True
+        self.closed = False
+
+    async def put(self, frame: Any) -> None:
+        if self.queue.full():
+            self.stats.queue_full_count += 1
+
+        await self.queue.put(frame)
+        self.stats.frames_received += 1
+        INGEST_FRAMES.inc(self.source)
+        self.stats.queue_depth = self.queue.qsize()
+        self.stats.max_queue_depth = max(
+            self.stats.max_queue_depth, self.stats.queue_depth
+        )
+
+    def close(self) -> None:
+        self.receiving = False
+        try:
+            self.queue.put_nowait(CONNECTION_CLOSED)
+        except asyncio.QueueFull:
+            pass
+
+    async def receive(self, websocket: WebSocket) -> None:
+        try:
+            while True:
+                await self.put(await websocket.receive_json())
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            # e.g. a frame that is not JSON, the client has to reconnect
+            logger.error(f"Invalid frame on connection {self.stats.name}: {e}")
+            await self.close_websocket(websocket, status.WS_1008_POLICY_VIOLATION)
+        finally:
+            self.close()
+
+    async def close_websocket(self, websocket: WebSocket, code: int) -> None:
+        try:
+            await websocket.close(code=code)
+        except Exception as e:
+            logger.debug(f"Closing ingest connection {self.stats.name} failed: {e}")
+
+    async def get_frames(self, timeout: float | None = None) -> list[Any]:
+        """
+        Wait for at least one frame and return all frames queued so far.
+        Returns an empty list if the timeout expired or the connection closed.
+        """
+        if self.closed:
+            return []
+
+        try:
+            frames = [await asyncio.wait_for(self.queue.get(), timeout=timeout)]
+        except asyncio.TimeoutError:
+            return []
+
+        while not self.queue.empty():
+            frames.append(self.queue.get_nowait())
+
+        if CONNECTION_CLOSED in frames:
+            frames = [frame for frame in frames if frame is not CONNECTION_CLOSED]
+            self.closed = True
+        elif not self.receiving and self.queue.empty():
+            self.closed = True
+
+        self.stats.frames_processed += len(frames)
+        self.stats.queue_depth = self.queue.qsize()
+        return frames
+
+    def record_write(self, num_rows: int, duration: float) -> None:
+        self.stats.rows_written += num_rows
+        self.stats.batches_written += 1
+        self.stats.last_write_duration = duration
+        self.stats.max_write_duration = max(self.stats.max_write_duration, duration)
+        INGEST_BATCH_SIZE.observe(num_rows, self.source)
+        INGEST_WRITE_DURATION.observe(duration, self.source)
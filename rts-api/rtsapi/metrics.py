@@ -0,0 +1,226 @@
+import bisect
+import math
+import threading
+import time
+from typing import Iterable, Sequence
+
+from fastapi import Request
+
+# upper bounds of the duration histograms in seconds
+DURATION_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# upper bounds of the ingest batch size histogram in rows
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        for value in values
+    )
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def render_metric(
+    name: str,
+    metric_type: str,
+    documentation: str,
+    labelnames: Sequence[str],
+    samples: Iterable[tuple[Sequence[str], float]],
+) -> list[str]:
+    """Lines of a metric in the Prometheus text format"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labelnames, labels)} {format_value(value)}")
+    return lines
+
+
+class Counter:
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self.lock:
+            samples = list(self.values.items())
+        return render_metric(
+            self.name, "counter", self.documentation, self.labelnames, samples
+        )
+
+
+class Histogram:
+    """
+    Counts observations into fixed buckets. Only the per-bucket counts are
+    updated on an observation, the cumulative counts are built on a scrape.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # per label values: counts per bucket plus +Inf, and the sum
+        self.series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> list[str]:
+        with self.lock:
+            series = [
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self.series.items()
+            ]
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        labelnames = self.labelnames + ("le",)
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{format_labels(labelnames, labels + (format_value(bound),))} "
+                    f"{cumulative}"
+                )
+            label_string = format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_string} {format_value(total)}")
+            lines.append(f"{self.name}_count{label_string} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: list[Counter | Histogram] = []
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        counter = Counter(name, documentation, labelnames)
+        self.metrics.append(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> Histogram:
+        histogram = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(histogram)
+        return histogram
+
+    def render(self) -> list[str]:
+        return [line for metric in self.metrics for line in metric.render()]
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "rtsapi_http_request_duration_seconds",
+    "Duration of HTTP requests by route template.",
+    ("method", "route", "status"),
+)
+DATABASE_QUERY_DURATION = registry.histogram(
+    "rtsapi_database_query_duration_seconds",
+    "Duration of database statements by statement type.",
+    ("statement",),
+)
+INGEST_BATCH_SIZE = registry.histogram(
+    "rtsapi_ingest_batch_rows",
+    "Rows written per batch of the websocket ingest.",
+    ("source",),
+    buckets=BATCH_SIZE_BUCKETS,
+)
+INGEST_WRITE_DURATION = registry.histogram(
+    "rtsapi_ingest_write_duration_seconds",
+    "Time from handing frames to the database writer until their batch was written.",
+    ("source",),
+)
+INGEST_FRAMES = registry.counter(
+    "rtsapi_ingest_frames_received_total",
+    "Websocket frames received by the ingest.",
+    ("source",),
+)
+SYNCHRONIZER_UPDATES = registry.counter(
+    "rtsapi_synchronizer_updates_total",
+    "Positions passed to the synchronizer by sensor role.",
+    ("role",),
+)
+CACHE_REQUESTS = registry.counter(
+    "rtsapi_cache_requests_total",
+    "Lookups of the in-memory caches by result.",
+    ("cache", "result"),
+)
+
+STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def statement_type(statement: str) -> str:
+    # all statement types of interest have six letters
+    keyword = statement.lstrip()[:6].upper()
+    return keyword if keyword in STATEMENT_TYPES else "OTHER"
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # the route template keeps the number of label values bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            request.method,
+            getattr(route, "path", "unmatched"),
+            str(status),
+        )
@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable
+from uuid import UUID
+
+import numpy as np
+
+from rtsapi.metrics import record_cache_lookup
+from rtsapi.rts_observations import RTSObservations
+
+logger = logging.getLogger("root")
+
+INTRINSIC_DELAY_CACHE_SIZE = int(os.getenv("INTRINSIC_DELAY_CACHE_SIZE", "64"))
+CORRECTED_OBSERVATIONS_CACHE_SIZE_MB = int(
+    os.getenv("CORRECTED_OBSERVATIONS_CACHE_SIZE_MB", "256")
+)
+CORRECTED_OBSERVATIONS_CACHE_DIR = os.getenv("CORRECTED_OBSERVATIONS_CACHE_DIR", "")
+
+
+class IntrinsicDelayCache:
+    """
+    LRU cache of the converged angular rates of the intrinsic delay correction.
+
+    Entries are keyed by the job, the intrinsic delay and the extent of the
+    observations, so new measurements or a changed delay never hit a stale
+    entry.
+    """
+
+    def __init__(self, max_size: int = INTRINSIC_DELAY_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[Hashable, tuple[np.ndarray, np.ndarray]] = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def key(
+        job_id: UUID, intrinsic_delay: float, sensor_timestamps: np.ndarray
+    ) -> Hashable:
+        return (
+            job_id,
+            intrinsic_delay,
+            len(sensor_timestamps),
+            float(sensor_timestamps[0]),
+            float(sensor_timestamps[-1]),
+        )
+
+    def get(self, key: Hashable) -> tuple[np.ndarray, np.ndarray] | None:
+        with self.lock:
+            angular_rates = self.entries.get(key)
+            if angular_rates is not None:
+                self.entries.move_to_end(key)
+
+        record_cache_lookup("intrinsic_delay", angular_rates is not None)
+        return angular_rates
+
+    def put(self, key: Hashable, angular_rates: tuple[np.ndarray, np.ndarray]) -> None:
+        with self.lock:
+            self.entries[key] = angular_rates
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+class CorrectedObservationCache:
+    """
+    Size-bounded LRU cache of corrected observations.
+
+    Entries are keyed by the job id and the revisions of the job's
+    measurements and of its RTS. Adding measurements to a job or editing the
+    RTS bumps the respective revision, so outdated entries are never hit
+    again and age out of the cache. Revisions must be read before loading
+    the observations and bumped after the change was committed.
+
+    Observations of finished jobs can additionally be spilled to disk, so
+    they survive a restart of the API. As revisions only live in memory,
+    spilled files are validated with a fingerprint of the job and RTS state.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = CORRECTED_OBSERVATIONS_CACHE_SIZE_MB * 1024 * 1024,
+        spill_dir: str = CORRECTED_OBSERVATIONS_CACHE_DIR,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[Hashable, RTSObservations] = OrderedDict()
+        self.nbytes = 0
+        self.job_revisions: dict[UUID, int] = {}
+        self.rts_revisions: dict[UUID, int] = {}
+
+    def key(self, job_id: UUID, rts_id: UUID | None) -> Hashable:
+        with self.lock:
+            return (
+                job_id,
+                self.job_revisions.get(job_id, 0),
+                self.rts_revisions.get(rts_id, 0),
+            )
+
+    def bump_job(self, job_id: UUID) -> None:
+        with self.lock:
+            self.job_revisions[job_id] = self.job_revisions.get(job_id, 0) + 1
+
+    def bump_rts(self, rts_id: UUID) -> None:
+        with self.lock:
+            self.rts_revisions[rts_id] = self.rts_revisions.get(rts_id, 0) + 1
+
+    def get(self, key: Hashable) -> RTSObservations | None:
+        with self.lock:
+            rts_observations = self.entries.get(key)
+            if rts_observations is not None:
+                self.entries.move_to_end(key)
+
+        record_cache_lookup("corrected_observations", rts_observations is not None)
+        return rts_observations
+
+    def put(self, key: Hashable, rts_observations: RTSObservations) -> None:
+        nbytes = rts_observations.nbytes
+        if nbytes > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key).nbytes
+
+            self.entries[key] = rts_observations
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def remove_job(self, job_id: UUID) -> None:
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == job_id]:
+                self.nbytes -= self.entries.pop(key).nbytes
+            self.job_revisions.pop(job_id, None)
+
+        if self.spill_dir:
+            try:
+                os.remove(self.spill_path(job_id))
+            except FileNotFoundError:
+                pass
+
+    def spill_path(self, job_id: UUID) -> str:
+        return os.path.join(self.spill_dir, f"{job_id}.npz")
+
+    def load_spilled(self, job_id: UUID, fingerprint: str) -> RTSObservations | None:
+        if not self.spill_dir:
+            return None
+
+        try:
+            rts_observations, metadata = RTSObservations.load(self.spill_path(job_id))
+        except FileNotFoundError:
+            rts_observations, metadata = None, {}
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring spilled observations of job {job_id}: {e}")
+            rts_observations, metadata = None, {}
+
+        if metadata.get("fingerprint") != fingerprint:
+            rts_observations = None
+
+        record_cache_lookup("corrected_observations_spill", rts_observations is not None)
+        return rts_observations
+
+    def spill(
+        self, job_id: UUID, rts_observations: RTSObservations, fingerprint: str
+    ) -> None:
+        if not self.spill_dir:
+            return
+
+        path = self.spill_path(job_id)
+        # write to a temporary file first, so readers never see partial files
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(temp_path, "wb") as file:
+                rts_observations.save(file, fingerprint=fingerprint)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not spill observations of job {job_id}: {e}")
@@ -0,0 +1,105 @@
+import os
+import threading
+from dataclasses import dataclass
+from uuid import UUID
+
+from rtsapi.metrics import record_cache_lookup
+
+# seconds between the writes of the collected heartbeats to the database
+PRESENCE_FLUSH_INTERVAL = float(os.getenv("PRESENCE_FLUSH_INTERVAL", "5"))
+
+
+@dataclass
+class Presence:
+    id: UUID
+    last_seen: float
+    # last_seen as stored in the database
+    flushed_last_seen: float
+    # only used by external sensors
+    logging_active: bool = True
+
+
+class PresenceRegistry:
+    """
+    Remembers devices or external sensors by IP together with their latest
+    heartbeat, so a heartbeat needs no database access. The heartbeats are
+    written back in one batch every PRESENCE_FLUSH_INTERVAL seconds.
+
+    External sensor samples arrive on the database writer thread, so all
+    state is guarded by a lock.
+    """
+
+    def __init__(self, name: str) -> None:
+        # name of the registry in the cache metrics
+        self.name = name
+        self.lock = threading.Lock()
+        self.by_ip: dict[str, Presence] = {}
+        self.by_id: dict[UUID, Presence] = {}
+
+    def seen(self, ip: str, timestamp: float) -> Presence | None:
+        """Record a heartbeat of a known IP, None if it has to be looked up"""
+        with self.lock:
+            presence = self.by_ip.get(ip)
+            if presence is not None:
+                presence.last_seen = max(presence.last_seen, timestamp)
+
+        record_cache_lookup(self.name, presence is not None)
+        return presence
+
+    def add(
+        self,
+        ip: str,
+        id: UUID,
+        last_seen: float,
+        flushed_last_seen: float,
+        logging_active: bool = True,
+    ) -> Presence:
+        with self.lock:
+            presence = self.by_ip.get(ip)
+            if presence is None or presence.id != id:
+                # the IP may have moved to a new entry
+                if presence is not None:
+                    self.by_id.pop(presence.id, None)
+                presence = Presence(id, last_seen, flushed_last_seen, logging_active)
+                self.by_ip[ip] = presence
+                self.by_id[id] = presence
+            else:
+                presence.last_seen = max(presence.last_seen, last_seen)
+            return presence
+
+    def set_logging_active(self, id: UUID, logging_active: bool) -> None:
+        with self.lock:
+            if id in self.by_id:
+                self.by_id[id].logging_active = logging_active
+
+    def last_seen(self, id: UUID) -> float | None:
+        with self.lock:
+            presence = self.by_id.get(id)
+            return presence.last_seen if presence is not None else None
+
+    def forget(self, id: UUID) -> None:
+        with self.lock:
+            presence = self.by_id.pop(id, None)
+            if presence is not None:
+                self.by_ip = {
+                    ip: entry for ip, entry in self.by_ip.items() if entry is not presence
+                }
+
+    def collect_unflushed(self) -> dict[UUID, float]:
+        """Heartbeats newer than the database"""
+        with self.lock:
+            return {
+                presence.id: presence.last_seen
+                for presence in self.by_id.values()
+                if presence.last_seen > presence.flushed_last_seen
+            }
+
+    def mark_flushed(self, flushed: dict[UUID, float]) -> None:
+        """Record the collected heartbeats once they were committed"""
+        with self.lock:
+            for id, last_seen in flushed.items():
+                presence = self.by_id.get(id)
+                if presence is not None:
+                    presence.flushed_last_seen = max(
+                        presence.flushed_last_seen, last_seen
+                    )
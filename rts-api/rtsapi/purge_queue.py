@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+from uuid import UUID
+
+from rtsapi.dtos import PurgeStatus, PurgeTarget
+
+logger = logging.getLogger("root")
+
+# number of finished purges that are kept for their progress endpoint
+PURGE_HISTORY_SIZE = int(os.getenv("PURGE_HISTORY_SIZE", "100"))
+
+
+@dataclass
+class PurgeTask:
+    target: PurgeTarget
+    target_id: UUID
+    job_ids: list[UUID]
+    num_measurements: int
+    id: UUID = field(default_factory=uuid.uuid4)
+    status: PurgeStatus = PurgeStatus.PENDING
+    num_deleted: int = 0
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    error: str | None = None
+
+    @property
+    def is_done(self) -> bool:
+        return self.status in (PurgeStatus.FINISHED, PurgeStatus.FAILED)
+
+    @property
+    def progress(self) -> float:
+        if self.status == PurgeStatus.FINISHED:
+            return 1.0
+        if self.num_measurements == 0:
+            return 0.0
+
+        return min(self.num_deleted / self.num_measurements, 1.0)
+
+
+class PurgeQueue:
+    """
+    Runs the deletion of jobs and sessions one after another on a dedicated
+    thread, so the HTTP request returns right away and the progress can be
+    polled while the rows are deleted.
+    """
+
+    def __init__(self) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="purge")
+        self.lock = threading.Lock()
+        self.tasks: OrderedDict[UUID, PurgeTask] = OrderedDict()
+
+    def submit(self, task: PurgeTask, purge: Callable[[PurgeTask], None]) -> PurgeTask:
+        """Queue a purge, returns the queued task of the same target if there is one"""
+        with self.lock:
+            for queued in self.tasks.values():
+                if queued.target_id == task.target_id and not queued.is_done:
+                    return queued
+
+            self.tasks[task.id] = task
+            self.prune()
+
+        self.executor.submit(self.run, task, purge)
+        return task
+
+    def run(self, task: PurgeTask, purge: Callable[[PurgeTask], None]) -> None:
+        task.status = PurgeStatus.RUNNING
+        try:
+            purge(task)
+            task.status = PurgeStatus.FINISHED
+            logger.info(
+                f"Purged {task.target.value} {task.target_id}, "
+                f"{task.num_deleted} measurements in {time.time() - task.created_at:.1f} s"
+            )
+        except Exception as e:
+            logger.exception(f"Purging {task.target.value} {task.target_id} failed")
+            task.status = PurgeStatus.FAILED
+            task.error = str(e)
+        finally:
+            task.finished_at = time.time()
+
+    def prune(self) -> None:
+        finished = [task_id for task_id, task in self.tasks.items() if task.is_done]
+        for task_id in finished[: max(len(finished) - PURGE_HISTORY_SIZE, 0)]:
+            del self.tasks[task_id]
+
+    def get(self, purge_id: UUID) -> PurgeTask | None:
+        with self.lock:
+            return self.tasks.get(purge_id)
+
+    def get_all(self) -> list[PurgeTask]:
+        with self.lock:
+            return list(self.tasks.values())
+
+    def pending_target_ids(self) -> set[UUID]:
+        """Jobs and sessions that are queued or being deleted"""
+        with self.lock:
+            return {task.target_id for task in self.tasks.values() if not task.is_done}
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
@@ -1,12 +1,20 @@
+import asyncio
+import logging
+import time
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, Request, WebSocket
 from fastapi.responses import PlainTextResponse
 
+from rtsapi.app_state import AppState
+from rtsapi.dependencies import get_app_state
 from rtsapi.dtos import (AddExternalSensorMeasurementRequest,
                          ExternalSensorResponse)
+from rtsapi.measurement_ingest import IngestConnection
 from rtsapi.services.external_sensor_service import ExternalSensorService
 
+logger = logging.getLogger("root")
+
 router = APIRouter(tags=["External Sensors"])
 
 
@@ -134,15 +142,29 @@ def get_external_sensor_trajectory(
 async def external_sensor_measurement_ws(
     websocket: WebSocket,
     external_sensor_service: ExternalSensorService = Depends(ExternalSensorService),
+    app_state: AppState = Depends(get_app_state),
 ) -> None:
     await websocket.accept()
     client_ip = websocket.client.host
+    database_writer = app_state.database_writer
+    connection = IngestConnection(name=f"external_sensor:{client_ip}")
+    app_state.ingest_connections[connection.stats.id] = connection.stats
+    receiver = asyncio.create_task(connection.receive(websocket))
     try:
-        while True:
-            data = await websocket.receive_json()
-            measurement_request = AddExternalSensorMeasurementRequest(**data)
-            external_sensor_service.add_external_sensor_measurement(
-                client_ip, measurement_request
+        while not connection.closed:
+            frames = await connection.get_frames()
+            if not frames:
+                continue
+
+            start = time.perf_counter()
+            num_rows = await database_writer.run(
+                external_sensor_service.add_external_sensor_measurements_from_ws,
+                client_ip,
+                frames,
             )
-    except WebSocketDisconnect:
-        pass
+            connection.record_write(num_rows, time.perf_counter() - start)
+    except Exception as e:
+        logger.error(f"WebSocket error for external sensor {client_ip}: {e}")
+    finally:
+        receiver.cancel()
+        app_state.ingest_connections.pop(connection.stats.id, None)
@@ -1,18 +1,42 @@
 import asyncio
 import logging
+import time
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
-from rtsapi.dtos import AddMeasurementRequest, MeasurementResponse
-from rtsapi.services.measurement_service import MeasurementRepository
+from rtsapi.app_state import AppState
+from rtsapi.dependencies import get_app_state
+from rtsapi.dtos import (AddMeasurementRequest, DownsamplingMethod,
+                         ExportFormat, IngestConnectionResponse,
+                         MeasurementResponse)
+from rtsapi.job_control import JobControlChannel
+from rtsapi.measurement_hub import MEASUREMENT_STREAM_RATE
+from rtsapi.measurement_ingest import IngestConnection
+from rtsapi.services.measurement_service import (
+    MeasurementRepository, flush_closed_measurement_buffer)
 
 logger = logging.getLogger("root")
 
 router = APIRouter(tags=["Measurements"])
 
 
+async def wait_for_disconnect(websocket: WebSocket) -> None:
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+async def send_control_messages(
+    websocket: WebSocket, channel: JobControlChannel
+) -> None:
+    while True:
+        message = await channel.get()
+        await websocket.send_json(message.model_dump(mode="json"))
+
+
 @router.post(
     "/measurements",
     response_model=MeasurementResponse,
@@ -53,16 +77,42 @@ async def add_static_measurement(
 )
 async def stream_latest_measurements(
     websocket: WebSocket,
-    measurement_service: MeasurementRepository = Depends(MeasurementRepository),
+    rate: float = MEASUREMENT_STREAM_RATE,
+    app_state: AppState = Depends(get_app_state),
 ):
+    """
+    Sends the latest measurement of every running job once and afterwards only
+    the jobs that received new measurements, at most `rate` times per second.
+    """
     await websocket.accept()
+    hub = app_state.measurement_hub
+    subscription = hub.subscribe()
+    interval = 1 / min(max(rate, 0.1), MEASUREMENT_STREAM_RATE)
+    disconnected = asyncio.create_task(wait_for_disconnect(websocket))
     try:
-        while True:
-            latest = measurement_service.get_latest_measurements()
-            await websocket.send_json([m.model_dump(mode="json") for m in latest])
-            await asyncio.sleep(0.001)
+        latest = subscription.collect()
+        await websocket.send_json([m.model_dump(mode="json") for m in latest])
+
+        while not disconnected.done():
+            changed = asyncio.create_task(subscription.wait())
+            await asyncio.wait(
+                [changed, disconnected], return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnected.done():
+                changed.cancel()
+                break
+
+            changes = subscription.collect()
+            if changes:
+                await websocket.send_json([m.model_dump(mode="json") for m in changes])
+
+            # changes published while sleeping are coalesced into the next update
+            await asyncio.sleep(interval)
     except WebSocketDisconnect:
         pass
+    finally:
+        disconnected.cancel()
+        hub.unsubscribe(subscription)
 
 
 @router.websocket(
@@ -71,31 +121,85 @@ async def stream_latest_measurements(
 )
 async def websocket_measurement_endpoint(
     websocket: WebSocket,
-    job_id: str,
+    job_id: UUID,
     measurement_service: MeasurementRepository = Depends(MeasurementRepository),
+    app_state: AppState = Depends(get_app_state),
 ):
+    """
+    Receives the measurements of a job and sends control messages for it
+    back: stop, pause, resume and changed tracking settings. The current
+    state is sent right after connecting, so a worker that reconnects also
+    learns about the changes it missed.
+    """
     await websocket.accept()
     logger.info(f"WebSocket connection accepted for job: {job_id}")
-    try:
-        while True:
-            data = await websocket.receive_json()
-
-            if isinstance(data, list):
-                logger.debug(
-                    f"[WS] Received batch of {len(data)} measurements for job {job_id}"
+    database_writer = app_state.database_writer
+    connection = IngestConnection(name=f"rts_job:{job_id}")
+    receiver = None
+    sender = None
+    measurement_buffer = None
+    running = app_state.measurement_hub.is_running(job_id)
+    with app_state.job_control.connect(job_id, running) as control_channel:
+        try:
+            app_state.ingest_connections[connection.stats.id] = connection.stats
+            receiver = asyncio.create_task(connection.receive(websocket))
+            sender = asyncio.create_task(
+                send_control_messages(websocket, control_channel)
+            )
+            measurement_buffer = await database_writer.run(
+                measurement_service.open_measurement_buffer, job_id
+            )
+            while not connection.closed:
+                frames = await connection.get_frames(
+                    timeout=measurement_buffer.seconds_until_due()
+                )
+                start = time.perf_counter()
+                num_rows = await database_writer.run(
+                    measurement_service.ingest_measurement_frames,
+                    measurement_buffer,
+                    frames,
                 )
-                measurement_service.add_measurements_bulk_from_ws(data)
-            elif isinstance(data, dict):
-                measurement_service.add_measurement_from_ws(data)
-            else:
-                logger.warning(f"[WS] Received unexpected data format: {type(data)}")
+                if num_rows:
+                    connection.record_write(num_rows, time.perf_counter() - start)
 
-    except WebSocketDisconnect:
-        logger.info(f"WebSocket client disconnected for job: {job_id}")
-    except Exception as e:
-        logger.error(f"WebSocket error for job {job_id}: {e}")
-    finally:
-        logger.debug(f"Closing WebSocket connection for job {job_id}")
+            logger.info(f"WebSocket client disconnected for job: {job_id}")
+        except Exception as e:
+            logger.error(f"WebSocket error for job {job_id}: {e}")
+        finally:
+            if receiver is not None:
+                receiver.cancel()
+            if sender is not None:
+                sender.cancel()
+            try:
+                if measurement_buffer is not None and len(measurement_buffer) > 0:
+                    # shielded, a cancelled handler must not abandon the rows
+                    await asyncio.shield(
+                        database_writer.run(
+                            flush_closed_measurement_buffer,
+                            app_state,
+                            measurement_buffer,
+                            job_id,
+                        )
+                    )
+            finally:
+                app_state.ingest_connections.pop(connection.stats.id, None)
+                logger.debug(f"Closing WebSocket connection for job {job_id}")
+
+
+@router.get(
+    "/measurements/ingest",
+    response_model=list[IngestConnectionResponse],
+    summary="List active measurement ingest connections.",
+    response_description="Backpressure statistics of every ingest connection.",
+    responses={
+        200: {"description": "Successfully retrieved ingest connections."},
+        500: {"description": "Internal server error."},
+    },
+)
+async def get_ingest_connections(
+    measurement_service: MeasurementRepository = Depends(MeasurementRepository),
+) -> list[IngestConnectionResponse]:
+    return measurement_service.get_ingest_connections()
 
 
 @router.get(
@@ -127,9 +231,26 @@ async def get_latest_measurements(
 )
 async def get_raw_rts_measurements(
     job_id: UUID,
+    response: Response,
+    cursor: str | None = None,
+    after_timestamp: float | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    target_points: int | None = Query(default=None, ge=3),
+    method: DownsamplingMethod = DownsamplingMethod.LTTB,
     measurement_service: MeasurementRepository = Depends(MeasurementRepository),
 ) -> list[MeasurementResponse]:
-    return measurement_service.get_raw_measurements(job_id=job_id)
+    """
+    Without parameters the full history of the job is returned. Pass the
+    X-Next-Cursor header of the previous response as cursor to only get
+    newer rows, limit pages through the job. target_points decimates the
+    selected rows for plotting with the given method.
+    """
+    measurements, next_cursor = measurement_service.get_raw_measurements(
+        job_id, cursor, after_timestamp, limit, target_points, method
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return measurements
 
 
 @router.get(
@@ -145,28 +266,87 @@ async def get_raw_rts_measurements(
 )
 async def get_corrected_rts_measurements(
     job_id: UUID,
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    target_points: int | None = Query(default=None, ge=3),
+    method: DownsamplingMethod = DownsamplingMethod.LTTB,
     measurement_service: MeasurementRepository = Depends(MeasurementRepository),
 ) -> list[MeasurementResponse]:
-    return measurement_service.get_corrected_measurements(job_id)
+    """
+    Pass the X-Next-Cursor header of the previous response as cursor to
+    only get rows added since then, limit pages through the job.
+    target_points decimates the selected rows for plotting with the given
+    method.
+    """
+    measurements, next_cursor = measurement_service.get_corrected_measurements(
+        job_id, cursor, limit, target_points, method
+    )
+    response.headers["X-Next-Cursor"] = next_cursor
+    return measurements
 
 
 @router.get(
     "/measurements/download/{job_id}",
-    response_class=PlainTextResponse,
+    response_class=StreamingResponse,
     summary="Download measurements for a job.",
     response_description="Measurements file.",
     responses={
-        200: {"description": "Measurements file."},
+        200: {"description": "Measurements file, gzip encoded if requested."},
         404: {"description": "Requested RTS job does not exist."},
         500: {"description": "Internal server error."},
     },
 )
-async def download_measurements(
+def download_measurements(
     job_id: UUID,
     filename: str = None,
+    raw: bool = False,
+    gzip: bool = False,
     measurement_service: MeasurementRepository = Depends(MeasurementRepository),
-) -> PlainTextResponse:
-    return measurement_service.download_measurements(job_id, filename)
+) -> StreamingResponse:
+    return measurement_service.download_measurements(job_id, filename, raw, gzip)
+
+
+@router.get(
+    "/measurements/export",
+    response_class=Response,
+    summary="Export measurements of several jobs or a whole session as Arrow IPC stream.",
+    response_description="Arrow IPC stream with one record batch per job.",
+    responses={
+        200: {"description": "Arrow IPC stream with rts_id and rts_job_id columns."},
+        404: {"description": "Requested jobs or session do not exist or have no measurements."},
+        500: {"description": "Internal server error."},
+        501: {"description": "pyarrow is not installed."},
+    },
+)
+def export_measurements_bundle(
+    job_ids: list[UUID] = Query(default=[]),
+    session_id: UUID = None,
+    raw: bool = False,
+    measurement_service: MeasurementRepository = Depends(MeasurementRepository),
+) -> Response:
+    return measurement_service.export_measurements_bundle(job_ids, session_id, raw)
+
+
+@router.get(
+    "/measurements/export/{job_id}",
+    response_class=Response,
+    summary="Export measurements for a job as Parquet, Arrow IPC stream or NumPy npz.",
+    response_description="Measurements file.",
+    responses={
+        200: {"description": "Measurements file in the requested format."},
+        404: {"description": "Requested RTS job does not exist."},
+        500: {"description": "Internal server error."},
+        501: {"description": "Requested format needs pyarrow, which is not installed."},
+    },
+)
+def export_measurements(
+    job_id: UUID,
+    format: ExportFormat = ExportFormat.PARQUET,
+    raw: bool = False,
+    measurement_service: MeasurementRepository = Depends(MeasurementRepository),
+) -> Response:
+    return measurement_service.export_measurements(job_id, format, raw)
 
 
 @router.get(
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, Response
+
+from rtsapi.metrics import CONTENT_TYPE
+from rtsapi.services.metrics_service import MetricsService
+
+router = APIRouter(tags=["Health"])
+
+
+@router.get(
+    "/metrics",
+    status_code=200,
+    summary="Metrics in the Prometheus text format.",
+    response_description="Request, database, ingest, synchronizer and cache metrics.",
+    responses={
+        200: {"description": "Successfully rendered the metrics."},
+    },
+)
+async def get_metrics(
+    metrics_service: MetricsService = Depends(MetricsService),
+) -> Response:
+    return Response(content=metrics_service.render_metrics(), media_type=CONTENT_TYPE)
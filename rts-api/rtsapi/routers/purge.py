@@ -0,0 +1,41 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends
+
+from rtsapi.dtos import PurgeResponse
+from rtsapi.services.purge_service import PurgeService
+
+router = APIRouter(tags=["Purge"])
+
+
+@router.get(
+    "/purges",
+    response_model=list[PurgeResponse],
+    summary="List queued, running and recently finished deletions.",
+    response_description="A list of purges.",
+    responses={
+        200: {"description": "Successfully retrieved purges."},
+        500: {"description": "Internal server error."},
+    },
+)
+async def get_purges(
+    purge_service: PurgeService = Depends(PurgeService),
+) -> list[PurgeResponse]:
+    return purge_service.get_purges()
+
+
+@router.get(
+    "/purges/{purge_id}",
+    response_model=PurgeResponse,
+    summary="Get the progress of a deletion.",
+    response_description="Requested purge.",
+    responses={
+        200: {"description": "Successfully retrieved purge."},
+        404: {"description": "Requested purge does not exist."},
+        500: {"description": "Internal server error."},
+    },
+)
+async def get_purge(
+    purge_id: UUID, purge_service: PurgeService = Depends(PurgeService)
+) -> PurgeResponse:
+    return purge_service.get_purge(purge_id)
@@ -1,6 +1,9 @@
+import hashlib
+import json
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
 
 from rtsapi.dtos import (CreateRTSRequest, RTSResponse,
                          RTSStatus, TrackingSettingsResponse, UpdateRTSRequest,
@@ -10,6 +13,18 @@ from rtsapi.services.rts_service import RTSService
 router = APIRouter(tags=["RTS"])
 
 
+def conditional_json_response(request: Request, content) -> Response:
+    """JSON response with an ETag, 304 if the client already has this content"""
+    body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get(
     "/rts",
     response_model=list[RTSResponse],
@@ -27,6 +42,27 @@ async def get_all_rts(
     return rts_service.get_all_rts(session_id=session_id)
 
 
+@router.get(
+    "/rts/status",
+    response_model=dict[UUID, RTSStatus],
+    summary="Get the status of all RTS of a session.",
+    response_description="Current status per RTS ID.",
+    responses={
+        200: {"description": "Successfully retrieved RTS status."},
+        304: {"description": "Status unchanged since the given ETag."},
+        500: {"description": "Internal server error."},
+    },
+)
+def get_rts_statuses(
+    request: Request,
+    session_id: UUID | None = None,
+    rts_service: RTSService = Depends(RTSService),
+) -> Response:
+    return conditional_json_response(
+        request, rts_service.get_rts_statuses(session_id=session_id)
+    )
+
+
 @router.get(
     "/rts/{rts_id}",
     response_model=RTSResponse,
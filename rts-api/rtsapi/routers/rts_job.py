@@ -3,9 +3,12 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query, Request, Response
 
-from rtsapi.dtos import (CreateRTSJobRequest, RTSJobResponse, RTSJobStatus,
+from rtsapi.dtos import (CreateRTSJobRequest, PurgeResponse,
+                         RTSJobClaimResponse, RTSJobLeaseResponse,
+                         RTSJobPauseResponse, RTSJobResponse, RTSJobStatus,
                          RTSJobStatusResponse, RTSJobType)
 from rtsapi.services.device_service import DeviceService
+from rtsapi.services.purge_service import PurgeService
 from rtsapi.services.rts_job_service import RTSJobService
 
 router = APIRouter(tags=["RTS Jobs"])
@@ -42,12 +45,18 @@ async def create_rts_job(
 async def fetch_rts_job(
     request: Request,
     job_types: List[RTSJobType] = Query(None),
+    wait: float = Query(default=0.0, ge=0.0),
     rts_job_service: RTSJobService = Depends(RTSJobService),
     device_service: DeviceService = Depends(DeviceService),
 ) -> RTSJobResponse | Response:
+    """
+    Pass `wait` to hold the request open for up to that many seconds
+    (capped by the server) until a job for the device is created, instead
+    of polling.
+    """
     client_ip = request.client.host
     device_service.upsert_device(client_ip)
-    fetchable_job = rts_job_service.fetch_rts_job(client_ip, job_types)
+    fetchable_job = await rts_job_service.fetch_rts_job(client_ip, job_types, wait)
 
     if fetchable_job is None:
         return Response(status_code=204)
@@ -55,6 +64,64 @@ async def fetch_rts_job(
     return fetchable_job
 
 
+@router.post(
+    "/jobs/claim",
+    response_model=RTSJobClaimResponse,
+    summary="Claim next RTS job for device.",
+    response_description="Claimed RTS job with its lease.",
+    responses={
+        200: {"description": "Successfully claimed RTS job."},
+        204: {"description": "No claimable RTS job found."},
+        500: {"description": "Internal server error."},
+    },
+)
+async def claim_rts_job(
+    request: Request,
+    job_types: List[RTSJobType] = Query(None),
+    wait: float = Query(default=0.0, ge=0.0),
+    rts_job_service: RTSJobService = Depends(RTSJobService),
+    device_service: DeviceService = Depends(DeviceService),
+) -> RTSJobClaimResponse | Response:
+    """
+    Set the oldest pending job of the device to running in one step, so two
+    workers never get the same job. The returned lease has to be renewed
+    within `lease_duration` seconds, otherwise the job is pending again.
+    `wait` works like for /jobs/fetch.
+    """
+    client_ip = request.client.host
+    device_service.upsert_device(client_ip)
+    claimed_job = await rts_job_service.claim_rts_job(client_ip, job_types, wait)
+
+    if claimed_job is None:
+        return Response(status_code=204)
+
+    return claimed_job
+
+
+@router.put(
+    "/jobs/{job_id}/lease",
+    response_model=RTSJobLeaseResponse,
+    summary="Renew lease of claimed RTS job.",
+    response_description="Renewed lease.",
+    responses={
+        200: {"description": "Successfully renewed lease."},
+        404: {"description": "Requested RTS job does not exist."},
+        409: {"description": "Lease expired or is held by another worker."},
+        500: {"description": "Internal server error."},
+    },
+)
+async def renew_rts_job_lease(
+    request: Request,
+    job_id: UUID,
+    lease_id: UUID,
+    rts_job_service: RTSJobService = Depends(RTSJobService),
+    device_service: DeviceService = Depends(DeviceService),
+) -> RTSJobLeaseResponse:
+    # the renewals are the heartbeat of a device that is busy with a job
+    device_service.upsert_device(request.client.host)
+    return rts_job_service.renew_rts_job_lease(job_id, lease_id)
+
+
 @router.get(
     "/jobs/status/running",
     response_model=list[RTSJobResponse],
@@ -90,19 +157,22 @@ async def get_job(
 
 @router.delete(
     "/jobs/{job_id}",
-    status_code=204,
+    status_code=202,
+    response_model=PurgeResponse,
     summary="Delete RTS job with ID.",
-    response_description="No content.",
+    description="The job and its measurements are deleted in the background, "
+    "the progress is available at /purges/{purge_id}.",
+    response_description="The queued purge.",
     responses={
-        204: {"description": "Successfully deleted RTS job."},
+        202: {"description": "Successfully queued deletion of RTS job."},
         404: {"description": "Requested RTS job does not exist."},
         500: {"description": "Internal server error."},
     },
 )
 async def delete_rts_job(
-    job_id: UUID, rts_job_service: RTSJobService = Depends(RTSJobService)
-) -> None:
-    return rts_job_service.delete_rts_job(job_id)
+    job_id: UUID, purge_service: PurgeService = Depends(PurgeService)
+) -> PurgeResponse:
+    return purge_service.purge_rts_job(job_id)
 
 
 @router.get(
@@ -151,12 +221,53 @@ async def get_rts_job_status(
     responses={
         200: {"description": "Successfully updated RTS job status."},
         404: {"description": "Requested RTS job does not exist."},
+        409: {"description": "Invalid status change or lease lost."},
         500: {"description": "Internal server error."},
     },
 )
 async def update_rts_job_status(
     job_id: UUID,
     job_status: RTSJobStatus,
+    lease_id: UUID | None = None,
     rts_job_service: RTSJobService = Depends(RTSJobService),
 ) -> RTSJobResponse:
-    return rts_job_service.update_rts_job_status(job_id, job_status)
+    """Pass the lease of a claimed job to reject updates of a worker that lost it."""
+    return rts_job_service.update_rts_job_status(job_id, job_status, lease_id)
+
+
+@router.get(
+    "/jobs/{job_id}/paused",
+    response_model=RTSJobPauseResponse,
+    summary="Get whether RTS job is paused.",
+    response_description="Pause state of the RTS job.",
+    responses={
+        200: {"description": "Successfully retrieved pause state."},
+        404: {"description": "Requested RTS job does not exist."},
+        500: {"description": "Internal server error."},
+    },
+)
+async def get_rts_job_paused(
+    job_id: UUID, rts_job_service: RTSJobService = Depends(RTSJobService)
+) -> RTSJobPauseResponse:
+    return rts_job_service.get_rts_job_paused(job_id)
+
+
+@router.put(
+    "/jobs/{job_id}/paused",
+    response_model=RTSJobPauseResponse,
+    summary="Pause or resume running RTS job.",
+    response_description="New pause state of the RTS job.",
+    responses={
+        200: {"description": "Successfully paused or resumed RTS job."},
+        404: {"description": "Requested RTS job does not exist."},
+        409: {"description": "RTS job is not running."},
+        500: {"description": "Internal server error."},
+    },
+)
+async def set_rts_job_paused(
+    job_id: UUID,
+    paused: bool,
+    rts_job_service: RTSJobService = Depends(RTSJobService),
+) -> RTSJobPauseResponse:
+    """The worker stops taking measurements while paused, the job keeps running."""
+    return rts_job_service.set_rts_job_paused(job_id, paused)
@@ -2,7 +2,8 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends
 
-from rtsapi.dtos import CreateSessionRequest, SessionResponse
+from rtsapi.dtos import CreateSessionRequest, PurgeResponse, SessionResponse
+from rtsapi.services.purge_service import PurgeService
 from rtsapi.services.session_service import SessionService
 
 router = APIRouter(tags=["Session"])
@@ -61,17 +62,20 @@ async def get_session(
 
 @router.delete(
     "/session/{session_id}",
-    status_code=204,
+    status_code=202,
+    response_model=PurgeResponse,
     summary="Delete session with ID.",
-    response_description="No content.",
+    description="The session with its RTS, jobs and measurements is deleted in "
+    "the background, the progress is available at /purges/{purge_id}.",
+    response_description="The queued purge.",
     responses={
-        204: {"description": "Successfully deleted session."},
+        202: {"description": "Successfully queued deletion of session."},
         404: {"description": "Requested session does not exist."},
         500: {"description": "Internal server error."},
     },
 )
 async def delete_session(
     session_id: UUID,
-    session_service: SessionService = Depends(SessionService),
-) -> None:
-    return session_service.delete_session(session_id)
+    purge_service: PurgeService = Depends(PurgeService),
+) -> PurgeResponse:
+    return purge_service.purge_session(session_id)
@@ -1,64 +1,35 @@
 import copy
 import logging
+import os
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Iterable, Tuple
 from uuid import UUID
 
 import numpy as np
 import trajectopy as tpy
-from scipy.sparse import dia_matrix, identity, spdiags
+from scipy.sparse import dia_matrix, spdiags
 
 from rtsapi.dtos import MeasurementResponse
+from rtsapi.estimation import fit_line, fit_line_robust
 
 logger = logging.getLogger("root")
 
+# down-weight clock outliers when fitting the drift of the sensor clock
+ROBUST_CLOCK_DRIFT_FIT = os.getenv("ROBUST_CLOCK_DRIFT_FIT", "false").lower() == "true"
 
-def fit_line_2d(
-    x: np.ndarray, y: np.ndarray, weights: np.ndarray = np.array([])
-) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-    """
-    Fits a 2D line using least-squares
-    """
-    # design matrix
-    A = np.c_[x, np.ones((len(x), 1))]
-
-    if len(weights) == 0:
-        weights = np.ones(len(y))
-
-    sigma_ll = spdiags(weights, 0, len(weights), len(weights))
-
-    # solve normal equation
-    x_s, l_s, v = least_squares(design_matrix=A, observations=y, cov_matrix=sigma_ll)
-
-    return x_s, l_s, v
-
-
-def least_squares(
-    design_matrix: np.ndarray,
-    observations: np.ndarray,
-    cov_matrix: np.ndarray = np.array([]),
-) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-    """
-    Least Squares solver
-    """
-    observations = observations.reshape(
-        len(observations),
-    )
-    if cov_matrix.shape[0] == 0:
-        cov_matrix = identity(len(observations))
-    # solve normal equations
-    x_s = np.linalg.solve(
-        design_matrix.T @ cov_matrix @ design_matrix,
-        design_matrix.T @ cov_matrix @ observations,
-    )
-
-    # approximated observations
-    l_s = design_matrix @ x_s
-
-    # residuals
-    v = l_s - observations
-
-    return x_s, l_s, v
+# column layout of the measurements used to build RTSObservations
+MEASUREMENT_DTYPE = np.dtype(
+    [
+        ("controller_timestamp", np.float64),
+        ("sensor_timestamp", np.float64),
+        ("distance", np.float64),
+        ("horizontal_angle", np.float64),
+        ("vertical_angle", np.float64),
+        ("response_length", np.int64),
+        ("geocom_return_code", np.int64),
+        ("rpc_return_code", np.int64),
+    ]
+)
 
 
 @dataclass
@@ -96,33 +67,75 @@ class RTSObservations:
         measurements: list[MeasurementResponse],
         variances: RTSVarianceConfig = None,
         station: RTSStation = RTSStation(),
+    ) -> None:
+        columns = np.array(
+            [
+                (
+                    m.controller_timestamp,
+                    m.sensor_timestamp,
+                    m.distance,
+                    m.horizontal_angle,
+                    m.vertical_angle,
+                    m.response_length,
+                    m.geocom_return_code,
+                    m.rpc_return_code,
+                )
+                for m in measurements
+            ],
+            dtype=MEASUREMENT_DTYPE,
+        )
+        rts_ids = np.empty(len(measurements), dtype=object)
+        rts_ids[:] = [m.rts_id for m in measurements]
+        rts_job_ids = np.empty(len(measurements), dtype=object)
+        rts_job_ids[:] = [m.rts_job_id for m in measurements]
+        self.set_columns(columns, rts_ids, rts_job_ids, variances, station)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        columns: np.ndarray,
+        rts_id: UUID | None = None,
+        rts_job_id: UUID | None = None,
+        variances: RTSVarianceConfig = None,
+        station: RTSStation = RTSStation(),
+    ) -> "RTSObservations":
+        """
+        Creates the observations of a single job directly from a structured
+        array with MEASUREMENT_DTYPE, without intermediate MeasurementResponse objects
+        """
+        rts_observations = cls.__new__(cls)
+        rts_observations.set_columns(
+            columns,
+            np.full(len(columns), rts_id, dtype=object),
+            np.full(len(columns), rts_job_id, dtype=object),
+            variances,
+            station,
+        )
+        return rts_observations
+
+    def set_columns(
+        self,
+        columns: np.ndarray,
+        rts_ids: np.ndarray,
+        rts_job_ids: np.ndarray,
+        variances: RTSVarianceConfig = None,
+        station: RTSStation = RTSStation(),
     ) -> None:
         self.variances = variances
         self.station = station
-        sensor_timestamps = np.array([m.sensor_timestamp / 1000 for m in measurements])
         self.sensor_timestamps, index_unique = np.unique(
-            sensor_timestamps, return_index=True
-        )
-        unique_measurements: list[MeasurementResponse] = [
-            measurements[i] for i in index_unique
-        ]
-        self.controller_timestamps = np.array(
-            [m.controller_timestamp for m in unique_measurements]
-        )
-        self.distances = np.array([m.distance for m in unique_measurements])
-        self.h_angles = np.array([m.horizontal_angle for m in unique_measurements])
-        self.v_angles = np.array([m.vertical_angle for m in unique_measurements])
-        self.response_lengths = np.array(
-            [m.response_length for m in unique_measurements]
-        )
-        self.geo_com_return_codes = np.array(
-            [m.geocom_return_code for m in unique_measurements]
-        )
-        self.rpc_return_codes = np.array(
-            [m.rpc_return_code for m in unique_measurements]
+            columns["sensor_timestamp"] / 1000, return_index=True
         )
-        self.rts_ids = np.array([m.rts_id for m in unique_measurements])
-        self.rts_job_ids = np.array([m.rts_job_id for m in unique_measurements])
+        unique_columns = columns[index_unique]
+        self.controller_timestamps = unique_columns["controller_timestamp"].copy()
+        self.distances = unique_columns["distance"].copy()
+        self.h_angles = unique_columns["horizontal_angle"].copy()
+        self.v_angles = unique_columns["vertical_angle"].copy()
+        self.response_lengths = unique_columns["response_length"].copy()
+        self.geo_com_return_codes = unique_columns["geocom_return_code"].copy()
+        self.rpc_return_codes = unique_columns["rpc_return_code"].copy()
+        self.rts_ids = rts_ids[index_unique]
+        self.rts_job_ids = rts_job_ids[index_unique]
         self.rts_dhv = np.c_[self.distances, self.h_angles, self.v_angles]
 
         self.initial_xyz = copy.deepcopy(self.xyz)
@@ -210,13 +223,11 @@ class RTSObservations:
 
     @property
     def v_omega(self) -> np.ndarray:
-        v_diff = np.unwrap(self.v_angles[1:]) - np.unwrap(self.v_angles[:-1])
-        return np.r_[v_diff / self.delta_time, 0]
+        return np.r_[np.diff(np.unwrap(self.v_angles)) / self.delta_time, 0]
 
     @property
     def h_omega(self) -> np.ndarray:
-        h_diff = np.unwrap(self.h_angles[1:]) - np.unwrap(self.h_angles[:-1])
-        return np.r_[h_diff / self.delta_time, 0]
+        return np.r_[np.diff(np.unwrap(self.h_angles)) / self.delta_time, 0]
 
     @property
     def num_targets(self) -> int:
@@ -227,8 +238,11 @@ class RTSObservations:
         return tpy.Trajectory(timestamps=self.sensor_timestamps, positions=pos)
 
     def sync_sensor_time(
-        self, baudrate: int, external_delay: float = 0.0
-    ) -> list[MeasurementResponse]:
+        self,
+        baudrate: int,
+        external_delay: float = 0.0,
+        robust: bool = ROBUST_CLOCK_DRIFT_FIT,
+    ) -> None:
         def compute_transmission_time(message_length: int, baudrate: int) -> float:
             bits_per_byte = 10  # 8 data bits + 1 start bit + 1 stop bit
             total_num_bits = bits_per_byte * message_length
@@ -244,17 +258,29 @@ class RTSObservations:
         diff_ts_gps = self.controller_timestamps - self.sensor_timestamps
 
         # line fit with respect to the turn on time
-        x, _, _ = fit_line_2d(self.sensor_timestamps, diff_ts_gps)
+        if robust:
+            fit = fit_line_robust(self.sensor_timestamps, diff_ts_gps)
+        else:
+            fit = fit_line(self.sensor_timestamps, diff_ts_gps)
 
-        logger.info("Total Station Clock Drift (ppm) - raw: %.3f", x[0] * 1e06)
+        logger.info(
+            "Total Station Clock Drift (ppm) - raw: %.3f +- %.3f (%d outliers)",
+            fit.slope * 1e06,
+            fit.std_devs[0] * 1e06,
+            fit.num_outliers,
+        )
 
         # remove trend from sensorboard time
-        ts_time_no_drift = self.sensor_timestamps + x[0] * self.sensor_timestamps
+        ts_time_no_drift = self.sensor_timestamps + fit.slope * self.sensor_timestamps
 
         # constant offset between both times
-        self.sensor_timestamps = ts_time_no_drift + x[1] - external_delay
+        self.sensor_timestamps = ts_time_no_drift + fit.intercept - external_delay
 
-    def apply_intrinsic_delay(self, intrinsic_delay: float) -> None:
+    def apply_intrinsic_delay(
+        self,
+        intrinsic_delay: float,
+        angular_rates: Tuple[np.ndarray, np.ndarray] | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray] | None:
         """
         Correct measurements using iterative approach
         Problem: The derivatives of the angles can only be computed using the
@@ -277,40 +303,168 @@ class RTSObservations:
 
         6) Finally compute corrected angles / positions using final derivatives
 
+        Returns the converged angular rates (h, v). Passing them back in as
+        angular_rates skips the iteration for the same observations.
         """
         if intrinsic_delay == 0:
-            return
+            return None
 
-        delta_omega = np.inf
+        if angular_rates is None:
+            angular_rates = self.compute_intrinsic_delay_rates(intrinsic_delay)
+
+        h_omega, v_omega = angular_rates
+        self.h_angles = self.h_angles + h_omega * intrinsic_delay
+        self.v_angles = self.v_angles + v_omega * intrinsic_delay
+        return angular_rates
+
+    def compute_intrinsic_delay_rates(
+        self, intrinsic_delay: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Iterates the angular rates of the intrinsic delay correction until they
+        converge. The iteration works on the differences of the unwrapped raw
+        angles, which are computed once: correcting the angles by omega * delay
+        changes their differences by diff(omega) * delay. All per-iteration
+        work happens in place on preallocated buffers.
+        """
         logger.info(
             "Correcting intrinsic total station delay (%.3f ms)...",
             intrinsic_delay * 1000,
         )
+        delta_time = self.delta_time
+        num_diffs = len(delta_time)
+        raw_diffs = (
+            np.diff(np.unwrap(self.h_angles)),
+            np.diff(np.unwrap(self.v_angles)),
+        )
+
+        # omega before and after correcting the angles, last rate is always zero
+        before = np.zeros((2, num_diffs + 1))
+        after = np.zeros((2, num_diffs + 1))
+        diff_buffer = np.empty(num_diffs)
+        d_omega = np.empty(num_diffs + 1)
+        d_omega_buffer = np.empty(num_diffs + 1)
+
+        for i in range(2):
+            np.divide(raw_diffs[i], delta_time, out=before[i, :-1])
 
-        raw_h = copy.deepcopy(self.h_angles)
-        raw_v = copy.deepcopy(self.v_angles)
+        delta_omega = np.inf
         cnt = 0
         while delta_omega > 1e-06:
             if cnt > 100:
                 logger.error("Intrinsic delay correction did not converge!")
                 break
 
-            h_omega_before = self.h_omega
-            self.h_angles = raw_h + h_omega_before * intrinsic_delay
-            h_omega_after = self.h_omega
+            if cnt > 0:
+                # the derivatives of the corrected angles are the next starting point
+                before, after = after, before
+
+            for i in range(2):
+                np.subtract(before[i, 1:], before[i, :-1], out=diff_buffer)
+                diff_buffer *= intrinsic_delay
+                diff_buffer += raw_diffs[i]
+                np.divide(diff_buffer, delta_time, out=after[i, :-1])
+
+            np.subtract(before[0], after[0], out=d_omega)
+            np.abs(d_omega, out=d_omega)
+            np.subtract(before[1], after[1], out=d_omega_buffer)
+            np.abs(d_omega_buffer, out=d_omega_buffer)
+            d_omega += d_omega_buffer
+            delta_omega = np.sum(d_omega, where=np.isfinite(d_omega))
+            cnt += 1
+        logger.info("... finished after %i iterations!", cnt)
 
-            v_omega_before = self.v_omega
-            self.v_angles = raw_v + v_omega_before * intrinsic_delay
-            v_omega_after = self.v_omega
+        return before[0], before[1]
 
-            d_omega = abs(h_omega_before - h_omega_after) + abs(
-                v_omega_before - v_omega_after
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for array in (
+                self.sensor_timestamps,
+                self.controller_timestamps,
+                self.distances,
+                self.h_angles,
+                self.v_angles,
+                self.response_lengths,
+                self.geo_com_return_codes,
+                self.rpc_return_codes,
+                self.rts_ids,
+                self.rts_job_ids,
+                self.rts_dhv,
+                self.initial_xyz,
             )
-            delta_omega = sum(d_omega[~np.isinf(d_omega) & ~np.isnan(d_omega)])
-            cnt += 1
-        logger.info("... finished after %i iterations!", cnt)
+        )
 
-    def to_measurement_response(self) -> list[MeasurementResponse]:
+    def save(self, file, **metadata: str) -> None:
+        """Saves the observations of a single job as npz"""
+        rts_id = self.rts_ids[0] if len(self) else None
+        rts_job_id = self.rts_job_ids[0] if len(self) else None
+        variances = (
+            [self.variances.distance, self.variances.ppm, self.variances.angle]
+            if self.variances is not None
+            else []
+        )
+        np.savez(
+            file,
+            sensor_timestamps=self.sensor_timestamps,
+            controller_timestamps=self.controller_timestamps,
+            distances=self.distances,
+            h_angles=self.h_angles,
+            v_angles=self.v_angles,
+            response_lengths=self.response_lengths,
+            geo_com_return_codes=self.geo_com_return_codes,
+            rpc_return_codes=self.rpc_return_codes,
+            rts_dhv=self.rts_dhv,
+            initial_xyz=self.initial_xyz,
+            variances=np.array(variances, dtype=float),
+            station=np.array(
+                [self.station.x, self.station.y, self.station.z, self.station.orientation]
+            ),
+            rts_id=np.array(str(rts_id) if rts_id is not None else ""),
+            rts_job_id=np.array(str(rts_job_id) if rts_job_id is not None else ""),
+            **{key: np.array(value) for key, value in metadata.items()},
+        )
+
+    @classmethod
+    def load(cls, file) -> Tuple["RTSObservations", dict[str, str]]:
+        """Loads observations saved with save, returns them with their metadata"""
+        with np.load(file) as data:
+            arrays = {key: data[key] for key in data.files}
+
+        rts_observations = cls.__new__(cls)
+        variances = arrays.pop("variances")
+        rts_observations.variances = (
+            RTSVarianceConfig(*variances.tolist()) if len(variances) else None
+        )
+        rts_observations.station = RTSStation(*arrays.pop("station").tolist())
+        num_observations = len(arrays["sensor_timestamps"])
+        for name in ("rts_id", "rts_job_id"):
+            value = str(arrays.pop(name))
+            setattr(
+                rts_observations,
+                f"{name}s",
+                np.full(num_observations, UUID(value) if value else None, dtype=object),
+            )
+        for name in (
+            "sensor_timestamps",
+            "controller_timestamps",
+            "distances",
+            "h_angles",
+            "v_angles",
+            "response_lengths",
+            "geo_com_return_codes",
+            "rpc_return_codes",
+            "rts_dhv",
+            "initial_xyz",
+        ):
+            setattr(rts_observations, name, arrays.pop(name))
+
+        return rts_observations, {key: str(value) for key, value in arrays.items()}
+
+    def to_measurement_response(
+        self, indices: Iterable[int] | None = None
+    ) -> list[MeasurementResponse]:
         return [
             MeasurementResponse(
                 controller_timestamp=float(self.controller_timestamps[i]),
@@ -324,5 +478,5 @@ class RTSObservations:
                 rts_id=self.rts_ids[i] if self.rts_ids[i] is not None else None,
                 rts_job_id=self.rts_job_ids[i],
             )
-            for i in range(len(self))
+            for i in (range(len(self)) if indices is None else indices)
         ]
@@ -3,16 +3,21 @@ from uuid import UUID
 
 from fastapi import Depends
 
+from rtsapi.app_state import AppState
 from rtsapi.database.device_repository import DeviceRepository
+from rtsapi.dependencies import get_app_state
 from rtsapi.dtos import CreateDeviceRequest, DeviceResponse
 from rtsapi.mappers import DeviceMapper
 
 
 class DeviceService:
     def __init__(
-        self, device_repository: DeviceRepository = Depends(DeviceRepository)
+        self,
+        device_repository: DeviceRepository = Depends(DeviceRepository),
+        app_state: AppState = Depends(get_app_state),
     ) -> None:
         self.device_repository = device_repository
+        self.app_state = app_state
 
     def add_device(self, create_device_request: CreateDeviceRequest) -> DeviceResponse:
         db_device = DeviceMapper.to_db(create_device_request)
@@ -25,26 +30,46 @@ class DeviceService:
         db_device = DeviceMapper.to_db(create_device_request)
         db_device.id = device_id
         updated_device = self.device_repository.update_device(db_device)
+        self.app_state.device_presence.forget(device_id)
         return DeviceMapper.to_dto(updated_device)
 
     def delete_device(self, device_id: UUID) -> None:
         self.device_repository.delete_device(device_id)
+        self.app_state.device_presence.forget(device_id)
 
     def get_device(self, device_id: UUID) -> DeviceResponse:
         device = self.device_repository.get_device(device_id)
-        return DeviceMapper.to_dto(device)
+        return self.with_presence(DeviceMapper.to_dto(device))
 
     def get_devices(self) -> list[DeviceResponse]:
         devices = self.device_repository.get_devices()
-        return DeviceMapper.to_dtos(devices)
+        return [self.with_presence(device) for device in DeviceMapper.to_dtos(devices)]
 
     def upsert_device(self, client_ip: str) -> DeviceResponse:
-        device = self.device_repository.get_device_by_ip(client_ip)
-        if device is None:
-            create_device_request = CreateDeviceRequest(
-                ip=client_ip, last_seen=time.time()
+        """
+        Record a heartbeat of the device with the IP, registering it if it
+        is new. Known devices are answered from memory.
+        """
+        now = time.time()
+        presence = self.app_state.device_presence.seen(client_ip, now)
+
+        if presence is None:
+            device = self.device_repository.get_device_by_ip(client_ip)
+            if device is None:
+                device = self.add_device(
+                    CreateDeviceRequest(ip=client_ip, last_seen=now)
+                )
+            presence = self.app_state.device_presence.add(
+                client_ip, device.id, now, device.last_seen or 0.0
             )
-            return self.add_device(create_device_request)
 
-        self.device_repository.update_last_seen(device.id)
-        return DeviceMapper.to_dto(device)
+        return DeviceResponse(
+            id=presence.id, ip=client_ip, last_seen=presence.last_seen
+        )
+
+    def with_presence(self, device: DeviceResponse) -> DeviceResponse:
+        """Heartbeats reach the database with a delay, the registry is newer"""
+        last_seen = self.app_state.device_presence.last_seen(device.id)
+        if last_seen is not None and last_seen > device.last_seen:
+            device.last_seen = last_seen
+        return device
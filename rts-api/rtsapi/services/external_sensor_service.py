@@ -5,13 +5,16 @@ from fastapi import Depends
 from fastapi.responses import PlainTextResponse
 import numpy as np
 
+from rtsapi.app_state import AppState
 from rtsapi.database.external_sensor_repository import ExternalSensorRepository
 from rtsapi.database.models import ExternalSensor
+from rtsapi.dependencies import get_app_state
 from rtsapi.dtos import (AddExternalSensorMeasurementRequest,
                          ExternalSensorMeasurementResponse,
                          ExternalSensorResponse)
 from rtsapi.mappers import (ExternalSensorMapper,
                             ExternalSensorMeasurementMapper)
+from rtsapi.presence_registry import Presence
 from rtsapi.services.synchronizer_service import SynchronizerService
 import trajectopy as tpy
 
@@ -22,27 +25,31 @@ class ExternalSensorService:
             ExternalSensorRepository
         ),
         synchronizer_service: SynchronizerService = Depends(SynchronizerService),
+        app_state: AppState = Depends(get_app_state),
     ) -> None:
         self.external_sensor_repository = external_sensor_repository
         self.synchronizer_service = synchronizer_service
+        self.app_state = app_state
 
     def get_external_sensor(self, sensor_id: UUID) -> ExternalSensorResponse:
-        return ExternalSensorMapper.to_dto(
-            self.external_sensor_repository.get_external_sensor(sensor_id)
+        return self.with_presence(
+            ExternalSensorMapper.to_dto(
+                self.external_sensor_repository.get_external_sensor(sensor_id)
+            )
         )
 
     def get_external_sensors(self) -> list[ExternalSensorResponse]:
-        return ExternalSensorMapper.to_dtos(
-            self.external_sensor_repository.get_external_sensors()
-        )
+        return [
+            self.with_presence(external_sensor)
+            for external_sensor in ExternalSensorMapper.to_dtos(
+                self.external_sensor_repository.get_external_sensors()
+            )
+        ]
 
     def add_external_sensor_measurement(
         self, client_ip: str, measurement_request: AddExternalSensorMeasurementRequest
     ) -> None:
-        self.upsert_external_sensor(client_ip)
-        external_sensor = self.external_sensor_repository.get_external_sensor_by_ip(
-            client_ip
-        )
+        external_sensor = self.upsert_external_sensor(client_ip)
 
         if not external_sensor.logging_active:
             return
@@ -55,8 +62,31 @@ class ExternalSensorService:
         )
         self.external_sensor_repository.add_external_sensor_measurement(measurement)
 
+    def add_external_sensor_measurements_from_ws(
+        self, client_ip: str, measurement_dicts: list[dict]
+    ) -> int:
+        external_sensor = self.upsert_external_sensor(client_ip)
+
+        if not external_sensor.logging_active:
+            return 0
+
+        measurements = []
+        for item in measurement_dicts:
+            measurement_request = AddExternalSensorMeasurementRequest(**item)
+            self.synchronizer_service.handle_external_sensor_measurement(
+                external_sensor.id, measurement_request
+            )
+            measurements.append(
+                ExternalSensorMeasurementMapper.to_db(
+                    external_sensor.id, measurement_request
+                )
+            )
+        self.external_sensor_repository.add_external_sensor_measurements(measurements)
+        return len(measurements)
+
     def delete_external_sensor(self, sensor_id: UUID) -> None:
         self.external_sensor_repository.delete_external_sensor(sensor_id)
+        self.app_state.external_sensor_presence.forget(sensor_id)
 
     def get_external_sensor_measurements(
         self, sensor_id: UUID
@@ -80,20 +110,40 @@ class ExternalSensorService:
             headers={"Content-Disposition": f"attachment; filename={filename}"},
         )
 
-    def upsert_external_sensor(self, client_ip: str) -> ExternalSensorResponse:
+    def upsert_external_sensor(self, client_ip: str) -> Presence:
+        """
+        Record a heartbeat of the sensor with the IP, registering it if it
+        is new. Known sensors are answered from memory, on every sample.
+        """
+        now = time.time()
+        presence = self.app_state.external_sensor_presence.seen(client_ip, now)
+        if presence is not None:
+            return presence
+
         external_sensor = self.external_sensor_repository.get_external_sensor_by_ip(
             client_ip
         )
         if external_sensor is None:
-            return self.external_sensor_repository.add_external_sensor(
-                ExternalSensor(
-                    ip=client_ip, name="External Sensor", last_seen=time.time()
-                )
+            external_sensor = self.external_sensor_repository.add_external_sensor(
+                ExternalSensor(ip=client_ip, name="External Sensor", last_seen=now)
             )
 
-        if time.time() - external_sensor.last_seen > 5.0:
-            self.external_sensor_repository.update_last_seen(external_sensor.id)
-        return ExternalSensorMapper.to_dto(external_sensor)
+        return self.app_state.external_sensor_presence.add(
+            client_ip,
+            external_sensor.id,
+            now,
+            external_sensor.last_seen or 0.0,
+            external_sensor.logging_active,
+        )
+
+    def with_presence(
+        self, external_sensor: ExternalSensorResponse
+    ) -> ExternalSensorResponse:
+        """Heartbeats reach the database with a delay, the registry is newer"""
+        last_seen = self.app_state.external_sensor_presence.last_seen(external_sensor.id)
+        if last_seen is not None and last_seen > external_sensor.last_seen:
+            external_sensor.last_seen = last_seen
+        return external_sensor
 
     def update_external_sensor_name(
         self, sensor_id: UUID, name: str
@@ -103,7 +153,7 @@ class ExternalSensorService:
         updated_external_sensor = (
             self.external_sensor_repository.update_external_sensor(external_sensor)
         )
-        return ExternalSensorMapper.to_dto(updated_external_sensor)
+        return self.with_presence(ExternalSensorMapper.to_dto(updated_external_sensor))
 
     def update_external_sensor_logging_active(
         self, sensor_id: UUID, logging_active: bool
@@ -113,4 +163,7 @@ class ExternalSensorService:
         updated_external_sensor = (
             self.external_sensor_repository.update_external_sensor(external_sensor)
         )
-        return ExternalSensorMapper.to_dto(updated_external_sensor)
\ No newline at end of file
+        self.app_state.external_sensor_presence.set_logging_active(
+            sensor_id, logging_active
+        )
+        return self.with_presence(ExternalSensorMapper.to_dto(updated_external_sensor))
\ No newline at end of file
@@ -1,23 +1,107 @@
 import logging
+import zlib
 from datetime import datetime
+from typing import Iterable, Iterator
 from uuid import UUID
 
 from fastapi import Depends
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
 
+from rtsapi.app_state import AppState
+from rtsapi.database import SessionLocal
+from rtsapi.database import measurement_repository as measurement_database
 from rtsapi.database.measurement_repository import MeasurementRepository
 from rtsapi.database.rts_job_repository import RTSJobRepository
 from rtsapi.database.rts_repository import RTSRepository
-from rtsapi.dtos import AddMeasurementRequest, MeasurementResponse, RTSResponse
-from rtsapi.exceptions import (NoMeasurementsAvailableException,
-                               RTSNotFoundException)
+from rtsapi.database.session_repository import SessionRepository
+from rtsapi.dependencies import get_app_state
+from rtsapi.downsampling import downsample_indices
+from rtsapi.dtos import (AddMeasurementRequest, DownsamplingMethod, ExportFormat,
+                         IngestConnectionResponse, MeasurementResponse,
+                         RTSJobStatus, RTSResponse)
+from rtsapi.exceptions import (InvalidCursorException,
+                               NoMeasurementsAvailableException,
+                               RTSJobNotFoundException, RTSNotFoundException)
 from rtsapi.mappers import MeasurementMapper
-from rtsapi.rts_observations import (RTSObservations, RTSStation,
-                                     RTSVarianceConfig)
+from rtsapi.measurement_export import (FILE_EXTENSIONS, MEDIA_TYPES,
+                                       export_observations,
+                                       export_observations_bundle)
+from rtsapi.measurement_ingest import MeasurementBuffer, MeasurementSummary
+from rtsapi.rts_observations import (ROBUST_CLOCK_DRIFT_FIT, RTSObservations,
+                                     RTSStation, RTSVarianceConfig)
 from rtsapi.services.synchronizer_service import SynchronizerService
 
 logger = logging.getLogger("root")
 
+CSV_HEADER = "ref_time, ts_time, h_angle, v_angle, distance, num_chars, geocom_return_code, rpc_return_code\n"
+CSV_CHUNK_SIZE = 5000
+
+
+def format_csv_rows(rows: Iterable[tuple]) -> str:
+    return "".join(",".join(map(str, row)) + "\n" for row in rows)
+
+
+def encode_measurement_cursor(controller_timestamp: float, measurement_id: int) -> str:
+    return f"{float(controller_timestamp)!r}:{int(measurement_id)}"
+
+
+def decode_measurement_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        controller_timestamp, measurement_id = cursor.split(":")
+        return float(controller_timestamp), int(measurement_id)
+    except ValueError as e:
+        raise InvalidCursorException(cursor) from e
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        offset = int(cursor)
+    except ValueError as e:
+        raise InvalidCursorException(cursor) from e
+
+    if offset < 0:
+        raise InvalidCursorException(cursor)
+
+    return offset
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode())
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def flush_closed_measurement_buffer(
+    app_state: AppState, measurement_buffer: MeasurementBuffer, job_id: UUID
+) -> int:
+    """
+    Final flush of a closed ingest connection in a session of its own. The
+    session of the websocket handler is closed when the handler is cancelled,
+    which can happen while the writer thread still uses it.
+    """
+    with SessionLocal() as db:
+        rts_job_repository = RTSJobRepository(db)
+        measurement_service = MeasurementRepository(
+            measurement_database.MeasurementRepository(db, rts_job_repository),
+            rts_job_repository,
+            RTSRepository(db),
+            SynchronizerService(app_state),
+            SessionRepository(db),
+            app_state,
+        )
+        num_rows = measurement_service.flush_measurement_buffer(measurement_buffer)
+
+    if len(measurement_buffer) > 0:
+        logger.error(
+            f"Dropped {len(measurement_buffer)} measurements of job {job_id} "
+            "that could not be written"
+        )
+    return num_rows
+
 
 class MeasurementRepository:
     def __init__(
@@ -26,66 +110,268 @@ class MeasurementRepository:
         rts_job_repository: RTSJobRepository = Depends(RTSJobRepository),
         rts_repository: RTSRepository = Depends(RTSRepository),
         synchronizer_service: SynchronizerService = Depends(SynchronizerService),
+        session_repository: SessionRepository = Depends(SessionRepository),
+        app_state: AppState = Depends(get_app_state),
     ) -> None:
+        self.app_state = app_state
         self.measurement_repository = measurement_repository
         self.rts_job_repository = rts_job_repository
         self.rts_repository = rts_repository
         self.synchronizer_service = synchronizer_service
+        self.session_repository = session_repository
 
     def add_measurement(
         self, add_measurement_request: AddMeasurementRequest
     ) -> MeasurementResponse:
-        self.synchronizer_service.handle_rts_measurement(add_measurement_request)
+        # before the first statement, a new partition waits for our writes
+        self.measurement_repository.ensure_partitions(
+            [add_measurement_request.controller_timestamp]
+        )
         job = self.rts_job_repository.get_rts_job(add_measurement_request.rts_job_id)
-        db_measurement = MeasurementMapper.to_db(job.rts_id, add_measurement_request)
-        added_measurement = self.measurement_repository.add_measurement(db_measurement)
-        return MeasurementMapper.to_dto(added_measurement)
+        self.synchronizer_service.handle_rts_measurement(
+            job.rts_id, add_measurement_request
+        )
+        self.add_to_job_summary(job.id, add_measurement_request)
+        self.measurement_repository.add_measurement_rows(
+            [MeasurementMapper.to_row(job.rts_id, add_measurement_request)]
+        )
+        self.app_state.corrected_observations.bump_job(job.id)
+        self.app_state.datarates.record(
+            job.id, [add_measurement_request.controller_timestamp]
+        )
+        measurement_response = MeasurementMapper.request_to_dto(
+            job.rts_id, add_measurement_request
+        )
+        self.publish_measurement(measurement_response)
+        return measurement_response
 
     def add_static_measurement(
         self, add_measurement_request: AddMeasurementRequest
     ) -> MeasurementResponse:
+        # before the static job may be created, see add_measurement
+        self.measurement_repository.ensure_partitions(
+            [add_measurement_request.controller_timestamp]
+        )
         request_job = self.rts_job_repository.get_rts_job(
             add_measurement_request.rts_job_id
         )
         job = self.rts_job_repository.get_static_rts_job(request_job.rts_id)
-        db_measurement = MeasurementMapper.to_db(job.rts_id, add_measurement_request)
-        db_measurement.rts_job_id = job.id
-        added_measurement = self.measurement_repository.add_measurement(db_measurement)
+        measurement = add_measurement_request.model_copy(update={"rts_job_id": job.id})
+        self.add_to_job_summary(job.id, measurement)
+        self.measurement_repository.add_measurement_rows(
+            [MeasurementMapper.to_row(job.rts_id, measurement)]
+        )
+        self.app_state.corrected_observations.bump_job(job.id)
         self.rts_job_repository.refresh_rts_job_meta(job.id)
-        return MeasurementMapper.to_dto(added_measurement)
+        measurement_response = MeasurementMapper.request_to_dto(job.rts_id, measurement)
+        self.app_state.measurement_hub.open_job(job.id)
+        self.app_state.datarates.open_job(job.id)
+        self.app_state.datarates.record(job.id, [measurement.controller_timestamp])
+        self.publish_measurement(measurement_response)
+        return measurement_response
+
+    def add_to_job_summary(
+        self, job_id: UUID, measurement: AddMeasurementRequest
+    ) -> None:
+        """Update the aggregates of the job, committed with the measurement"""
+        summary = MeasurementSummary()
+        summary.add(
+            measurement.controller_timestamp,
+            measurement.geocom_return_code,
+            measurement.rpc_return_code,
+        )
+        self.rts_job_repository.add_measurement_summary(job_id, summary, commit=False)
+
+    def publish_measurement(self, measurement: MeasurementResponse) -> None:
+        self.app_state.latest_measurements.update(measurement)
+        self.app_state.measurement_hub.publish(measurement)
 
-    def add_measurement_from_ws(self, measurement_dict: dict) -> None:
-        measurement = AddMeasurementRequest(**measurement_dict)
-        self.add_measurement(measurement)
+    def open_measurement_buffer(self, job_id: UUID) -> MeasurementBuffer:
+        job = self.rts_job_repository.get_rts_job(job_id)
+        # every connection holds a session, only a flush may hold a connection
+        self.rts_job_repository.end_read()
+        measurement_buffer = MeasurementBuffer()
+        measurement_buffer.rts_ids[job.id] = job.rts_id
+        return measurement_buffer
 
-    def add_measurements_bulk_from_ws(self, measurement_dicts: list[dict]) -> None:
-        db_measurements = []
+    def buffer_measurements_from_ws(
+        self, measurement_buffer: MeasurementBuffer, measurement_dicts: list[dict]
+    ) -> None:
         for item in measurement_dicts:
             measurement = AddMeasurementRequest(**item)
-            self.synchronizer_service.handle_rts_measurement(measurement)
-            job = self.rts_job_repository.get_rts_job(measurement.rts_job_id)
-            db_measurements.append(MeasurementMapper.to_db(job.rts_id, measurement))
-        self.measurement_repository.add_measurements_bulk(db_measurements)
+            rts_id = measurement_buffer.rts_ids.get(measurement.rts_job_id)
+
+            if rts_id is None:
+                job = self.rts_job_repository.get_rts_job(measurement.rts_job_id)
+                rts_id = measurement_buffer.rts_ids[job.id] = job.rts_id
+
+            self.synchronizer_service.handle_rts_measurement(rts_id, measurement)
+            measurement_buffer.append(MeasurementMapper.to_row(rts_id, measurement))
+
+    def publish_measurement_rows(self, rows: list[dict]) -> None:
+        latest_rows = {}
+        timestamps: dict[UUID, list[float]] = {}
+        for row in rows:
+            latest_rows[row["rts_job_id"]] = row
+            timestamps.setdefault(row["rts_job_id"], []).append(
+                row["controller_timestamp"]
+            )
+
+        for job_id, job_timestamps in timestamps.items():
+            self.app_state.datarates.record(job_id, job_timestamps)
 
-    def get_raw_measurements(self, job_id: UUID = None) -> list[MeasurementResponse]:
-        rts_obs = self.get_rts_observations(job_id)
-        return rts_obs.to_measurement_response()
+        # only the newest measurement of each job is of interest downstream
+        for row in latest_rows.values():
+            self.publish_measurement(MeasurementResponse(**row))
+
+    def flush_measurement_buffer(self, measurement_buffer: MeasurementBuffer) -> int:
+        """
+        Write the buffered rows in one transaction and publish them once
+        they are committed. Rows of deleted jobs are dropped, on other
+        database errors the rows are kept and the flush is retried after
+        the flush interval. Returns the number of written rows.
+        """
+        while True:
+            rows = list(measurement_buffer.rows)
+            if not rows:
+                return 0
+
+            try:
+                # before the summaries lock the jobs, see add_measurement
+                self.measurement_repository.ensure_partitions(
+                    [row["controller_timestamp"] for row in rows]
+                )
+                summaries = MeasurementSummary.from_rows(rows)
+                # the aggregates are committed in the same transaction as the rows
+                for job_id, summary in summaries.items():
+                    self.rts_job_repository.add_measurement_summary(
+                        job_id, summary, commit=False
+                    )
+                self.measurement_repository.add_measurement_rows(rows)
+                break
+            except RTSJobNotFoundException as e:
+                self.measurement_repository.rollback()
+                num_dropped = measurement_buffer.discard_job(e.job_id)
+                logger.warning(
+                    f"Dropped {num_dropped} measurements of the deleted job {e.job_id}"
+                )
+            except SQLAlchemyError as e:
+                self.measurement_repository.rollback()
+                measurement_buffer.retry_later()
+                logger.error(f"Writing {len(rows)} measurements failed, retrying: {e}")
+                return 0
+
+        num_rows = len(rows)
+        measurement_buffer.mark_flushed(num_rows)
+        for job_id in summaries:
+            self.app_state.corrected_observations.bump_job(job_id)
+        self.publish_measurement_rows(rows)
+        logger.debug(f"Flushed {num_rows} buffered measurements")
+        return num_rows
+
+    def ingest_measurement_frames(
+        self, measurement_buffer: MeasurementBuffer, frames: list
+    ) -> int:
+        """Buffer websocket frames and flush the buffer if it is due.
+        Returns the number of written rows."""
+        for data in frames:
+            if isinstance(data, list):
+                self.buffer_measurements_from_ws(measurement_buffer, data)
+            elif isinstance(data, dict):
+                self.buffer_measurements_from_ws(measurement_buffer, [data])
+            else:
+                logger.warning(f"[WS] Received unexpected data format: {type(data)}")
+
+        if measurement_buffer.is_due:
+            return self.flush_measurement_buffer(measurement_buffer)
+
+        # the rts_id lookup of a new job must not hold a connection until the flush
+        self.rts_job_repository.end_read()
+        return 0
+
+    def get_ingest_connections(self) -> list[IngestConnectionResponse]:
+        return [
+            IngestConnectionResponse.model_validate(stats)
+            for stats in self.app_state.ingest_connections.values()
+        ]
+
+    def get_raw_measurements(
+        self,
+        job_id: UUID,
+        cursor: str | None = None,
+        after_timestamp: float | None = None,
+        limit: int | None = None,
+        target_points: int | None = None,
+        method: DownsamplingMethod = DownsamplingMethod.LTTB,
+    ) -> tuple[list[MeasurementResponse], str | None]:
+        """
+        Raw measurements of a job after the cursor or after_timestamp, at
+        most limit rows, decimated to target_points if given. Returns them
+        with the cursor of the last row, so a running job can be tailed by
+        passing it back.
+        """
+        job = self.rts_job_repository.get_rts_job(job_id)
+        after_id = None
+        if cursor is not None:
+            after_timestamp, after_id = decode_measurement_cursor(cursor)
+
+        ids, columns = self.measurement_repository.get_measurement_page(
+            job.id, after_timestamp, after_id, limit
+        )
+        if len(ids) == 0:
+            if after_timestamp is None:
+                raise NoMeasurementsAvailableException(
+                    f"No measurements found for job ID {job_id}"
+                )
+            return [], cursor
+
+        rts_obs = RTSObservations.from_arrays(
+            columns, rts_id=job.rts_id, rts_job_id=job.id
+        )
+        next_cursor = encode_measurement_cursor(
+            columns["controller_timestamp"][-1], ids[-1]
+        )
+        indices = None
+        if target_points is not None:
+            indices = downsample_indices(rts_obs, method, target_points)
+        return rts_obs.to_measurement_response(indices), next_cursor
 
     def get_latest_measurements(self) -> list[MeasurementResponse]:
-        latest_measurements = self.measurement_repository.get_latest_measurements()
-        return [MeasurementMapper.to_dto(m) for m in latest_measurements]
+        return self.app_state.measurement_hub.snapshot()
 
     def get_latest_measurement_of_rts(self, rts_id: UUID) -> MeasurementResponse | None:
-        latest_measurement = self.measurement_repository.get_last_measurement_of_rts(
-            rts_id
+        return self.app_state.latest_measurements.get_by_rts(
+            rts_id, self.measurement_repository.get_last_measurement_of_rts
         )
-        if latest_measurement:
-            return MeasurementMapper.to_dto(latest_measurement)
-        return None
 
-    def get_corrected_measurements(self, job_id: UUID) -> list[MeasurementResponse]:
+    def get_corrected_measurements(
+        self,
+        job_id: UUID,
+        cursor: str | None = None,
+        limit: int | None = None,
+        target_points: int | None = None,
+        method: DownsamplingMethod = DownsamplingMethod.LTTB,
+    ) -> tuple[list[MeasurementResponse], str]:
+        """
+        Corrected measurements of a job from the row after the cursor on.
+        The correction needs the whole job, but it is cached per job
+        revision, so only the requested rows are serialized. Rows already
+        delivered may still be refined as the clock drift fit improves.
+        """
         corrected_rts_obs = self.get_corrected_rts_observations(job_id)
-        return corrected_rts_obs.to_measurement_response()
+        start = decode_offset_cursor(cursor) if cursor is not None else 0
+        stop = len(corrected_rts_obs)
+        if limit is not None:
+            stop = min(start + limit, stop)
+
+        start = min(start, stop)
+        if target_points is not None:
+            indices = downsample_indices(
+                corrected_rts_obs, method, target_points, start, stop
+            )
+        else:
+            indices = range(start, stop)
+        return corrected_rts_obs.to_measurement_response(indices), str(stop)
 
     def get_rts_observations(self, job_id: UUID) -> RTSObservations:
         job = self.rts_job_repository.get_rts_job(job_id)
@@ -106,56 +392,231 @@ class MeasurementRepository:
             z=rts.station_z,
             orientation=rts.orientation,
         )
-        measurements = [
-            MeasurementMapper.to_dto(measurement)
-            for measurement in self.measurement_repository.get_measurements(job_id)
-        ]
-        if not measurements:
+        columns = self.measurement_repository.get_measurement_columns(job_id)
+        if len(columns) == 0:
             raise NoMeasurementsAvailableException(
                 f"No measurements found for job ID {job_id}"
             )
 
-        return RTSObservations(
-            measurements=measurements,
+        return RTSObservations.from_arrays(
+            columns,
+            rts_id=job.rts_id,
+            rts_job_id=job.id,
             variances=rts_variance_config,
             station=rts_station,
         )
 
     def get_corrected_rts_observations(self, job_id: UUID) -> RTSObservations:
+        """
+        Corrected observations of a job, served from the cache while neither
+        the measurements of the job nor its RTS changed. The returned
+        observations are shared and must not be modified.
+        """
         job = self.rts_job_repository.get_rts_job(job_id)
         try:
             rts = self.rts_repository.get_rts(job.rts_id, deleted_ok=True)
         except RTSNotFoundException:
             rts = RTSResponse(id=UUID(int=0), device_id=UUID(int=0))
 
+        cache = self.app_state.corrected_observations
+        key = cache.key(job_id, job.rts_id)
+        rts_observations = cache.get(key)
+        if rts_observations is not None:
+            return rts_observations
+
+        # measurements of finished jobs do not change anymore
+        fingerprint = None
+        if job.status in (RTSJobStatus.FINISHED.value, RTSJobStatus.FAILED.value):
+            fingerprint = repr(
+                (
+                    job.status,
+                    job.finished_at,
+                    job.num_measurements,
+                    rts.baudrate,
+                    rts.external_delay,
+                    rts.internal_delay,
+                    rts.station_x,
+                    rts.station_y,
+                    rts.station_z,
+                    rts.orientation,
+                    rts.distance_std_dev,
+                    rts.distance_ppm,
+                    rts.angle_std_dev,
+                    ROBUST_CLOCK_DRIFT_FIT,
+                )
+            )
+            rts_observations = cache.load_spilled(job_id, fingerprint)
+
+        if rts_observations is None:
+            rts_observations = self.correct_rts_observations(job_id, rts)
+            if fingerprint is not None:
+                cache.spill(job_id, rts_observations, fingerprint)
+
+        cache.put(key, rts_observations)
+        return rts_observations
+
+    def correct_rts_observations(self, job_id: UUID, rts) -> RTSObservations:
         rts_observations = self.get_rts_observations(job_id)
-        rts_observations.sync_sensor_time(
-            baudrate=rts.baudrate, external_delay=rts.external_delay
-        )
-        rts_observations.apply_intrinsic_delay(rts.internal_delay)
+        try:
+            rts_observations.sync_sensor_time(
+                baudrate=rts.baudrate, external_delay=rts.external_delay
+            )
+        except ValueError as e:
+            # the clock drift needs measurements at two sensor times at least
+            raise NoMeasurementsAvailableException(
+                f"Not enough measurements to correct job ID {job_id}: {e}"
+            ) from e
+
+        if rts.internal_delay:
+            cache = self.app_state.intrinsic_delay_rates
+            key = cache.key(job_id, rts.internal_delay, rts_observations.sensor_timestamps)
+            angular_rates = rts_observations.apply_intrinsic_delay(
+                rts.internal_delay, cache.get(key)
+            )
+            cache.put(key, angular_rates)
+
         return rts_observations
 
     def download_measurements(
-        self, job_id: UUID, filename: str = None, raw: bool = False
-    ) -> PlainTextResponse:
+        self,
+        job_id: UUID,
+        filename: str = None,
+        raw: bool = False,
+        gzip: bool = False,
+    ) -> StreamingResponse:
+        job = self.rts_job_repository.get_rts_job(job_id)
         if not filename:
-            job = self.rts_job_repository.get_rts_job(job_id)
             filename = f"{job.rts_id}_{job_id}_{datetime.fromtimestamp(job.created_at).strftime('%Y_%m_%d_%H_%M_%S')}.csv"
 
-        measurements = (
-            self.get_raw_measurements(job_id=job_id)
-            if raw
-            else self.get_corrected_measurements(job_id)
+        if raw:
+            if not self.measurement_repository.has_measurements(job_id):
+                raise NoMeasurementsAvailableException(
+                    f"No measurements found for job ID {job_id}"
+                )
+            chunks = self.iter_raw_measurements_csv(job_id)
+        else:
+            chunks = self.iter_measurements_csv(
+                self.get_corrected_rts_observations(job_id)
+            )
+
+        headers = {"Content-Disposition": f"attachment; filename={filename}"}
+        if gzip:
+            chunks = gzip_chunks(chunks)
+            headers["Content-Encoding"] = "gzip"
+
+        return StreamingResponse(chunks, media_type="text/plain", headers=headers)
+
+    def iter_raw_measurements_csv(self, job_id: UUID) -> Iterator[str]:
+        """
+        Streams the raw measurements of a job as CSV straight from the
+        database, with the same sensor time handling as RTSObservations
+        """
+        yield CSV_HEADER
+
+        last_sensor_timestamp = None
+        for rows in self.measurement_repository.iter_measurement_rows(
+            job_id, CSV_CHUNK_SIZE
+        ):
+            csv_rows = []
+            for (
+                controller_timestamp,
+                sensor_timestamp,
+                distance,
+                horizontal_angle,
+                vertical_angle,
+                response_length,
+                geocom_return_code,
+                rpc_return_code,
+            ) in rows:
+                sensor_timestamp /= 1000
+                if sensor_timestamp == last_sensor_timestamp:
+                    continue
+                last_sensor_timestamp = sensor_timestamp
+                csv_rows.append(
+                    (
+                        controller_timestamp,
+                        sensor_timestamp,
+                        horizontal_angle,
+                        vertical_angle,
+                        distance,
+                        response_length,
+                        geocom_return_code,
+                        rpc_return_code,
+                    )
+                )
+            yield format_csv_rows(csv_rows)
+
+    @staticmethod
+    def iter_measurements_csv(rts_observations: RTSObservations) -> Iterator[str]:
+        yield CSV_HEADER
+
+        for start in range(0, len(rts_observations), CSV_CHUNK_SIZE):
+            chunk = slice(start, start + CSV_CHUNK_SIZE)
+            yield format_csv_rows(
+                zip(
+                    rts_observations.controller_timestamps[chunk].tolist(),
+                    rts_observations.sensor_timestamps[chunk].tolist(),
+                    rts_observations.h_angles[chunk].tolist(),
+                    rts_observations.v_angles[chunk].tolist(),
+                    rts_observations.distances[chunk].tolist(),
+                    rts_observations.response_lengths[chunk].tolist(),
+                    rts_observations.geo_com_return_codes[chunk].tolist(),
+                    rts_observations.rpc_return_codes[chunk].tolist(),
+                )
+            )
+
+    def get_observations(self, job_id: UUID, raw: bool = False) -> RTSObservations:
+        if raw:
+            return self.get_rts_observations(job_id)
+        return self.get_corrected_rts_observations(job_id)
+
+    def export_measurements(
+        self, job_id: UUID, export_format: ExportFormat, raw: bool = False
+    ) -> Response:
+        job = self.rts_job_repository.get_rts_job(job_id)
+        content = export_observations(
+            export_format, self.get_observations(job_id, raw), job.rts_id, job_id
         )
-        measurements_str = "ref_time, ts_time, h_angle, v_angle, distance, num_chars, geocom_return_code, rpc_return_code\n"
-        measurements_str += "\n".join(
-            [
-                f"{m.controller_timestamp},{m.sensor_timestamp},{m.horizontal_angle},{m.vertical_angle},{m.distance},{m.response_length},{m.geocom_return_code},{m.rpc_return_code}"
-                for m in measurements
-            ]
+        kind = "raw" if raw else "corrected"
+        filename = f"{job.rts_id}_{job_id}_{datetime.fromtimestamp(job.created_at).strftime('%Y_%m_%d_%H_%M_%S')}_{kind}.{FILE_EXTENSIONS[export_format]}"
+
+        return Response(
+            content=content,
+            media_type=MEDIA_TYPES[export_format],
+            headers={"Content-Disposition": f"attachment; filename={filename}"},
         )
-        return PlainTextResponse(
-            content=measurements_str,
+
+    def export_measurements_bundle(
+        self,
+        job_ids: list[UUID] | None = None,
+        session_id: UUID | None = None,
+        raw: bool = False,
+    ) -> Response:
+        """Exports several jobs, given directly or as all jobs of a session, as one Arrow stream"""
+        job_ids = list(job_ids or [])
+        if session_id is not None:
+            session = self.session_repository.get_session(session_id)
+            job_ids += [job.id for rts in session.rts for job in rts.jobs]
+
+        observations = []
+        for job_id in dict.fromkeys(job_ids):
+            job = self.rts_job_repository.get_rts_job(job_id)
+            if not self.measurement_repository.has_measurements(job_id):
+                continue
+            observations.append((job.rts_id, job_id, self.get_observations(job_id, raw)))
+
+        if not observations:
+            raise NoMeasurementsAvailableException(
+                "No measurements found for the requested jobs"
+            )
+
+        kind = "raw" if raw else "corrected"
+        name = f"session_{session_id}" if session_id is not None else "jobs"
+        filename = f"{name}_{kind}.{FILE_EXTENSIONS[ExportFormat.ARROW]}"
+
+        return Response(
+            content=export_observations_bundle(observations),
+            media_type=MEDIA_TYPES[ExportFormat.ARROW],
             headers={"Content-Disposition": f"attachment; filename={filename}"},
         )
 
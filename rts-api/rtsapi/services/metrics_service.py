@@ -0,0 +1,85 @@
+from collections import Counter
+
+from fastapi import Depends
+
+from rtsapi.app_state import AppState
+from rtsapi.dependencies import get_app_state
+from rtsapi.metrics import registry, render_metric
+
+
+class MetricsService:
+    """
+    Renders the metrics in the Prometheus text format. Request, database,
+    ingest, synchronizer and cache metrics are recorded where they happen,
+    the state of connections and jobs is read from the app state on scrape.
+    """
+
+    def __init__(self, app_state: AppState = Depends(get_app_state)):
+        self.app_state = app_state
+
+    def render_metrics(self) -> str:
+        lines = registry.render() + self.render_app_state()
+        return "\n".join(lines) + "\n"
+
+    def render_app_state(self) -> list[str]:
+        app_state = self.app_state
+        connections = list(app_state.ingest_connections.values())
+        sources = Counter(stats.name.split(":", 1)[0] for stats in connections)
+        datarates = app_state.datarates.get_all()
+        corrected_observations = app_state.corrected_observations
+        cache_entries = [
+            (("intrinsic_delay",), len(app_state.intrinsic_delay_rates.entries)),
+            (("corrected_observations",), len(corrected_observations.entries)),
+        ]
+
+        return [
+            *render_metric(
+                "rtsapi_ingest_connections",
+                "gauge",
+                "Open websocket connections of the ingest.",
+                ("source",),
+                [((source,), count) for source, count in sources.items()],
+            ),
+            *render_metric(
+                "rtsapi_ingest_connection_frames_received_total",
+                "counter",
+                "Websocket frames received on an open ingest connection.",
+                ("connection",),
+                [((stats.name,), stats.frames_received) for stats in connections],
+            ),
+            *render_metric(
+                "rtsapi_ingest_connection_queue_depth",
+                "gauge",
+                "Frames of an open ingest connection waiting to be written.",
+                ("connection",),
+                [((stats.name,), stats.queue_depth) for stats in connections],
+            ),
+            *render_metric(
+                "rtsapi_measurement_stream_subscribers",
+                "gauge",
+                "Open websocket connections of the latest measurement stream.",
+                (),
+                [((), app_state.measurement_hub.num_subscriptions())],
+            ),
+            *render_metric(
+                "rtsapi_job_measurement_rate_hertz",
+                "gauge",
+                "Measurement rate of a running job over the data rate window.",
+                ("job_id",),
+                [((str(job_id),), rate.window) for job_id, rate in datarates.items()],
+            ),
+            *render_metric(
+                "rtsapi_cache_entries",
+                "gauge",
+                "Entries of the in-memory caches.",
+                ("cache",),
+                cache_entries,
+            ),
+            *render_metric(
+                "rtsapi_cache_bytes",
+                "gauge",
+                "Size of the corrected observations in the cache.",
+                ("cache",),
+                [(("corrected_observations",), corrected_observations.nbytes)],
+            ),
+        ]
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+
+from rtsapi.app_state import AppState
+from rtsapi.database import SessionLocal
+from rtsapi.database.device_repository import DeviceRepository
+from rtsapi.database.external_sensor_repository import ExternalSensorRepository
+from rtsapi.presence_registry import PRESENCE_FLUSH_INTERVAL
+
+logger = logging.getLogger("root")
+
+
+def flush_presence(app_state: AppState) -> None:
+    """
+    Write the heartbeats collected since the last flush in one transaction.
+    They stay unflushed if the transaction fails and are written next time.
+    """
+    devices = app_state.device_presence.collect_unflushed()
+    external_sensors = app_state.external_sensor_presence.collect_unflushed()
+    if not devices and not external_sensors:
+        return
+
+    with SessionLocal() as db:
+        DeviceRepository(db).set_last_seen(devices, commit=False)
+        ExternalSensorRepository(db).set_last_seen(external_sensors, commit=False)
+        db.commit()
+
+    app_state.device_presence.mark_flushed(devices)
+    app_state.external_sensor_presence.mark_flushed(external_sensors)
+
+
+async def flush_presence_periodically(app_state: AppState) -> None:
+    while True:
+        await asyncio.sleep(PRESENCE_FLUSH_INTERVAL)
+        try:
+            # on the writer thread, it waits for the ingest instead of competing
+            await app_state.database_writer.run(flush_presence, app_state)
+        except Exception as e:
+            logger.error(f"Writing last seen timestamps failed: {e}")
@@ -0,0 +1,107 @@
+import os
+from typing import Callable, Iterable
+from uuid import UUID
+
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from rtsapi import dtos
+from rtsapi.app_state import AppState
+from rtsapi.database import SessionLocal
+from rtsapi.database.measurement_repository import MeasurementRepository
+from rtsapi.database.rts_job_repository import RTSJobRepository
+from rtsapi.database.session_repository import SessionRepository
+from rtsapi.dependencies import get_app_state
+from rtsapi.exceptions import PurgeNotFoundException
+from rtsapi.mappers import PurgeMapper
+from rtsapi.purge_queue import PurgeTask
+
+# measurements deleted per transaction, the ingest path only waits for one chunk
+PURGE_CHUNK_SIZE = int(os.getenv("PURGE_CHUNK_SIZE", "10000"))
+
+
+def forget_jobs(app_state: AppState, job_ids: Iterable[UUID]) -> None:
+    for job_id in job_ids:
+        app_state.measurement_hub.close_job(job_id)
+        app_state.datarates.close_job(job_id)
+        app_state.latest_measurements.invalidate_job(job_id)
+        app_state.corrected_observations.remove_job(job_id)
+        app_state.job_control.stop(job_id)
+
+
+def run_purge(
+    app_state: AppState, delete_target: Callable[[Session], None], task: PurgeTask
+) -> None:
+    """
+    Delete the measurements of the task's jobs in chunks, then the target
+    row itself. Rows written meanwhile are removed by ON DELETE CASCADE.
+    """
+    with SessionLocal() as db:
+        measurement_repository = MeasurementRepository(db, RTSJobRepository(db))
+        for job_id in task.job_ids:
+            while num_deleted := measurement_repository.delete_measurement_chunk(
+                job_id, PURGE_CHUNK_SIZE
+            ):
+                task.num_deleted += num_deleted
+
+        delete_target(db)
+
+    # caches may have been refilled from the rows that were still there
+    forget_jobs(app_state, task.job_ids)
+
+
+class PurgeService:
+    def __init__(
+        self,
+        rts_job_repository: RTSJobRepository = Depends(RTSJobRepository),
+        session_repository: SessionRepository = Depends(SessionRepository),
+        app_state: AppState = Depends(get_app_state),
+    ) -> None:
+        self.rts_job_repository = rts_job_repository
+        self.session_repository = session_repository
+        self.app_state = app_state
+
+    def purge_rts_job(self, job_id: UUID) -> dtos.PurgeResponse:
+        db_rts_job = self.rts_job_repository.get_rts_job(job_id)
+        task = PurgeTask(
+            target=dtos.PurgeTarget.JOB,
+            target_id=job_id,
+            job_ids=[job_id],
+            num_measurements=db_rts_job.num_measurements or 0,
+        )
+        return self.submit(
+            task, lambda db: RTSJobRepository(db).delete_rts_job(job_id)
+        )
+
+    def purge_session(self, session_id: UUID) -> dtos.PurgeResponse:
+        self.session_repository.get_session(session_id)
+        db_rts_jobs = self.rts_job_repository.get_rts_jobs_for_session(session_id)
+        task = PurgeTask(
+            target=dtos.PurgeTarget.SESSION,
+            target_id=session_id,
+            job_ids=[job.id for job in db_rts_jobs],
+            num_measurements=sum(job.num_measurements or 0 for job in db_rts_jobs),
+        )
+        return self.submit(
+            task, lambda db: SessionRepository(db).delete_session(session_id)
+        )
+
+    def submit(
+        self, task: PurgeTask, delete_target: Callable[[Session], None]
+    ) -> dtos.PurgeResponse:
+        forget_jobs(self.app_state, task.job_ids)
+        task = self.app_state.purges.submit(
+            task, lambda task: run_purge(self.app_state, delete_target, task)
+        )
+        return PurgeMapper.to_dto(task)
+
+    def get_purge(self, purge_id: UUID) -> dtos.PurgeResponse:
+        task = self.app_state.purges.get(purge_id)
+
+        if task is None:
+            raise PurgeNotFoundException(purge_id)
+
+        return PurgeMapper.to_dto(task)
+
+    def get_purges(self) -> list[dtos.PurgeResponse]:
+        return [PurgeMapper.to_dto(task) for task in self.app_state.purges.get_all()]
@@ -1,16 +1,55 @@
+import asyncio
 import logging
+import os
+import time
+from typing import Callable
 from uuid import UUID
 
 from fastapi import Depends
 
 from rtsapi import dtos
+from rtsapi.app_state import AppState
+from rtsapi.database import SessionLocal
 from rtsapi.database.measurement_repository import MeasurementRepository
+from rtsapi.database.models import RTSJob
 from rtsapi.database.rts_job_repository import RTSJobRepository
 from rtsapi.database.rts_repository import RTSRepository
+from rtsapi.dependencies import get_app_state
+from rtsapi.exceptions import RTSJobNotRunningException
+from rtsapi.job_dispatcher import JOB_FETCH_MAX_WAIT
 from rtsapi.mappers import RTSJobMapper
 
 logger = logging.getLogger("root")
 
+# a claimed job is re-queued if its worker sends no heartbeat for this long
+JOB_LEASE_DURATION = float(os.getenv("JOB_LEASE_DURATION", "30"))
+JOB_LEASE_CHECK_INTERVAL = float(os.getenv("JOB_LEASE_CHECK_INTERVAL", "5"))
+
+
+def requeue_expired_jobs(app_state: AppState) -> list[UUID]:
+    with SessionLocal() as db:
+        job_ids = RTSJobRepository(db).requeue_expired_rts_jobs(time.time())
+
+    for job_id in job_ids:
+        logger.warning(f"Lease of RTSJob {job_id} expired, job is pending again")
+        app_state.measurement_hub.close_job(job_id)
+        app_state.datarates.close_job(job_id)
+        app_state.job_control.stop(job_id)
+
+    if job_ids:
+        app_state.job_dispatcher.notify()
+
+    return job_ids
+
+
+async def reap_expired_leases(app_state: AppState) -> None:
+    while True:
+        await asyncio.sleep(JOB_LEASE_CHECK_INTERVAL)
+        try:
+            requeue_expired_jobs(app_state)
+        except Exception as e:
+            logger.error(f"Re-queueing jobs with expired leases failed: {e}")
+
 
 class RTSJobService:
     def __init__(
@@ -18,7 +57,9 @@ class RTSJobService:
         rts_repository: RTSRepository = Depends(RTSRepository),
         rts_job_repository: RTSJobRepository = Depends(RTSJobRepository),
         measurement_repository: MeasurementRepository = Depends(MeasurementRepository),
+        app_state: AppState = Depends(get_app_state),
     ) -> None:
+        self.app_state = app_state
         self.rts_repository = rts_repository
         self.rts_job_repository = rts_job_repository
         self.measurement_repository = measurement_repository
@@ -26,24 +67,84 @@ class RTSJobService:
     def create_rts_job(
         self, create_rts_job_request: dtos.CreateRTSJobRequest
     ) -> dtos.RTSJobResponse:
-        self.rts_repository.get_rts(create_rts_job_request.rts_id)
+        db_rts = self.rts_repository.get_rts(create_rts_job_request.rts_id)
+        device_ip = db_rts.device.ip if db_rts.device is not None else None
         db_rts_job = RTSJobMapper.to_db(create_rts_job_request)
         created_rts_job = self.rts_job_repository.create_rts_job(db_rts_job)
+        self.app_state.job_dispatcher.notify(device_ip)
         return RTSJobMapper.to_dto(created_rts_job)
 
     def get_rts_job(self, job_id: UUID) -> dtos.RTSJobResponse:
         db_rts_job = self.rts_job_repository.get_rts_job(job_id)
         return RTSJobMapper.to_dto(db_rts_job)
 
-    def fetch_rts_job(
-        self, client_ip: str, job_types: list[dtos.RTSJobType]
-    ) -> dtos.RTSJobResponse:
-        db_rts_job = self.rts_job_repository.fetch_rts_job(client_ip, job_types)
+    async def fetch_rts_job(
+        self, client_ip: str, job_types: list[dtos.RTSJobType], wait: float = 0.0
+    ) -> dtos.RTSJobResponse | None:
+        """
+        Get the oldest pending job of the device. Without one, wait up to
+        `wait` seconds until a job for the device is created.
+        """
+        db_rts_job = await self.wait_for_rts_job(
+            client_ip,
+            wait,
+            lambda: self.rts_job_repository.fetch_rts_job(client_ip, job_types),
+        )
+        return RTSJobMapper.to_dto(db_rts_job) if db_rts_job is not None else None
 
+    async def claim_rts_job(
+        self, client_ip: str, job_types: list[dtos.RTSJobType], wait: float = 0.0
+    ) -> dtos.RTSJobClaimResponse | None:
+        """
+        Reserve the oldest pending job of the device for the caller, waiting
+        like fetch_rts_job. The lease has to be renewed until the job ends.
+        """
+        db_rts_job = await self.wait_for_rts_job(
+            client_ip,
+            wait,
+            lambda: self.rts_job_repository.claim_rts_job(
+                client_ip, job_types, JOB_LEASE_DURATION
+            ),
+        )
         if db_rts_job is None:
             return None
 
-        return RTSJobMapper.to_dto(db_rts_job)
+        self.app_state.measurement_hub.open_job(db_rts_job.id)
+        self.app_state.datarates.open_job(db_rts_job.id)
+        return RTSJobMapper.to_claim_dto(db_rts_job, JOB_LEASE_DURATION)
+
+    async def wait_for_rts_job(
+        self, client_ip: str, wait: float, lookup: Callable[[], RTSJob | None]
+    ) -> RTSJob | None:
+        deadline = time.monotonic() + min(max(wait, 0.0), JOB_FETCH_MAX_WAIT)
+
+        # registered before the lookup, a job created in between wakes it up
+        with self.app_state.job_dispatcher.waiter(client_ip) as waiter:
+            while True:
+                db_rts_job = lookup()
+                if db_rts_job is not None:
+                    return db_rts_job
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+
+                self.rts_job_repository.end_read()
+                if not await waiter.wait(remaining):
+                    return None
+
+    def renew_rts_job_lease(
+        self, job_id: UUID, lease_id: UUID
+    ) -> dtos.RTSJobLeaseResponse:
+        lease_expires_at = self.rts_job_repository.renew_rts_job_lease(
+            job_id, lease_id, JOB_LEASE_DURATION
+        )
+        return dtos.RTSJobLeaseResponse(
+            job_id=job_id,
+            lease_id=lease_id,
+            lease_expires_at=lease_expires_at,
+            lease_duration=JOB_LEASE_DURATION,
+        )
 
     def get_rts_job_status(self, job_id: UUID) -> dtos.RTSJobStatusResponse:
         db_rts_job = self.rts_job_repository.get_rts_job(job_id)
@@ -53,17 +154,45 @@ class RTSJobService:
 
     def get_all_rts_jobs(self) -> list[dtos.RTSJobResponse]:
         db_rts_jobs = self.rts_job_repository.get_all_rts_jobs()
-        return [RTSJobMapper.to_dto(rts_job) for rts_job in db_rts_jobs]
+        purging = self.app_state.purges.pending_target_ids()
+        return [
+            RTSJobMapper.to_dto(rts_job)
+            for rts_job in db_rts_jobs
+            if rts_job.id not in purging
+        ]
 
     def get_running_rts_jobs(self) -> list[dtos.RTSJobResponse]:
         db_rts_jobs = self.rts_job_repository.get_running_rts_jobs()
         return [RTSJobMapper.to_dto(rts_job) for rts_job in db_rts_jobs]
 
     def update_rts_job_status(
-        self, job_id: UUID, status: dtos.RTSJobStatus
+        self, job_id: UUID, status: dtos.RTSJobStatus, lease_id: UUID | None = None
     ) -> dtos.RTSJobResponse:
-        db_rts_job = self.rts_job_repository.update_rts_job_status(job_id, status)
+        db_rts_job = self.rts_job_repository.update_rts_job_status(
+            job_id, status, lease_id
+        )
+
+        if status == dtos.RTSJobStatus.RUNNING:
+            self.app_state.measurement_hub.open_job(job_id)
+            self.app_state.datarates.open_job(job_id)
+        else:
+            self.app_state.measurement_hub.close_job(job_id)
+            self.app_state.datarates.close_job(job_id)
+            self.app_state.job_control.stop(job_id)
+
         return RTSJobMapper.to_dto(db_rts_job)
 
-    def delete_rts_job(self, job_id: UUID) -> None:
-        self.rts_job_repository.delete_rts_job(job_id)
+    def get_rts_job_paused(self, job_id: UUID) -> dtos.RTSJobPauseResponse:
+        self.rts_job_repository.get_rts_job(job_id)
+        return dtos.RTSJobPauseResponse(
+            job_id=job_id, paused=self.app_state.job_control.is_paused(job_id)
+        )
+
+    def set_rts_job_paused(self, job_id: UUID, paused: bool) -> dtos.RTSJobPauseResponse:
+        db_rts_job = self.rts_job_repository.get_rts_job(job_id)
+
+        if db_rts_job.status != dtos.RTSJobStatus.RUNNING.value:
+            raise RTSJobNotRunningException(job_id)
+
+        self.app_state.job_control.set_paused(job_id, paused)
+        return dtos.RTSJobPauseResponse(job_id=job_id, paused=paused)
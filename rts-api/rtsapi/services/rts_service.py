@@ -3,6 +3,7 @@ from uuid import UUID
 from fastapi import Depends
 
 from rtsapi import dtos
+from rtsapi.app_state import AppState
 from rtsapi.database.device_repository import DeviceRepository
 from rtsapi.database.measurement_repository import MeasurementRepository
 from rtsapi.database.rts_job_repository import RTSJobRepository
@@ -10,6 +11,8 @@ from rtsapi.database.rts_repository import RTSRepository
 from rtsapi.database.session_repository import SessionRepository
 from rtsapi.database.tracking_settings_repository import \
     TrackingSettingsRepository
+from rtsapi.datarate_tracker import DataRate
+from rtsapi.dependencies import get_app_state
 from rtsapi.mappers import RTSMapper, TrackingSettingsMapper
 
 
@@ -24,7 +27,9 @@ class RTSService:
         ),
         device_repository: DeviceRepository = Depends(DeviceRepository),
         session_repository: SessionRepository = Depends(SessionRepository),
+        app_state: AppState = Depends(get_app_state),
     ) -> None:
+        self.app_state = app_state
         self.rts_repository = rts_repository
         self.rts_job_repository = rts_job_repository
         self.tracking_settings_repository = tracking_settings_repository
@@ -57,7 +62,9 @@ class RTSService:
     def update_rts(
         self, rts_id: UUID, update_rts_request: dtos.UpdateRTSRequest
     ) -> dtos.RTSResponse:
-        return self.rts_repository.update_rts(rts_id, update_rts_request)
+        updated_rts = self.rts_repository.update_rts(rts_id, update_rts_request)
+        self.app_state.corrected_observations.bump_rts(rts_id)
+        return updated_rts
 
     def delete_rts(self, rts_id: UUID) -> None:
         self.rts_repository.delete_rts(rts_id)
@@ -77,35 +84,55 @@ class RTSService:
         updated_settings = self.tracking_settings_repository.update_tracking_settings(
             rts_id, db_settings
         )
-        return TrackingSettingsMapper.to_dto(updated_settings)
+        settings = TrackingSettingsMapper.to_dto(updated_settings)
+
+        # a station that is tracking applies them right away
+        running_job = self.rts_job_repository.get_running_rts_job(rts_id)
+        if running_job is not None:
+            self.app_state.job_control.change_settings(running_job.id, settings)
+
+        return settings
 
     def get_rts_status(self, rts_id: UUID) -> dtos.RTSStatus:
         self.get_rts(rts_id)
         rts_job = self.rts_job_repository.get_running_rts_job(rts_id)
+        return self.build_rts_status(rts_id, rts_job)
+
+    def get_rts_statuses(
+        self, session_id: UUID | None = None
+    ) -> dict[UUID, dtos.RTSStatus]:
+        """Status of all RTS of a session from two queries and the in-memory state"""
+        if session_id is None:
+            rts_list = self.rts_repository.get_all_rts()
+        else:
+            rts_list = self.rts_repository.get_all_rts_for_session(session_id)
+
+        rts_ids = [rts.id for rts in rts_list]
+        running_jobs = {
+            rts_job.rts_id: rts_job
+            for rts_job in self.rts_job_repository.get_running_rts_jobs(rts_ids)
+        }
+        return {
+            rts_id: self.build_rts_status(rts_id, running_jobs.get(rts_id))
+            for rts_id in rts_ids
+        }
+
+    def build_rts_status(self, rts_id: UUID, rts_job) -> dtos.RTSStatus:
         rts_job_id = rts_job.id if rts_job is not None else None
         rts_busy = rts_job is not None
-        last_measurement = self.measurement_repository.get_last_measurement_of_rts(
-            rts_id
-        )
-        last_measurement_response = (
-            dtos.MeasurementResponse.model_validate(last_measurement)
-            if last_measurement is not None
-            else None
-        )
-        num_measurements = (
-            self.measurement_repository.get_number_of_measurements_for_job(rts_job_id)
-            if rts_job_id
-            else 0
+        last_measurement_response = self.app_state.latest_measurements.get_by_rts(
+            rts_id, self.measurement_repository.get_last_measurement_of_rts
         )
         datarate = (
-            self.measurement_repository.get_datarate_for_job(rts_job_id)
-            if rts_job_id
-            else 0.0
+            self.app_state.datarates.get(rts_job_id) if rts_busy else DataRate()
         )
         return dtos.RTSStatus(
             job_id=rts_job_id,
             busy=rts_busy,
             last_measurement=last_measurement_response,
-            num_measurements=num_measurements,
-            datarate=datarate,
+            num_measurements=datarate.num_measurements,
+            datarate=datarate.window,
+            instantaneous_datarate=datarate.instantaneous,
+            average_datarate=datarate.average,
+            num_dropouts=datarate.num_dropouts,
         )
@@ -3,7 +3,9 @@ from uuid import UUID
 from fastapi import Depends
 
 from rtsapi import dtos
+from rtsapi.app_state import AppState
 from rtsapi.database.session_repository import SessionRepository
+from rtsapi.dependencies import get_app_state
 from rtsapi.mappers import SessionMapper
 
 
@@ -11,8 +13,10 @@ class SessionService:
     def __init__(
         self,
         session_repository: SessionRepository = Depends(SessionRepository),
+        app_state: AppState = Depends(get_app_state),
     ) -> None:
         self.session_repository = session_repository
+        self.app_state = app_state
 
     def create_session(
         self, create_session_request: dtos.CreateSessionRequest
@@ -26,9 +30,11 @@ class SessionService:
         db_session = self.session_repository.get_session(session_id)
         return SessionMapper.to_dto(db_session)
 
-    def delete_session(self, session_id: UUID) -> None:
-        self.session_repository.delete_session(session_id)
-
     def get_sessions(self) -> list[dtos.SessionResponse]:
         db_sessions = self.session_repository.get_sessions()
-        return [SessionMapper.to_dto(db_session) for db_session in db_sessions]
+        purging = self.app_state.purges.pending_target_ids()
+        return [
+            SessionMapper.to_dto(db_session)
+            for db_session in db_sessions
+            if db_session.id not in purging
+        ]
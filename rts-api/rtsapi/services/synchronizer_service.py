@@ -1,17 +1,16 @@
+import math
 from enum import Enum
 from uuid import UUID
 
-import numpy as np
 from fastapi import Depends
 from trajectory_sync import Position, Synchronizer
 
 from rtsapi.app_state import AppState
-from rtsapi.database.measurement_repository import MeasurementRepository
-from rtsapi.database.rts_job_repository import RTSJobRepository
 from rtsapi.dependencies import get_app_state
 from rtsapi.dtos import (AddExternalSensorMeasurementRequest,
                          AddMeasurementRequest, SensorRolesResponse,
                          SynchronizerStateResponse)
+from rtsapi.metrics import SYNCHRONIZER_UPDATES
 
 
 class SensorRole(Enum):
@@ -30,15 +29,12 @@ class SynchronizerService:
     def __init__(
         self,
         app_state: AppState = Depends(get_app_state),
-        measurement_repository: MeasurementRepository = Depends(MeasurementRepository),
-        rts_job_repository: RTSJobRepository = Depends(RTSJobRepository),
     ):
         self.app_state = app_state
-        self.measurement_repository = measurement_repository
-        self.rts_job_repository = rts_job_repository
 
     def reset(self):
         self.app_state.synchronizer.clear()
+        self.app_state.previous_positions.clear()
 
     def get_state(self):
         state = self.app_state.synchronizer.state
@@ -53,6 +49,7 @@ class SynchronizerService:
         self, primary_sensor_id: UUID, secondary_sensor_id: UUID
     ) -> None:
         self.app_state.synchronizer.clear()
+        self.app_state.previous_positions.clear()
         self.app_state.primary_sensor_id = primary_sensor_id
         self.app_state.secondary_sensor_id = secondary_sensor_id
 
@@ -62,103 +59,63 @@ class SynchronizerService:
             secondary_sensor_id=self.app_state.secondary_sensor_id,
         )
 
-    def handle_rts_measurement(self, add_measurement_request: AddMeasurementRequest):
-        x = (
-            add_measurement_request.distance
-            * np.sin(add_measurement_request.vertical_angle)
-            * np.sin(add_measurement_request.horizontal_angle)
-        )
-        y = (
-            add_measurement_request.distance
-            * np.sin(add_measurement_request.vertical_angle)
-            * np.cos(add_measurement_request.horizontal_angle)
-        )
-        z = add_measurement_request.distance * np.cos(
-            add_measurement_request.vertical_angle
-        )
-
-        rts_job = self.rts_job_repository.get_rts_job(
-            add_measurement_request.rts_job_id
-        )
-        latest_measurement = self.measurement_repository.get_last_measurement_of_rts(
-            rts_job.rts_id
-        )
-
-        if self.app_state.primary_sensor_id == rts_job.rts_id:
-            sensor_role = SensorRole.PRIMARY
-        elif self.app_state.secondary_sensor_id == rts_job.rts_id:
-            sensor_role = SensorRole.SECONDARY
-        else:
-            return
-
-        if not latest_measurement:
-            position = Position(
-                x=x,
-                y=y,
-                z=z,
-                v=0.0,
-                timestamp=add_measurement_request.controller_timestamp,
-            )
-            handle_sensor_measurement[sensor_role](
-                self.app_state.synchronizer, position
-            )
-            return
+    def get_sensor_role(self, sensor_id: UUID) -> SensorRole | None:
+        if sensor_id == self.app_state.primary_sensor_id:
+            return SensorRole.PRIMARY
+        if sensor_id == self.app_state.secondary_sensor_id:
+            return SensorRole.SECONDARY
+        return None
 
-        delta_t = (
-            add_measurement_request.controller_timestamp
-            - latest_measurement.controller_timestamp
-        )
-
-        if delta_t <= 0:
-            position = Position(
-                x=x, y=y, z=z, timestamp=add_measurement_request.controller_timestamp
-            )
-            handle_sensor_measurement[sensor_role](
-                self.app_state.synchronizer, position
-            )
+    def handle_rts_measurement(
+        self, rts_id: UUID, add_measurement_request: AddMeasurementRequest
+    ):
+        sensor_role = self.get_sensor_role(rts_id)
+        if sensor_role is None:
             return
 
-        latest_x = (
-            latest_measurement.distance
-            * np.sin(latest_measurement.vertical_angle)
-            * np.sin(latest_measurement.horizontal_angle)
-        )
-        latest_y = (
-            latest_measurement.distance
-            * np.sin(latest_measurement.vertical_angle)
-            * np.cos(latest_measurement.horizontal_angle)
-        )
-        latest_z = latest_measurement.distance * np.cos(
-            latest_measurement.vertical_angle
-        )
-
-        velocity_x = (x - latest_x) / delta_t
-        velocity_y = (y - latest_y) / delta_t
-        velocity_z = (z - latest_z) / delta_t
-        v = np.sqrt(velocity_x**2 + velocity_y**2 + velocity_z**2)
-
-        position = Position(
-            x=x, y=y, z=z, v=v, timestamp=add_measurement_request.controller_timestamp
-        )
+        distance = add_measurement_request.distance
+        sin_v = math.sin(add_measurement_request.vertical_angle)
+        x = distance * sin_v * math.sin(add_measurement_request.horizontal_angle)
+        y = distance * sin_v * math.cos(add_measurement_request.horizontal_angle)
+        z = distance * math.cos(add_measurement_request.vertical_angle)
+        timestamp = add_measurement_request.controller_timestamp
+
+        # velocity from the previous position of the same sensor
+        previous_position = self.app_state.previous_positions.get(rts_id)
+        v = 0.0
+        if previous_position is not None:
+            delta_t = timestamp - previous_position.timestamp
+            if delta_t > 0:
+                v = (
+                    math.sqrt(
+                        (x - previous_position.x) ** 2
+                        + (y - previous_position.y) ** 2
+                        + (z - previous_position.z) ** 2
+                    )
+                    / delta_t
+                )
+            else:
+                v = previous_position.v
+
+        position = Position(timestamp=timestamp, x=x, y=y, z=z, v=v)
+        self.app_state.previous_positions[rts_id] = position
         handle_sensor_measurement[sensor_role](self.app_state.synchronizer, position)
+        SYNCHRONIZER_UPDATES.inc(sensor_role.value)
 
     def handle_external_sensor_measurement(
         self,
         external_sensor_id: UUID,
         add_external_sensor_measurement_request: AddExternalSensorMeasurementRequest,
     ):
-        if external_sensor_id == self.app_state.primary_sensor_id:
-            sensor_role = SensorRole.PRIMARY
-        elif external_sensor_id == self.app_state.secondary_sensor_id:
-            sensor_role = SensorRole.SECONDARY
-        else:
+        sensor_role = self.get_sensor_role(external_sensor_id)
+        if sensor_role is None:
             return
 
         position = Position(
             x=add_external_sensor_measurement_request.x,
             y=add_external_sensor_measurement_request.y,
             z=add_external_sensor_measurement_request.z,
-            v=np.sqrt(
+            v=math.sqrt(
                 add_external_sensor_measurement_request.vx**2
                 + add_external_sensor_measurement_request.vy**2
                 + add_external_sensor_measurement_request.vz**2
@@ -166,3 +123,4 @@ class SynchronizerService:
             timestamp=add_external_sensor_measurement_request.t,
         )
         handle_sensor_measurement[sensor_role](self.app_state.synchronizer, position)
+        SYNCHRONIZER_UPDATES.inc(sensor_role.value)
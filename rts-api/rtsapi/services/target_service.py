@@ -1,8 +1,10 @@
 from fastapi import Depends
 
+from rtsapi.app_state import AppState
 from rtsapi.database.measurement_repository import MeasurementRepository
 from rtsapi.database.rts_repository import RTSRepository
-from rtsapi.dtos import MeasurementResponse, TargetPosition
+from rtsapi.dependencies import get_app_state
+from rtsapi.dtos import TargetPosition
 from rtsapi.exceptions import NoMeasurementsAvailableException
 
 
@@ -11,17 +13,20 @@ class TargetService:
         self,
         measurement_repository: MeasurementRepository = Depends(MeasurementRepository),
         rts_repository: RTSRepository = Depends(RTSRepository),
+        app_state: AppState = Depends(get_app_state),
     ) -> None:
+        self.app_state = app_state
         self.measurement_repository = measurement_repository
         self.rts_repository = rts_repository
 
     def get_latest_target_position(self) -> TargetPosition:
-        measurement = self.measurement_repository.get_latest_measurement()
-        if measurement is None:
+        latest_measurement = self.app_state.latest_measurements.get_latest(
+            self.measurement_repository.get_last_measurement_of_rts
+        )
+        if latest_measurement is None:
             raise NoMeasurementsAvailableException(
                 "No measurements available to determine target position"
             )
-        latest_measurement = MeasurementResponse.model_validate(measurement)
         rts = self.rts_repository.get_rts(latest_measurement.rts_id)
         x = rts.station_x + latest_measurement.x
         y = rts.station_y + latest_measurement.y
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark for the intrinsic delay correction.
+
+Compares the previous implementation, which recomputed np.unwrap and the
+time differences from scratch in every iteration, with
+RTSObservations.apply_intrinsic_delay on synthetic 20 Hz observations of a
+prism moving on a circle, and reports the time of a cached re-application.
+
+Usage: PYTHONPATH=. python scripts/benchmark_intrinsic_delay.py [NUM_MEASUREMENTS ...]
+"""
+
+import copy
+import logging
+import sys
+import time
+
+import numpy as np
+
+from rtsapi.rts_observations import MEASUREMENT_DTYPE, RTSObservations
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+SIZES = [int(arg) for arg in sys.argv[1:]] or [10_000, 50_000, 150_000]
+RATE_HZ = 20
+INTRINSIC_DELAY = 0.0015
+
+
+def create_observations(num_measurements: int) -> RTSObservations:
+    t = 1.7e9 + np.arange(num_measurements) / RATE_HZ
+    columns = np.zeros(num_measurements, dtype=MEASUREMENT_DTYPE)
+    columns["controller_timestamp"] = t
+    columns["sensor_timestamp"] = t * 1000
+    columns["distance"] = 50 + np.cos(t / 7)
+    columns["horizontal_angle"] = (t / 3) % (2 * np.pi)
+    columns["vertical_angle"] = 1.5 + 0.1 * np.sin(t / 5)
+    return RTSObservations.from_arrays(columns)
+
+
+def legacy_apply_intrinsic_delay(
+    rts_observations: RTSObservations, intrinsic_delay: float
+) -> None:
+    def omega(angles: np.ndarray) -> np.ndarray:
+        delta_time = (
+            rts_observations.sensor_timestamps[1:]
+            - rts_observations.sensor_timestamps[:-1]
+        )
+        diff = np.unwrap(angles[1:]) - np.unwrap(angles[:-1])
+        return np.r_[diff / delta_time, 0]
+
+    delta_omega = np.inf
+    raw_h = copy.deepcopy(rts_observations.h_angles)
+    raw_v = copy.deepcopy(rts_observations.v_angles)
+    cnt = 0
+    while delta_omega > 1e-06:
+        if cnt > 100:
+            break
+
+        h_omega_before = omega(rts_observations.h_angles)
+        rts_observations.h_angles = raw_h + h_omega_before * intrinsic_delay
+        h_omega_after = omega(rts_observations.h_angles)
+
+        v_omega_before = omega(rts_observations.v_angles)
+        rts_observations.v_angles = raw_v + v_omega_before * intrinsic_delay
+        v_omega_after = omega(rts_observations.v_angles)
+
+        d_omega = abs(h_omega_before - h_omega_after) + abs(
+            v_omega_before - v_omega_after
+        )
+        delta_omega = sum(d_omega[~np.isinf(d_omega) & ~np.isnan(d_omega)])
+        cnt += 1
+
+
+def timed(func, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    logging.info(
+        f"{'rows':>8} {'legacy [s]':>11} {'engine [s]':>11} {'cached [s]':>11} {'speedup':>8} {'max diff [rad]':>15}"
+    )
+    for num_measurements in SIZES:
+        legacy = create_observations(num_measurements)
+        engine = create_observations(num_measurements)
+        cached = create_observations(num_measurements)
+
+        legacy_time, _ = timed(legacy_apply_intrinsic_delay, legacy, INTRINSIC_DELAY)
+        engine_time, rates = timed(engine.apply_intrinsic_delay, INTRINSIC_DELAY)
+        cached_time, _ = timed(cached.apply_intrinsic_delay, INTRINSIC_DELAY, rates)
+
+        max_diff = max(
+            np.max(np.abs(legacy.h_angles - engine.h_angles)),
+            np.max(np.abs(legacy.v_angles - engine.v_angles)),
+        )
+        logging.info(
+            f"{num_measurements:>8} {legacy_time:>11.4f} {engine_time:>11.4f} "
+            f"{cached_time:>11.5f} {legacy_time / engine_time:>7.1f}x {max_diff:>15.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Micro-benchmark for the clock drift line fit.
+
+Compares the previous implementation, which solved the normal equations with
+a dense design matrix and a sparse weight matrix, with the closed-form
+rtsapi.estimation.fit_line and its robust variant fit_line_robust on
+synthetic 20 Hz clock differences with a drift of 12 ppm and a few outliers.
+
+Usage: PYTHONPATH=. python scripts/benchmark_line_fit.py [NUM_MEASUREMENTS ...]
+"""
+
+import logging
+import sys
+import time
+
+import numpy as np
+from scipy.sparse import spdiags
+
+from rtsapi.estimation import fit_line, fit_line_robust
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+SIZES = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+RATE_HZ = 20
+DRIFT = 12e-06
+OFFSET = 1.7e9
+OUTLIER_RATIO = 0.001
+
+
+def create_clock_differences(num_measurements: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(42)
+    sensor_timestamps = 3600.0 + np.arange(num_measurements) / RATE_HZ
+    diff = OFFSET + DRIFT * sensor_timestamps + rng.normal(0, 1e-03, num_measurements)
+    outliers = rng.choice(num_measurements, int(num_measurements * OUTLIER_RATIO))
+    diff[outliers] += rng.uniform(0.05, 0.5, len(outliers))
+    return sensor_timestamps, diff
+
+
+def legacy_fit_line_2d(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    design_matrix = np.c_[x, np.ones((len(x), 1))]
+    weights = np.ones(len(y))
+    cov_matrix = spdiags(weights, 0, len(weights), len(weights))
+    return np.linalg.solve(
+        design_matrix.T @ cov_matrix @ design_matrix,
+        design_matrix.T @ cov_matrix @ y,
+    )
+
+
+def timed(func, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    logging.info(
+        f"{'rows':>8} {'legacy [s]':>11} {'closed [s]':>11} {'robust [s]':>11} {'speedup':>8} "
+        f"{'legacy [ppm]':>13} {'closed [ppm]':>13} {'robust [ppm]':>13} {'iter':>5}"
+    )
+    for num_measurements in SIZES:
+        x, y = create_clock_differences(num_measurements)
+
+        legacy_time, legacy = timed(legacy_fit_line_2d, x, y)
+        closed_time, closed = timed(fit_line, x, y)
+        robust_time, robust = timed(fit_line_robust, x, y)
+
+        logging.info(
+            f"{num_measurements:>8} {legacy_time:>11.4f} {closed_time:>11.4f} "
+            f"{robust_time:>11.4f} {legacy_time / closed_time:>7.1f}x "
+            f"{legacy[0] * 1e06:>13.4f} {closed.slope * 1e06:>13.4f} "
+            f"{robust.slope * 1e06:>13.4f} {robust.iterations:>5}"
+        )
+    logging.info(f"true drift: {DRIFT * 1e06:.4f} ppm")
+
+
+if __name__ == "__main__":
+    main()
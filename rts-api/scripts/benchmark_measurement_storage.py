@@ -0,0 +1,196 @@
+"""
+Storage benchmark for the measurements table.
+
+Compares the previous layout, which referenced job and RTS by UUID strings
+and carried an extra index on the primary key, with the current layout using
+compact integer keys. Both databases get the same interleaved inserts of
+several jobs in ingest-sized batches, then every job is read back in time
+order. Reports database size, bytes per row, insert rate and scan rate.
+
+Usage: PYTHONPATH=. python scripts/benchmark_measurement_storage.py [NUM_MEASUREMENTS_PER_JOB]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/compact.db"
+
+import numpy as np
+from sqlalchemy import (Column, Engine, Float, ForeignKey, Index, Integer,
+                        MetaData, Table, Uuid, create_engine, event, insert,
+                        select, text)
+
+from rtsapi import dtos
+from rtsapi.database import SessionLocal, engine, models, set_sqlite_pragmas
+from rtsapi.database.device_repository import DeviceRepository
+from rtsapi.database.measurement_repository import MeasurementRepository
+from rtsapi.database.migrations import migrate
+from rtsapi.database.rts_job_repository import RTSJobRepository
+from rtsapi.database.rts_repository import RTSRepository
+from rtsapi.database.session_repository import SessionRepository
+from rtsapi.mappers import (DeviceMapper, RTSJobMapper, RTSMapper,
+                            SessionMapper)
+from rtsapi.rts_observations import MEASUREMENT_DTYPE
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+NUM_MEASUREMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 250_000
+NUM_JOBS = 4
+BATCH_SIZE = 500
+
+# the measurements table before the compact keys
+legacy_metadata = MetaData()
+Table("rts", legacy_metadata, Column("id", Uuid, primary_key=True))
+Table(
+    "rts_jobs",
+    legacy_metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("rts_id", Uuid, ForeignKey("rts.id", ondelete="CASCADE")),
+)
+legacy_measurements = Table(
+    "measurements",
+    legacy_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    *(
+        Column(name, Float if MEASUREMENT_DTYPE[name].kind == "f" else Integer, nullable=False)
+        for name in MEASUREMENT_DTYPE.names
+    ),
+    Column("rts_id", Uuid, ForeignKey("rts.id", ondelete="CASCADE")),
+    Column("rts_job_id", Uuid, ForeignKey("rts_jobs.id", ondelete="CASCADE"), nullable=False),
+    Index("ix_measurements_rts_job_id_controller_timestamp", "rts_job_id", "controller_timestamp"),
+    Index("ix_measurements_rts_id_controller_timestamp", "rts_id", "controller_timestamp"),
+)
+
+
+def create_batch(start: int, references: dict) -> list[dict]:
+    t0 = 1.7e9
+    return [
+        {
+            "controller_timestamp": t0 + i / 20,
+            "sensor_timestamp": (t0 + i / 20) * 1000,
+            "response_length": 80,
+            "geocom_return_code": 0,
+            "rpc_return_code": 0,
+            "distance": 50.0 + i * 1e-4,
+            "horizontal_angle": 1.0 + i * 1e-6,
+            "vertical_angle": 1.5,
+            **references,
+        }
+        for i in range(start, start + BATCH_SIZE)
+    ]
+
+
+def insert_interleaved(engine: Engine, table: Table, references: list[dict]) -> float:
+    """Insert the jobs round-robin, one committed batch at a time like the ingest"""
+    start = time.perf_counter()
+    for offset in range(0, NUM_MEASUREMENTS, BATCH_SIZE):
+        for job_references in references:
+            with engine.begin() as connection:
+                connection.execute(insert(table), create_batch(offset, job_references))
+
+    return time.perf_counter() - start
+
+
+def database_size(engine: Engine) -> int:
+    with engine.connect() as connection:
+        connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        page_count = connection.execute(text("PRAGMA page_count")).scalar()
+        page_size = connection.execute(text("PRAGMA page_size")).scalar()
+
+    return page_count * page_size
+
+
+def benchmark_legacy() -> tuple[int, float, float]:
+    legacy_engine = create_engine(f"sqlite:///{TMP_DIR}/legacy.db")
+    event.listen(legacy_engine, "connect", set_sqlite_pragmas)
+    legacy_metadata.create_all(legacy_engine)
+
+    rts_id = uuid.uuid4()
+    job_ids = [uuid.uuid4() for _ in range(NUM_JOBS)]
+    with legacy_engine.begin() as connection:
+        connection.execute(insert(legacy_metadata.tables["rts"]), [{"id": rts_id}])
+        connection.execute(
+            insert(legacy_metadata.tables["rts_jobs"]),
+            [{"id": job_id, "rts_id": rts_id} for job_id in job_ids],
+        )
+
+    insert_time = insert_interleaved(
+        legacy_engine,
+        legacy_measurements,
+        [{"rts_id": rts_id, "rts_job_id": job_id} for job_id in job_ids],
+    )
+
+    start = time.perf_counter()
+    with legacy_engine.connect() as connection:
+        for job_id in job_ids:
+            query = (
+                select(*(legacy_measurements.c[name] for name in MEASUREMENT_DTYPE.names))
+                .where(legacy_measurements.c.rts_job_id == job_id)
+                .order_by(legacy_measurements.c.controller_timestamp.asc())
+            )
+            result = connection.execute(query)
+            np.array(result.cursor.fetchall(), dtype=MEASUREMENT_DTYPE)
+    scan_time = time.perf_counter() - start
+
+    return database_size(legacy_engine), insert_time, scan_time
+
+
+def benchmark_compact() -> tuple[int, float, float]:
+    migrate(engine, models.Base.metadata)
+    with SessionLocal() as db:
+        session = SessionRepository(db).add_session(
+            SessionMapper.to_db(dtos.CreateSessionRequest(name="storage"))
+        )
+        device = DeviceRepository(db).add_device(
+            DeviceMapper.to_db(dtos.CreateDeviceRequest(ip="127.0.0.1", last_seen=0.0))
+        )
+        rts = RTSRepository(db).create_rts(
+            RTSMapper.to_db(
+                dtos.CreateRTSRequest(name="storage", device_id=device.id, session_id=session.id)
+            )
+        )
+        jobs = [
+            RTSJobRepository(db).create_rts_job(
+                RTSJobMapper.to_db(
+                    dtos.CreateRTSJobRequest(rts_id=rts.id, job_type=dtos.RTSJobType.DUMMY_TRACKING)
+                )
+            )
+            for _ in range(NUM_JOBS)
+        ]
+        rts_key = rts.key
+        job_ids = [job.id for job in jobs]
+        references = [{"rts_key": rts_key, "rts_job_key": job.key} for job in jobs]
+
+    insert_time = insert_interleaved(engine, models.Measurement.__table__, references)
+
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        repository = MeasurementRepository(db, RTSJobRepository(db))
+        for job_id in job_ids:
+            repository.get_measurement_columns(job_id)
+    scan_time = time.perf_counter() - start
+
+    return database_size(engine), insert_time, scan_time
+
+
+def main():
+    num_rows = NUM_MEASUREMENTS * NUM_JOBS
+    logging.info(f"{NUM_JOBS} jobs with {NUM_MEASUREMENTS} measurements each, {num_rows} rows")
+    logging.info(
+        f"{'layout':>8} {'size [MB]':>10} {'bytes/row':>10} {'insert [rows/s]':>16} {'scan [rows/s]':>14}"
+    )
+    for name, benchmark in (("legacy", benchmark_legacy), ("compact", benchmark_compact)):
+        size, insert_time, scan_time = benchmark()
+        logging.info(
+            f"{name:>8} {size / 1e6:>10.1f} {size / num_rows:>10.1f} "
+            f"{num_rows / insert_time:>16.0f} {num_rows / scan_time:>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark for building RTSObservations of a job.
+
+Compares the original path (ORM rows -> MeasurementResponse -> RTSObservations)
+with the columnar path (cursor -> structured array -> RTSObservations.from_arrays)
+on a temporary SQLite database with synthetic 20 Hz measurements.
+
+Usage: PYTHONPATH=. python scripts/benchmark_rts_observations.py [NUM_MEASUREMENTS ...]
+"""
+
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/benchmark.db"
+
+import numpy as np
+
+from rtsapi import dtos
+from rtsapi.database import SessionLocal, engine, models
+from rtsapi.database.device_repository import DeviceRepository
+from rtsapi.database.measurement_repository import MeasurementRepository
+from rtsapi.database.rts_job_repository import RTSJobRepository
+from rtsapi.database.rts_repository import RTSRepository
+from rtsapi.database.session_repository import SessionRepository
+from rtsapi.mappers import (DeviceMapper, MeasurementMapper, RTSJobMapper,
+                            RTSMapper, SessionMapper)
+from rtsapi.rts_observations import RTSObservations
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+SIZES = [int(arg) for arg in sys.argv[1:]] or [10_000, 50_000, 150_000]
+RATE_HZ = 20
+
+
+def create_job(db, num_measurements: int) -> uuid.UUID:
+    session = SessionRepository(db).add_session(
+        SessionMapper.to_db(dtos.CreateSessionRequest(name="benchmark"))
+    )
+    device = DeviceRepository(db).add_device(
+        DeviceMapper.to_db(dtos.CreateDeviceRequest(ip="127.0.0.1", last_seen=0.0))
+    )
+    rts = RTSRepository(db).create_rts(
+        RTSMapper.to_db(
+            dtos.CreateRTSRequest(
+                name="benchmark", device_id=device.id, session_id=session.id
+            )
+        )
+    )
+    job = RTSJobRepository(db).create_rts_job(
+        RTSJobMapper.to_db(
+            dtos.CreateRTSJobRequest(
+                rts_id=rts.id, job_type=dtos.RTSJobType.DUMMY_TRACKING
+            )
+        )
+    )
+
+    rows = []
+    for i in range(num_measurements):
+        t = 1.7e9 + i / RATE_HZ
+        rows.append(
+            {
+                "controller_timestamp": t,
+                "sensor_timestamp": t * 1000,
+                "response_length": 80,
+                "geocom_return_code": 0,
+                "rpc_return_code": 0,
+                "distance": 50 + math.cos(t),
+                "horizontal_angle": math.sin(t / 10) % (2 * math.pi),
+                "vertical_angle": 1.5,
+                "rts_id": rts.id,
+                "rts_job_id": job.id,
+            }
+        )
+    MeasurementRepository(db, RTSJobRepository(db)).add_measurement_rows(rows)
+    return job.id
+
+
+def build_from_dtos(repository: MeasurementRepository, job_id: uuid.UUID):
+    measurements = [
+        MeasurementMapper.to_dto(measurement)
+        for measurement in repository.get_measurements(job_id)
+    ]
+    return RTSObservations(measurements)
+
+
+def build_from_arrays(repository: MeasurementRepository, job_id: uuid.UUID):
+    return RTSObservations.from_arrays(
+        repository.get_measurement_columns(job_id), rts_job_id=job_id
+    )
+
+
+def measure(func, *args) -> tuple[RTSObservations, float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration, peak / 1e6
+
+
+def main():
+    models.Base.metadata.create_all(bind=engine)
+
+    logging.info(
+        f"{'rows':>8} {'dto [s]':>9} {'dto [MB]':>9} {'array [s]':>10} {'array [MB]':>11} {'speedup':>8}"
+    )
+    for num_measurements in SIZES:
+        with SessionLocal() as db:
+            job_id = create_job(db, num_measurements)
+
+        with SessionLocal() as db:
+            repository = MeasurementRepository(db, RTSJobRepository(db))
+            from_dtos, dto_time, dto_memory = measure(build_from_dtos, repository, job_id)
+
+        with SessionLocal() as db:
+            repository = MeasurementRepository(db, RTSJobRepository(db))
+            from_arrays, array_time, array_memory = measure(
+                build_from_arrays, repository, job_id
+            )
+
+        assert np.array_equal(from_dtos.sensor_timestamps, from_arrays.sensor_timestamps)
+        assert np.array_equal(from_dtos.rts_dhv, from_arrays.rts_dhv)
+        assert np.array_equal(from_dtos.response_lengths, from_arrays.response_lengths)
+
+        logging.info(
+            f"{num_measurements:>8} {dto_time:>9.3f} {dto_memory:>9.1f} "
+            f"{array_time:>10.3f} {array_memory:>11.1f} {dto_time / array_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
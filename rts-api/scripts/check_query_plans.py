@@ -0,0 +1,173 @@
+"""
+Query plan regression check for the hot database queries.
+
+Runs the repository methods against a temporary, migrated SQLite database,
+captures the SQL they emit and asserts with EXPLAIN QUERY PLAN that every
+access to the measurements and rts_jobs tables uses an index and that
+time-ordered reads need no extra sort. Exits with 1 if a plan regressed.
+
+Usage: PYTHONPATH=. python scripts/check_query_plans.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/query_plans.db"
+
+from sqlalchemy import event, text
+
+from rtsapi import dtos
+from rtsapi.database import SessionLocal, engine, models
+from rtsapi.database.device_repository import DeviceRepository
+from rtsapi.database.measurement_repository import MeasurementRepository
+from rtsapi.database.migrations import migrate
+from rtsapi.database.rts_job_repository import RTSJobRepository
+from rtsapi.database.rts_repository import RTSRepository
+from rtsapi.database.session_repository import SessionRepository
+from rtsapi.mappers import (DeviceMapper, RTSJobMapper, RTSMapper,
+                            SessionMapper)
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+NUM_JOBS = 4
+NUM_MEASUREMENTS = 2000
+CHECKED_TABLES = ("measurements", "rts_jobs")
+
+
+def create_data(db) -> tuple[uuid.UUID, uuid.UUID]:
+    session = SessionRepository(db).add_session(
+        SessionMapper.to_db(dtos.CreateSessionRequest(name="query plans"))
+    )
+    device = DeviceRepository(db).add_device(
+        DeviceMapper.to_db(dtos.CreateDeviceRequest(ip="127.0.0.1", last_seen=0.0))
+    )
+    rts = RTSRepository(db).create_rts(
+        RTSMapper.to_db(
+            dtos.CreateRTSRequest(
+                name="query plans", device_id=device.id, session_id=session.id
+            )
+        )
+    )
+    rts_job_repository = RTSJobRepository(db)
+    measurement_repository = MeasurementRepository(db, rts_job_repository)
+    for _ in range(NUM_JOBS):
+        job = rts_job_repository.create_rts_job(
+            RTSJobMapper.to_db(
+                dtos.CreateRTSJobRequest(
+                    rts_id=rts.id, job_type=dtos.RTSJobType.DUMMY_TRACKING
+                )
+            )
+        )
+        rts_job_repository.update_rts_job_status(job.id, dtos.RTSJobStatus.RUNNING)
+        t0 = time.time()
+        measurement_repository.add_measurement_rows(
+            [
+                {
+                    "controller_timestamp": t0 + i / 20,
+                    "sensor_timestamp": (t0 + i / 20) * 1000,
+                    "response_length": 80,
+                    "geocom_return_code": 0,
+                    "rpc_return_code": 0,
+                    "distance": 50.0,
+                    "horizontal_angle": 1.0,
+                    "vertical_angle": 1.5,
+                    "rts_id": rts.id,
+                    "rts_job_id": job.id,
+                }
+                for i in range(NUM_MEASUREMENTS)
+            ]
+        )
+
+    return rts.id, job.id
+
+
+def capture_statements(func, *args) -> list[tuple[str, tuple]]:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func(*args)
+        # drain generators such as the streaming reads
+        if hasattr(result, "__next__"):
+            for _ in result:
+                pass
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return statements
+
+
+def check_plan(name: str, statement: str, parameters, ordered: bool) -> list[str]:
+    with engine.connect() as connection:
+        plan = [
+            row[-1]
+            for row in connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+        ]
+
+    problems = []
+    for step in plan:
+        table_access = step.startswith(("SCAN", "SEARCH"))
+        if table_access and any(f" {table}" in step for table in CHECKED_TABLES):
+            if "USING" not in step:
+                problems.append(f"{name}: no index used: {step}")
+        if ordered and "TEMP B-TREE FOR ORDER BY" in step:
+            problems.append(f"{name}: sorts instead of reading in index order: {step}")
+
+    logging.info(f"{name}:\n    " + "\n    ".join(plan))
+    return problems
+
+
+def main():
+    migrate(engine, models.Base.metadata)
+    with SessionLocal() as db:
+        rts_id, job_id = create_data(db)
+
+    with SessionLocal() as db:
+        rts_job_repository = RTSJobRepository(db)
+        measurement_repository = MeasurementRepository(db, rts_job_repository)
+        # (name, method, args, ordered by controller_timestamp)
+        queries = [
+            ("get_measurements", measurement_repository.get_measurements, (job_id,), True),
+            ("get_measurement_columns", measurement_repository.get_measurement_columns, (job_id,), True),
+            ("get_measurement_page", measurement_repository.get_measurement_page, (job_id, 0.0, 0, 100), True),
+            ("iter_measurement_rows", measurement_repository.iter_measurement_rows, (job_id,), False),
+            ("get_last_measurement_of_rts", measurement_repository.get_last_measurement_of_rts, (rts_id,), True),
+            ("get_latest_measurements", measurement_repository.get_latest_measurements, (), False),
+            ("get_last_measurements_of_all_rts", measurement_repository.get_last_measurements_of_all_rts, (), False),
+            ("get_running_rts_job", rts_job_repository.get_running_rts_job, (rts_id,), False),
+            ("get_running_rts_jobs", rts_job_repository.get_running_rts_jobs, ([rts_id],), False),
+            ("get_static_rts_job", rts_job_repository.get_static_rts_job, (rts_id,), False),
+            ("fetch_rts_job", rts_job_repository.fetch_rts_job, ("127.0.0.1", []), False),
+            ("requeue_expired_rts_jobs", rts_job_repository.requeue_expired_rts_jobs, (0.0,), False),
+        ]
+
+        problems = []
+        for name, method, args, ordered in queries:
+            for statement, parameters in capture_statements(method, *args):
+                if not statement.lstrip().upper().startswith("SELECT"):
+                    continue
+                problems += check_plan(name, statement, parameters, ordered)
+
+    with engine.connect() as connection:
+        version = connection.execute(text("SELECT version FROM schema_version")).scalar()
+    logging.info(f"schema version: {version}")
+
+    if problems:
+        logging.error("Query plan regressions:\n" + "\n".join(problems))
+        sys.exit(1)
+
+    logging.info("All hot queries use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Check of the measurement websocket for frames that are not JSON.
+
+The connection has to be closed with a policy violation, and the rows that
+were received before the invalid frame are still written.
+
+Usage: PYTHONPATH=. python scripts/ingest_frame_test.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+NUM_MEASUREMENTS = 20
+RATE_HZ = 20
+START_TIMESTAMP = 1_700_000_000.0
+POLICY_VIOLATION = 1008
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        logging.error(f"FAILED: {message}")
+        sys.exit(1)
+    logging.info(f"ok: {message}")
+
+
+def create_frames(job_id: str) -> list[dict]:
+    return [
+        {
+            "controller_timestamp": START_TIMESTAMP + i / RATE_HZ,
+            "sensor_timestamp": (START_TIMESTAMP + i / RATE_HZ) * 1000,
+            "response_length": 80,
+            "geocom_return_code": 0,
+            "rpc_return_code": 0,
+            "distance": 10.0,
+            "horizontal_angle": 0.1,
+            "vertical_angle": 1.5,
+            "rts_job_id": job_id,
+        }
+        for i in range(NUM_MEASUREMENTS)
+    ]
+
+
+def run() -> None:
+    from fastapi.testclient import TestClient
+    from starlette.websockets import WebSocketDisconnect
+
+    import main
+
+    with TestClient(main.app) as client:
+        device = client.post("/devices/register").json()
+        session = client.post("/session", json={"name": "ingest frames"}).json()
+        rts = client.post(
+            "/rts/", json={"device_id": device["id"], "session_id": session["id"]}
+        ).json()
+        job_id = client.post(
+            "/jobs", json={"rts_id": rts["id"], "job_type": "dummy_tracking"}
+        ).json()["job_id"]
+        client.put(f"/jobs/{job_id}?job_status=running")
+
+        close_code = None
+        with client.websocket_connect(f"/ws/measurements/{job_id}") as websocket:
+            websocket.send_json(create_frames(job_id))
+            websocket.send_text("not json")
+            try:
+                # the control messages come first, then the close
+                while True:
+                    websocket.receive_json()
+            except WebSocketDisconnect as e:
+                close_code = e.code
+            # leaving the session cancels the handler, let it write the rows
+            time.sleep(0.5)
+
+        check(close_code == POLICY_VIOLATION, "invalid frame closes the connection")
+
+        raw = client.get(f"/measurements/raw?job_id={job_id}").json()
+        check(len(raw) == NUM_MEASUREMENTS, "frames before the invalid frame written")
+        connections = client.get("/measurements/ingest").json()
+        check(len(connections) == 0, "connection released")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{directory}/ingest_frame.db"
+        run()
+
+    logging.info("Invalid ingest frames close the connection")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Concurrency test for claiming jobs.
+
+Starts the API with several server processes on a temporary database and
+lets many simulated workers claim, and finish, jobs of the same device at
+the same time. Every job has to be claimed exactly once. Afterwards a job
+is claimed without renewing its lease, it has to become pending again and
+the stale lease has to be rejected. Exits with 1 on a failure.
+
+The server processes share only the database, which is what the claim
+relies on. A claim waiting in one process is not woken by a job created in
+another one, so the waiting claim is not part of this test.
+
+Usage: PYTHONPATH=. python scripts/job_claim_test.py [NUM_WORKERS] [NUM_JOBS]
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import requests
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/job_claims.db"
+os.environ["JOB_LEASE_DURATION"] = "2"
+os.environ["JOB_LEASE_CHECK_INTERVAL"] = "0.5"
+
+from rtsapi.database import engine, models
+from rtsapi.database.migrations import migrate
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+NUM_WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+NUM_JOBS = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+NUM_PROCESSES = 4
+PORT = 8765
+API_URL = f"http://127.0.0.1:{PORT}"
+TIMEOUT = 10
+
+
+def start_api() -> subprocess.Popen:
+    # migrated once up front, the server processes would race for it
+    migrate(engine, models.Base.metadata)
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT),
+            "--workers", str(NUM_PROCESSES), "--log-level", "warning",
+        ],
+        env=os.environ,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{API_URL}/", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError("API did not start")
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        logging.error(f"FAILED: {message}")
+        raise SystemExit(1)
+    logging.info(f"ok: {message}")
+
+
+def create_rts() -> str:
+    device = requests.post(f"{API_URL}/devices/register", timeout=TIMEOUT).json()
+    session = requests.post(
+        f"{API_URL}/session", json={"name": "job claims"}, timeout=TIMEOUT
+    ).json()
+    rts = requests.post(
+        f"{API_URL}/rts/",
+        json={"device_id": device["id"], "session_id": session["id"]},
+        timeout=TIMEOUT,
+    ).json()
+    return rts["id"]
+
+
+def create_job(rts_id: str) -> str:
+    response = requests.post(
+        f"{API_URL}/jobs",
+        json={"rts_id": rts_id, "job_type": "dummy_tracking"},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()["job_id"]
+
+
+def claim(wait: float = 0.0) -> dict | None:
+    response = requests.post(
+        f"{API_URL}/jobs/claim", params={"wait": wait}, timeout=wait + TIMEOUT
+    )
+    if response.status_code == 204:
+        return None
+
+    response.raise_for_status()
+    return response.json()
+
+
+def set_status(job_id: str, status: str, lease_id: str) -> int:
+    return requests.put(
+        f"{API_URL}/jobs/{job_id}",
+        params={"job_status": status, "lease_id": lease_id},
+        timeout=TIMEOUT,
+    ).status_code
+
+
+def simulated_worker(claimed: list[str], errors: list[str]) -> None:
+    while True:
+        try:
+            job = claim()
+        except requests.RequestException as e:
+            errors.append(str(e))
+            continue
+
+        if job is None:
+            return
+
+        claimed.append(job["job_id"])
+        status_code = set_status(job["job_id"], "finished", job["lease_id"])
+        if status_code != 200:
+            errors.append(f"finishing {job['job_id']} returned {status_code}")
+
+
+def test_concurrent_claims(rts_id: str) -> None:
+    job_ids = {create_job(rts_id) for _ in range(NUM_JOBS)}
+
+    claimed: list[str] = []
+    errors: list[str] = []
+    workers = [
+        threading.Thread(target=simulated_worker, args=(claimed, errors))
+        for _ in range(NUM_WORKERS)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    logging.info(
+        f"{NUM_WORKERS} workers on {NUM_PROCESSES} server processes claimed "
+        f"{len(claimed)} jobs in {elapsed:.2f} s ({len(claimed) / elapsed:.0f} jobs/s)"
+    )
+    duplicates = [job_id for job_id, count in Counter(claimed).items() if count > 1]
+    check(not errors, f"no request errors {errors[:3]}")
+    check(not duplicates, f"no job claimed twice {duplicates[:3]}")
+    check(set(claimed) == job_ids, "every job claimed")
+
+
+def test_expired_lease(rts_id: str) -> None:
+    job_id = create_job(rts_id)
+    job = claim()
+    check(job is not None and job["job_id"] == job_id, "job claimed")
+    check(job["job_status"] == "running", "claimed job is running")
+
+    renewed = requests.put(
+        f"{API_URL}/jobs/{job_id}/lease",
+        params={"lease_id": job["lease_id"]},
+        timeout=TIMEOUT,
+    )
+    check(renewed.status_code == 200, "lease renewed")
+
+    # no more heartbeats, the lease expires and the job is pending again
+    time.sleep(job["lease_duration"] + 1.5)
+    status = requests.get(f"{API_URL}/jobs/{job_id}/status", timeout=TIMEOUT).json()
+    check(status["job_status"] == "pending", "job re-queued after the lease expired")
+
+    stale = requests.put(
+        f"{API_URL}/jobs/{job_id}/lease",
+        params={"lease_id": job["lease_id"]},
+        timeout=TIMEOUT,
+    )
+    check(stale.status_code == 409, "stale lease rejected")
+
+    reclaimed = claim(wait=1.0)
+    check(
+        reclaimed is not None
+        and reclaimed["job_id"] == job_id
+        and reclaimed["lease_id"] != job["lease_id"],
+        "re-queued job claimed again with a new lease",
+    )
+    check(set_status(job_id, "failed", job["lease_id"]) == 409, "stale worker cannot fail the job")
+    check(set_status(job_id, "finished", reclaimed["lease_id"]) == 200, "new worker finishes the job")
+
+
+def main():
+    process = start_api()
+    try:
+        rts_id = create_rts()
+        test_concurrent_claims(rts_id)
+        test_expired_lease(rts_id)
+    finally:
+        process.terminate()
+        process.wait()
+
+    logging.info("Job claims are exclusive")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Check of the job statistics that are aggregated while measurements arrive.
+
+Streams measurements of a running job, finishes it and then writes more
+measurements of the job, as a batch that is flushed after the status change
+does. The final duration and data rate have to cover all measurements.
+
+Usage: PYTHONPATH=. python scripts/job_statistics_test.py
+"""
+
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+NUM_MEASUREMENTS = 200
+RATE_HZ = 20
+START_TIMESTAMP = 1_700_000_000.0
+# the timestamps are stored with limited precision
+TOLERANCE = 1e-6
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        logging.error(f"FAILED: {message}")
+        sys.exit(1)
+    logging.info(f"ok: {message}")
+
+
+def create_frames(job_id: str, start: float) -> list[dict]:
+    return [
+        {
+            "controller_timestamp": start + i / RATE_HZ,
+            "sensor_timestamp": (start + i / RATE_HZ) * 1000,
+            "response_length": 80,
+            "geocom_return_code": 0,
+            "rpc_return_code": 0,
+            "distance": 10 + math.sin(i / 10),
+            "horizontal_angle": 0.1 * i / NUM_MEASUREMENTS,
+            "vertical_angle": 1.5,
+            "rts_job_id": job_id,
+        }
+        for i in range(NUM_MEASUREMENTS)
+    ]
+
+
+def run() -> None:
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        device = client.post("/devices/register").json()
+        session = client.post("/session", json={"name": "job statistics"}).json()
+        rts = client.post(
+            "/rts/", json={"device_id": device["id"], "session_id": session["id"]}
+        ).json()
+        job_id = client.post(
+            "/jobs", json={"rts_id": rts["id"], "job_type": "dummy_tracking"}
+        ).json()["job_id"]
+        client.put(f"/jobs/{job_id}?job_status=running")
+
+        with client.websocket_connect(f"/ws/measurements/{job_id}") as websocket:
+            websocket.send_json(create_frames(job_id, START_TIMESTAMP))
+            time.sleep(1.0)
+        job = client.put(f"/jobs/{job_id}?job_status=finished").json()
+        span = (NUM_MEASUREMENTS - 1) / RATE_HZ
+        check(
+            job["num_measurements"] == NUM_MEASUREMENTS
+            and math.isclose(job["duration"], span, rel_tol=TOLERANCE)
+            and math.isclose(
+                job["datarate"], NUM_MEASUREMENTS / span, rel_tol=TOLERANCE
+            ),
+            "statistics of the finished job",
+        )
+
+        # the second half arrives after the job was finished
+        late_start = START_TIMESTAMP + NUM_MEASUREMENTS / RATE_HZ
+        for frame in create_frames(job_id, late_start):
+            client.post("/measurements", json=frame).raise_for_status()
+
+        job = client.get(f"/jobs/{job_id}").json()
+        span = (2 * NUM_MEASUREMENTS - 1) / RATE_HZ
+        check(
+            job["num_measurements"] == 2 * NUM_MEASUREMENTS, "late measurements counted"
+        )
+        check(
+            math.isclose(job["duration"], span, rel_tol=TOLERANCE),
+            "duration covers the late measurements",
+        )
+        check(
+            math.isclose(
+                job["datarate"], 2 * NUM_MEASUREMENTS / span, rel_tol=TOLERANCE
+            ),
+            "data rate derived from the duration, not smoothed",
+        )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{directory}/job_statistics.db"
+        run()
+
+    logging.info("Job statistics cover late measurements")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Check of the clock drift line fit for data that does not determine a line.
+
+A single sample or samples at one sensor time leave the slope undetermined.
+The fit has to reject them instead of returning NaN, and the corrected
+measurements of such a job are reported as not available.
+
+Usage: PYTHONPATH=. python scripts/line_fit_test.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from rtsapi.estimation import fit_line, fit_line_robust
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+START_TIMESTAMP = 1_700_000_000.0
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        logging.error(f"FAILED: {message}")
+        sys.exit(1)
+    logging.info(f"ok: {message}")
+
+
+def raises_value_error(fit, x: np.ndarray, y: np.ndarray) -> bool:
+    try:
+        fit(x, y)
+    except ValueError:
+        return True
+    return False
+
+
+def test_undetermined_fits() -> None:
+    for fit in (fit_line, fit_line_robust):
+        name = fit.__name__
+        check(
+            raises_value_error(fit, np.array([START_TIMESTAMP]), np.array([0.1])),
+            f"{name} rejects a single sample",
+        )
+        check(
+            raises_value_error(fit, np.full(5, START_TIMESTAMP), np.arange(5.0)),
+            f"{name} rejects samples at one abscissa",
+        )
+
+    x = START_TIMESTAMP + np.arange(10.0)
+    fit = fit_line(x, 2e-6 * x + 0.5)
+    check(
+        np.isclose(fit.slope, 2e-6) and np.all(np.isfinite(fit.std_devs)),
+        "regular fit",
+    )
+
+
+def test_corrected_measurements() -> None:
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        device = client.post("/devices/register").json()
+        session = client.post("/session", json={"name": "line fit"}).json()
+        rts = client.post(
+            "/rts/", json={"device_id": device["id"], "session_id": session["id"]}
+        ).json()
+        job_id = client.post(
+            "/jobs", json={"rts_id": rts["id"], "job_type": "dummy_tracking"}
+        ).json()["job_id"]
+        client.put(f"/jobs/{job_id}?job_status=running")
+        for i in range(3):
+            client.post(
+                "/measurements",
+                json={
+                    "controller_timestamp": START_TIMESTAMP + i,
+                    # the sensor clock did not advance
+                    "sensor_timestamp": START_TIMESTAMP * 1000,
+                    "response_length": 80,
+                    "geocom_return_code": 0,
+                    "rpc_return_code": 0,
+                    "distance": 10.0,
+                    "horizontal_angle": 0.1,
+                    "vertical_angle": 1.5,
+                    "rts_job_id": job_id,
+                },
+            ).raise_for_status()
+
+        corrected = client.get(f"/measurements/corrected?job_id={job_id}")
+        check(
+            corrected.status_code == 404
+            and "Not enough" in corrected.json()["message"],
+            "corrected measurements of a job without drift are not available",
+        )
+
+
+def main():
+    test_undetermined_fits()
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{directory}/line_fit.db"
+        test_corrected_measurements()
+
+    logging.info("Undetermined line fits are rejected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Check of the batched last seen writes when a flush fails.
+
+A heartbeat whose transaction is rolled back has to stay unflushed, so the
+next flush writes it to the database.
+
+Usage: PYTHONPATH=. python scripts/presence_flush_test.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+from uuid import UUID
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        logging.error(f"FAILED: {message}")
+        sys.exit(1)
+    logging.info(f"ok: {message}")
+
+
+def run() -> None:
+    from fastapi.testclient import TestClient
+
+    import main
+    from rtsapi.database import SessionLocal
+    from rtsapi.database.device_repository import DeviceRepository
+    from rtsapi.services.presence_service import flush_presence
+
+    def stored_last_seen(device_id: str) -> float:
+        with SessionLocal() as db:
+            return DeviceRepository(db).get_device(UUID(device_id)).last_seen
+
+    with TestClient(main.app) as client:
+        app_state = main.app.state.app_state
+        device = client.post("/devices/register").json()
+        flush_presence(app_state)
+        first_seen = stored_last_seen(device["id"])
+
+        heartbeat = client.post("/devices/register").json()
+        check(heartbeat["last_seen"] > first_seen, "heartbeat is newer")
+
+        set_last_seen = DeviceRepository.set_last_seen
+
+        def fail(self, last_seen, commit=True):
+            raise RuntimeError("database is locked")
+
+        DeviceRepository.set_last_seen = fail
+        try:
+            flush_presence(app_state)
+            check(False, "failing flush raises")
+        except RuntimeError:
+            pass
+        finally:
+            DeviceRepository.set_last_seen = set_last_seen
+
+        check(
+            stored_last_seen(device["id"]) == first_seen,
+            "failed flush leaves the database unchanged",
+        )
+        flush_presence(app_state)
+        check(
+            stored_last_seen(device["id"]) == heartbeat["last_seen"],
+            "heartbeat written by the next flush",
+        )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{directory}/presence_flush.db"
+        run()
+
+    logging.info("Failed presence flushes are retried")
+
+
+if __name__ == "__main__":
+    main()
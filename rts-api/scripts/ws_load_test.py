@@ -0,0 +1,157 @@
+"""
+Load test for the measurement websocket.
+
+Opens N concurrent station sockets that stream dummy measurements at a fixed
+rate and measures the round-trip time of /ping requests while they are
+streaming. If the ingest path blocks the event loop, the ping latency grows
+with the number of stations; with the non-blocking path it stays flat.
+
+The p95 ping latency at every station count is compared against the run
+with a single station and the script exits with 1 if it grew by more than
+the tolerance.
+
+Usage: python scripts/ws_load_test.py [API_URL]
+"""
+
+import asyncio
+import json
+import logging
+import math
+import statistics
+import sys
+import time
+
+import requests
+import websockets
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+
+API_URL = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8000"
+WS_URL = API_URL.replace("http", "ws", 1)
+TIMEOUT = 5
+
+STATION_COUNTS = [1, 2, 4, 8, 16]
+RATE_HZ = 20
+DURATION = 10.0
+PING_INTERVAL = 0.05
+# allowed p95 ping latency: baseline p95 * P95_TOLERANCE + P95_SLACK_MS, the
+# slack keeps the scheduling noise of a ping of a few ms from failing the run
+P95_TOLERANCE = 2.0
+P95_SLACK_MS = 10.0
+
+
+def create_running_jobs(num_stations: int) -> list[str]:
+    device = requests.post(f"{API_URL}/devices/register", timeout=TIMEOUT).json()
+    session = requests.post(
+        f"{API_URL}/session", json={"name": "ws load test"}, timeout=TIMEOUT
+    ).json()
+
+    job_ids = []
+    for i in range(num_stations):
+        rts = requests.post(
+            f"{API_URL}/rts/",
+            json={
+                "name": f"Load Test RTS {i}",
+                "device_id": device["id"],
+                "session_id": session["id"],
+            },
+            timeout=TIMEOUT,
+        ).json()
+        job = requests.post(
+            f"{API_URL}/jobs",
+            json={"rts_id": rts["id"], "job_type": "dummy_tracking"},
+            timeout=TIMEOUT,
+        ).json()
+        requests.put(
+            f"{API_URL}/jobs/{job['job_id']}?job_status=running", timeout=TIMEOUT
+        ).raise_for_status()
+        job_ids.append(job["job_id"])
+
+    return job_ids
+
+
+def finish_jobs(job_ids: list[str]) -> None:
+    for job_id in job_ids:
+        requests.put(f"{API_URL}/jobs/{job_id}?job_status=finished", timeout=TIMEOUT)
+
+
+async def stream_station(job_id: str, stop_at: float) -> int:
+    num_sent = 0
+    async with websockets.connect(f"{WS_URL}/ws/measurements/{job_id}") as websocket:
+        while time.time() < stop_at:
+            timestamp = time.time()
+            measurement = {
+                "rts_job_id": job_id,
+                "controller_timestamp": timestamp,
+                "sensor_timestamp": timestamp * 1000,
+                "distance": 100 + math.cos(timestamp),
+                "horizontal_angle": math.sin(timestamp),
+                "vertical_angle": 1.5,
+                "response_length": 10,
+                "geocom_return_code": 0,
+                "rpc_return_code": 0,
+            }
+            await websocket.send(json.dumps(measurement))
+            num_sent += 1
+            await asyncio.sleep(1 / RATE_HZ)
+
+    return num_sent
+
+
+async def measure_ping(stop_at: float) -> list[float]:
+    latencies = []
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        await asyncio.to_thread(requests.get, f"{API_URL}/ping", timeout=TIMEOUT)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(PING_INTERVAL)
+
+    return latencies
+
+
+async def run_load(job_ids: list[str]) -> tuple[list[float], int]:
+    stop_at = time.time() + DURATION
+    results = await asyncio.gather(
+        measure_ping(stop_at),
+        *[stream_station(job_id, stop_at) for job_id in job_ids],
+    )
+    return results[0], sum(results[1:])
+
+
+def main():
+    logging.info(f"{'stations':>8} {'frames':>8} {'p50 [ms]':>9} {'p95 [ms]':>9} {'max [ms]':>9}")
+    p95_by_stations = {}
+    for num_stations in STATION_COUNTS:
+        job_ids = create_running_jobs(num_stations)
+        try:
+            latencies, num_frames = asyncio.run(run_load(job_ids))
+        finally:
+            finish_jobs(job_ids)
+
+        latencies.sort()
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        logging.info(
+            f"{num_stations:>8} {num_frames:>8} {statistics.median(latencies):>9.1f} "
+            f"{p95:>9.1f} {latencies[-1]:>9.1f}"
+        )
+        p95_by_stations[num_stations] = p95
+
+    baseline = p95_by_stations[STATION_COUNTS[0]]
+    allowed = baseline * P95_TOLERANCE + P95_SLACK_MS
+    problems = [
+        f"{num_stations} stations: p95 {p95:.1f} ms exceeds {allowed:.1f} ms"
+        for num_stations, p95 in p95_by_stations.items()
+        if p95 > allowed
+    ]
+    if problems:
+        logging.error(
+            f"Ping latency grows with the number of stations (baseline p95 "
+            f"{baseline:.1f} ms):\n" + "\n".join(problems)
+        )
+        sys.exit(1)
+
+    logging.info(f"Ping p95 stays within {allowed:.1f} ms for up to {STATION_COUNTS[-1]} stations")
+
+
+if __name__ == "__main__":
+    main()
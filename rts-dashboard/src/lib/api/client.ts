@@ -95,6 +95,32 @@ export async function getRtsStatus(rtsId: string): Promise<RTSStatusResponse> {
     return request<RTSStatusResponse>(`/rts/${rtsId}/status`);
 }
 
+/**
+ * Status of all RTS of a session. Pass the ETag of the previous response,
+ * statuses is null if nothing changed since then.
+ */
+export async function getRtsStatuses(
+    sessionId: string,
+    etag: string | null = null,
+): Promise<{ statuses: Record<string, RTSStatusResponse> | null; etag: string | null }> {
+    const headers: Record<string, string> = {};
+    if (etag) {
+        headers['If-None-Match'] = etag;
+    }
+    const res = await fetch(`${getBaseUrl()}/rts/status?session_id=${sessionId}`, {
+        headers,
+        cache: 'no-store',
+    });
+    if (res.status === 304) {
+        return { statuses: null, etag };
+    }
+    if (!res.ok) {
+        const body = await res.text().catch(() => '');
+        throw new Error(`API ${res.status}: ${body || res.statusText}`);
+    }
+    return { statuses: await res.json(), etag: res.headers.get('ETag') };
+}
+
 // ── Tracking Settings ───────────────────────────────────────
 export async function getTrackingSettings(rtsId: string): Promise<TrackingSettingsResponse> {
     return request<TrackingSettingsResponse>(`/rts/${rtsId}/tracking_settings`);
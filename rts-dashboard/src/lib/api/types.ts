@@ -178,6 +178,9 @@ export interface RTSStatusResponse {
     last_measurement: MeasurementResponse | null;
     num_measurements: number;
     datarate: number;
+    instantaneous_datarate: number;
+    average_datarate: number;
+    num_dropouts: number;
 }
 
 // === Synchronizer ===
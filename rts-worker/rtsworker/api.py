@@ -11,6 +11,7 @@ from rtsworker.dtos import (
     CreateRTSRequest,
     DeviceResponse,
     MeasurementResponse,
+    RTSJobClaimResponse,
     RTSJobResponse,
     RTSJobStatus,
     RTSResponse,
@@ -24,6 +25,8 @@ API_URL = f"http://{API_HOST}:{API_PORT}"
 WEBSOCKET_URL = f"ws://{API_HOST}:{API_PORT}/ws/measurements/{{job_id}}"
 WS_RECONNECT_DELAY = 5
 TIMEOUT = 5
+# seconds the API holds a job fetch open until a job for this device is created
+JOB_FETCH_WAIT = float(os.getenv("JOB_FETCH_WAIT", "25"))
 
 
 def self_register() -> None:
@@ -38,18 +41,44 @@ def create_rts(create_rts_request: CreateRTSRequest) -> RTSResponse:
     return RTSResponse.model_validate(response.json())
 
 
-def fetch_new_job() -> RTSJobResponse:
-    response = requests.get(f"{API_URL}/jobs/fetch", timeout=TIMEOUT)
+def fetch_new_job(wait: float = JOB_FETCH_WAIT) -> RTSJobResponse:
+    response = requests.get(f"{API_URL}/jobs/fetch", params={"wait": wait}, timeout=wait + TIMEOUT)
     print(f"Fetching job at {API_URL}/jobs/fetch")
 
-    if not response.ok or response.status_code == 204:
+    if response.status_code == 204:
         return None
 
+    response.raise_for_status()
+
     return RTSJobResponse.model_validate(response.json())
 
 
-def update_job_status(job_id: UUID, status: RTSJobStatus) -> RTSJobResponse:
-    response = requests.put(f"{API_URL}/jobs/{job_id}?job_status={status.value}", timeout=TIMEOUT)
+def claim_new_job(wait: float = JOB_FETCH_WAIT) -> RTSJobClaimResponse | None:
+    response = requests.post(f"{API_URL}/jobs/claim", params={"wait": wait}, timeout=wait + TIMEOUT)
+
+    if response.status_code == 204:
+        return None
+
+    response.raise_for_status()
+    return RTSJobClaimResponse.model_validate(response.json())
+
+
+def renew_lease(job_id: UUID, lease_id: str) -> bool:
+    """Returns False if the lease was lost and the job was given to another worker"""
+    response = requests.put(f"{API_URL}/jobs/{job_id}/lease", params={"lease_id": lease_id}, timeout=TIMEOUT)
+
+    if response.status_code in (404, 409):
+        return False
+
+    response.raise_for_status()
+    return True
+
+
+def update_job_status(job_id: UUID, status: RTSJobStatus, lease_id: str | None = None) -> RTSJobResponse:
+    params = {"job_status": status.value}
+    if lease_id is not None:
+        params["lease_id"] = lease_id
+    response = requests.put(f"{API_URL}/jobs/{job_id}", params=params, timeout=TIMEOUT)
     response.raise_for_status()
     return RTSJobResponse.model_validate(response.json())
 
@@ -90,14 +119,23 @@ def get_latest_target_position() -> TargetPosition:
     return TargetPosition.model_validate(response.json())
 
 
-def websocket_sender(job_id: UUID, data_queue: queue.Queue, shutdown_event: threading.Event):
+def websocket_sender(
+    job_id: UUID,
+    data_queue: queue.Queue,
+    shutdown_event: threading.Event,
+    control_queue: queue.Queue | None = None,
+):
+    """
+    Sends the measurements of the queue to the API and puts the control
+    messages the API sends back into the control queue
+    """
     uri = WEBSOCKET_URL.format(job_id=job_id)
     pending_state = [None]
 
     while not shutdown_event.is_set():
         try:
             print(f"Attempting WebSocket connection to {uri}...")
-            asyncio.run(connect_and_send(uri, data_queue, shutdown_event, pending_state))
+            asyncio.run(connect_and_send(uri, data_queue, shutdown_event, pending_state, control_queue))
             break
 
         except (websockets.exceptions.ConnectionClosedError, ConnectionRefusedError, asyncio.TimeoutError) as e:
@@ -110,31 +148,52 @@ def websocket_sender(job_id: UUID, data_queue: queue.Queue, shutdown_event: thre
     print("WebSocket sender thread shutting down.")
 
 
-async def connect_and_send(uri: str, data_queue: queue.Queue, shutdown_event: threading.Event, pending_state: list):
+async def receive_control_messages(websocket, control_queue: queue.Queue):
+    try:
+        async for message in websocket:
+            control_queue.put(json.loads(message))
+    except websockets.exceptions.ConnectionClosed:
+        pass
+
+
+async def connect_and_send(
+    uri: str,
+    data_queue: queue.Queue,
+    shutdown_event: threading.Event,
+    pending_state: list,
+    control_queue: queue.Queue | None = None,
+):
     async with websockets.connect(uri, ping_interval=10, ping_timeout=10) as websocket:
         print(f"WebSocket connected to {uri}")
+        receiver = None
+        if control_queue is not None:
+            receiver = asyncio.create_task(receive_control_messages(websocket, control_queue))
 
-        if pending_state[0]:
-            print("Sending pending measurement...")
-            await websocket.send(json.dumps(pending_state[0]))
-            pending_state[0] = None
-            data_queue.task_done()
-            print("Pending measurement sent.")
-
-        while not shutdown_event.is_set():
-            try:
-                measurement = await asyncio.to_thread(data_queue.get, timeout=1.0)
-                pending_state[0] = measurement
-                await websocket.send(json.dumps(measurement))
+        try:
+            if pending_state[0]:
+                print("Sending pending measurement...")
+                await websocket.send(json.dumps(pending_state[0]))
                 pending_state[0] = None
-
                 data_queue.task_done()
-
-            except queue.Empty:
-                continue
-            except websockets.exceptions.ConnectionClosed:
-                print("WebSocket connection closed during send.")
-                raise
+                print("Pending measurement sent.")
+
+            while not shutdown_event.is_set():
+                try:
+                    measurement = await asyncio.to_thread(data_queue.get, timeout=1.0)
+                    pending_state[0] = measurement
+                    await websocket.send(json.dumps(measurement))
+                    pending_state[0] = None
+
+                    data_queue.task_done()
+
+                except queue.Empty:
+                    continue
+                except websockets.exceptions.ConnectionClosed:
+                    print("WebSocket connection closed during send.")
+                    raise
+        finally:
+            if receiver is not None:
+                receiver.cancel()
 
     if shutdown_event.is_set():
         print("WebSocket connection closing due to shutdown signal.")
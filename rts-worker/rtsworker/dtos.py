@@ -63,6 +63,11 @@ class RTSJobResponse(BaseModel):
     payload: dict = {}
 
 
+class RTSJobClaimResponse(RTSJobResponse):
+    lease_id: str
+    lease_duration: float
+
+
 class UpdateRTSRequest(BaseModel):
     name: str = "RTS"
     baudrate: int = 115200
@@ -133,6 +138,18 @@ class TrackingSettingsResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class JobControlType(Enum):
+    STOP = "stop"
+    PAUSE = "pause"
+    RESUME = "resume"
+    SETTINGS = "settings"
+
+
+class JobControlMessage(BaseModel):
+    type: JobControlType
+    settings: TrackingSettingsResponse | None = None
+
+
 class TrackingSettings(BaseModel):
     tmc_measurement_mode: int = 1
     tmc_inclination_mode: int = 1
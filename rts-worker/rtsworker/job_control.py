@@ -0,0 +1,39 @@
+import queue
+
+from rtsworker.dtos import JobControlMessage, JobControlType, TrackingSettingsResponse
+
+
+class JobControl:
+    """
+    State of a running job as pushed by the API on the measurement websocket.
+
+    The websocket sender thread puts the received messages into the queue,
+    the measurement loop applies them with poll() without any request.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.stopped = False
+        self.paused = False
+        self.settings: TrackingSettingsResponse | None = None
+
+    def poll(self) -> None:
+        while True:
+            try:
+                message = JobControlMessage.model_validate(self.queue.get_nowait())
+            except queue.Empty:
+                return
+
+            if message.type == JobControlType.STOP:
+                self.stopped = True
+            elif message.type == JobControlType.PAUSE:
+                self.paused = True
+            elif message.type == JobControlType.RESUME:
+                self.paused = False
+            elif message.type == JobControlType.SETTINGS:
+                self.settings = message.settings
+
+    def take_settings(self) -> TrackingSettingsResponse | None:
+        """Settings changed since the last call, None if unchanged"""
+        settings, self.settings = self.settings, None
+        return settings
@@ -3,7 +3,6 @@ import threading
 import time
 import math
 from rtsworker.api import (
-    get_job_status,
     get_latest_target_position,
     get_rts,
     get_tracking_settings,
@@ -19,13 +18,14 @@ from rtsworker.dtos import (
     TargetPosition,
     TrackingSettings,
 )
+from rtsworker.job_control import JobControl
 from rtsworker.pygeocom import Station, TMCInclinationMode, TMCMeasurementMode
 from rtsworker.rts import RTSSerialConnection
 
 SLEEP_TIME = 0.001
 ALARM_THRESHOLD = 10
 ALARM_EVERY_N_SECONDS = 6
-JOB_CHECK_INTERVAL = 1.0
+PAUSE_SLEEP_TIME = 0.05
 
 
 def angles_from_position(station: Station, target: TargetPosition) -> tuple[float, float]:
@@ -75,23 +75,26 @@ def change_face(job: RTSJobResponse) -> None:
 
 def dummy_tracking(job: RTSJobResponse):
     print("Starting measurement")
-    job_status = get_job_status(job.job_id)
-    last_job_status_time = time.time()
-    
     measurement_queue = queue.Queue()
     shutdown_event = threading.Event()
+    # stop, pause and settings arrive on the measurement websocket
+    job_control = JobControl()
 
     sender_thread = threading.Thread(
         target=websocket_sender,
-        args=(job.job_id, measurement_queue, shutdown_event),
+        args=(job.job_id, measurement_queue, shutdown_event, job_control.queue),
         daemon=True,
     )
     sender_thread.start()
 
-    while job_status == RTSJobStatus.RUNNING:
-        if time.time() - last_job_status_time > JOB_CHECK_INTERVAL:
-            job_status = get_job_status(job.job_id)
-            last_job_status_time = time.time()
+    while True:
+        job_control.poll()
+        if job_control.stopped:
+            break
+        if job_control.paused:
+            time.sleep(PAUSE_SLEEP_TIME)
+            continue
+
         timestamp = time.time()
         distance = math.cos(timestamp) * 100
         horizontal_angle = math.sin(timestamp)
@@ -109,16 +112,21 @@ def dummy_tracking(job: RTSJobResponse):
         )
         measurement_queue.put(add_measurement.model_dump())
         time.sleep(0.01)
+
+    shutdown_event.set()
+    sender_thread.join(timeout=10.0)
     print("Stopped logging")
 
 
 def track_prism(job: RTSJobResponse) -> None:
     measurement_queue = queue.Queue()
     shutdown_event = threading.Event()
+    # stop, pause and settings arrive on the measurement websocket
+    job_control = JobControl()
 
     sender_thread = threading.Thread(
         target=websocket_sender,
-        args=(job.job_id, measurement_queue, shutdown_event),
+        args=(job.job_id, measurement_queue, shutdown_event, job_control.queue),
         daemon=True,
     )
     sender_thread.start()
@@ -136,13 +144,21 @@ def track_prism(job: RTSJobResponse) -> None:
             no_distance_count = 0
             last_alarm = 0
 
-            last_job_status_time = time.time()
-            job_status = get_job_status(job.job_id)
-
-            while job_status == RTSJobStatus.RUNNING:
-                if time.time() - last_job_status_time > JOB_CHECK_INTERVAL:
-                    job_status = get_job_status(job.job_id)
-                    last_job_status_time = time.time()
+            while True:
+                job_control.poll()
+                if job_control.stopped:
+                    break
+
+                new_settings = job_control.take_settings()
+                if new_settings is not None:
+                    print("Applying new tracking settings")
+                    tracking_settings = TrackingSettings.from_response(new_settings)
+                    rts_serial.stop_tracking()
+                    rts_serial.start_tracking(tracking_settings)
+
+                if job_control.paused:
+                    time.sleep(PAUSE_SLEEP_TIME)
+                    continue
 
                 response = rts_serial.get_full_measurement(TMCInclinationMode.AUTOMATIC, 1000)
 
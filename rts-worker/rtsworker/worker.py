@@ -1,4 +1,5 @@
 import os
+import threading
 import time
 import logging
 from typing import Callable, Dict
@@ -6,7 +7,7 @@ from typing import Callable, Dict
 import serial
 
 from rtsworker import api
-from rtsworker.dtos import CreateRTSRequest, DeviceResponse, RTSJobResponse, RTSJobStatus, RTSJobType
+from rtsworker.dtos import CreateRTSRequest, DeviceResponse, RTSJobClaimResponse, RTSJobResponse, RTSJobStatus, RTSJobType
 from rtsworker.pygeocom import PyGeoCom
 
 logger = logging.getLogger("root")
@@ -24,6 +25,38 @@ def get_rts_type_from_name(name: str) -> str:
     return "MS60"
 
 
+class LeaseHeartbeat:
+    """
+    Renews the lease of a claimed job in the background while its task runs.
+    If the lease is lost, the job is pending again and the task stops as
+    soon as it sees the job is no longer running.
+    """
+
+    def __init__(self, job: RTSJobClaimResponse):
+        self.job = job
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        # renew three times per lease, a single failed request is no problem
+        interval = self.job.lease_duration / 3
+        while not self.stopped.wait(interval):
+            try:
+                if not api.renew_lease(self.job.job_id, self.job.lease_id):
+                    logger.error(f"Lost lease of job {self.job.job_id}")
+                    return
+            except Exception as e:
+                logger.error(f"Renewing lease of job {self.job.job_id} failed: {e}")
+
+
 class Worker:
 
     def __init__(self, task_mapping: Dict[RTSJobType, Callable[[RTSJobResponse], None]]):
@@ -77,34 +110,36 @@ class Worker:
                 except Exception:
                     pass
 
-    def _run_task(self, job: RTSJobResponse):
-        try:
-            task = self.task_mapping[job.job_type]
-            task(job)
-        except Exception as e:
-            api.update_job_status(job.job_id, RTSJobStatus.FAILED)
-            logger.error(e)
+    def _run_task(self, job: RTSJobClaimResponse):
+        with LeaseHeartbeat(job):
+            try:
+                task = self.task_mapping[job.job_type]
+                task(job)
+            except Exception as e:
+                # rejected by the API if another worker got the job meanwhile
+                api.update_job_status(job.job_id, RTSJobStatus.FAILED, job.lease_id)
+                logger.error(e)
 
     def run(self):
         while True:
             try:
-                job = api.fetch_new_job()
+                # blocks in the API until a job is queued or the wait times out,
+                # a returned job is already running and reserved for this worker
+                fetch_start = time.monotonic()
+                job = api.claim_new_job()
 
                 if job is None:
                     logger.info("No job found")
-                    time.sleep(SLEEP_TIME)
+                    # an API that does not wait answers right away
+                    if time.monotonic() - fetch_start < SLEEP_TIME:
+                        time.sleep(SLEEP_TIME)
                     continue
 
-                logger.info(f"Found job: {job.job_id}")
-                # Reserving the job
-                api.update_job_status(
-                    job.job_id, RTSJobStatus.RUNNING
-                )  # try it but do not set the job on failed if it fails
+                logger.info(f"Claimed job: {job.job_id}")
                 self._run_task(job)
 
             except KeyboardInterrupt:
                 break
             except Exception as e:
                 logger.error(e)
-            finally:
                 time.sleep(SLEEP_TIME)